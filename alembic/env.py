@@ -29,9 +29,10 @@ from tools.threat_watch.database import ThreatEvent, ThreatWebhookConfig
 config = context.config
 
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
+# This line sets up loggers basically. Existing loggers are left enabled
+# so the app keeps logging when migrations run in-process (MIGRATION_MODE=async).
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 # Set target metadata for autogenerate support
 target_metadata = Base.metadata
@@ -4,6 +4,14 @@ Revision ID: 785d812e2ea3
 Revises: 1c2312b85e85
 Create Date: 2026-02-02 00:00:00.000000+00:00
 
+Edited after release: on PostgreSQL and MySQL the two threats_events
+columns are added in one ALTER TABLE, and where that would rewrite the
+table (MySQL, PostgreSQL < 11) `ignored` is added nullable and
+backfilled in id-range batches before being made NOT NULL. The resulting
+schema is the same as the original revision's, so these changes only
+affect how databases that haven't reached this revision yet upgrade;
+databases already past it need nothing.
+
 """
 from typing import Sequence, Union
 
@@ -17,8 +25,47 @@ down_revision: Union[str, None] = '1c2312b85e85'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+# Rows updated per statement when backfilling threats_events.ignored
+BACKFILL_BATCH_SIZE = 10000
+
+
+def _add_column_default_rewrites_table(bind) -> bool:
+    """
+    Whether ADD COLUMN ... NOT NULL DEFAULT rewrites the whole table.
+
+    SQLite and PostgreSQL 11+ only record the default in the catalog;
+    MySQL and older PostgreSQL rewrite every row under a write lock.
+    """
+    dialect = bind.dialect.name
+    if dialect == 'mysql':
+        return True
+    if dialect == 'postgresql':
+        return (bind.dialect.server_version_info or (0,)) < (11,)
+    return False
+
+
+def _backfill_ignored(bind) -> None:
+    """Set ignored = false on existing events in short id-range batches."""
+    lo, hi = bind.execute(sa.text("SELECT min(id), max(id) FROM threats_events")).one()
+    if lo is None:
+        return
+
+    # Commit each batch so row locks are only held briefly
+    with op.get_context().autocommit_block():
+        for start in range(lo, hi + 1, BACKFILL_BATCH_SIZE):
+            bind.execute(
+                sa.text(
+                    "UPDATE threats_events SET ignored = false "
+                    "WHERE id BETWEEN :lo AND :hi AND ignored IS NULL"
+                ),
+                {"lo": start, "hi": start + BACKFILL_BATCH_SIZE - 1}
+            )
+
 
 def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
     # Create threats_ignore_rules table
     op.create_table('threats_ignore_rules',
         sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
@@ -39,10 +86,35 @@ def upgrade() -> None:
         batch_op.create_index(batch_op.f('ix_threats_ignore_rules_ip_address'), ['ip_address'], unique=False)
 
     # Add ignored columns to threats_events
-    with op.batch_alter_table('threats_events', schema=None) as batch_op:
-        batch_op.add_column(sa.Column('ignored', sa.Boolean(), nullable=False, server_default='0'))
-        batch_op.add_column(sa.Column('ignored_by_rule_id', sa.Integer(), nullable=True))
-        batch_op.create_index(batch_op.f('ix_threats_events_ignored'), ['ignored'], unique=False)
+    backfill = _add_column_default_rewrites_table(bind)
+    if dialect in ('postgresql', 'mysql'):
+        # One ALTER TABLE for both columns instead of a round-trip (and table pass) per column
+        if backfill:
+            # Added as nullable and filled in batches below instead of one long rewrite
+            ignored_column = "ignored BOOLEAN"
+        else:
+            ignored_column = "ignored BOOLEAN NOT NULL DEFAULT false"
+        op.execute(
+            f"ALTER TABLE threats_events ADD COLUMN {ignored_column}, "
+            "ADD COLUMN ignored_by_rule_id INTEGER"
+        )
+
+        if backfill:
+            _backfill_ignored(bind)
+            op.alter_column(
+                'threats_events',
+                'ignored',
+                existing_type=sa.Boolean(),
+                nullable=False,
+                server_default=sa.false()
+            )
+
+        op.create_index('ix_threats_events_ignored', 'threats_events', ['ignored'], unique=False)
+    else:
+        with op.batch_alter_table('threats_events', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('ignored', sa.Boolean(), nullable=False, server_default='0'))
+            batch_op.add_column(sa.Column('ignored_by_rule_id', sa.Integer(), nullable=True))
+            batch_op.create_index(batch_op.f('ix_threats_events_ignored'), ['ignored'], unique=False)
 
 
 def downgrade() -> None:
@@ -0,0 +1,84 @@
+"""store threats_events.raw_data as JSONB / compressed JSON
+
+Revision ID: d81f4b6a0c35
+Revises: a3c7e91d2f64
+Create Date: 2026-10-15 01:00:00.000000+00:00
+
+"""
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4b6a0c35'
+down_revision: Union[str, None] = 'a3c7e91d2f64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows rewritten per statement when converting threats_events.raw_data
+BACKFILL_BATCH_SIZE = 10000
+
+
+def _convert_raw_data(bind, convert) -> None:
+    """Rewrite non-null raw_data values through convert() in id-range batches."""
+    lo, hi = bind.execute(sa.text("SELECT min(id), max(id) FROM threats_events")).one()
+    if lo is None:
+        return
+
+    for start in range(lo, hi + 1, BACKFILL_BATCH_SIZE):
+        rows = bind.execute(
+            sa.text(
+                "SELECT id, raw_data FROM threats_events "
+                "WHERE id BETWEEN :lo AND :hi AND raw_data IS NOT NULL"
+            ),
+            {"lo": start, "hi": start + BACKFILL_BATCH_SIZE - 1}
+        ).all()
+        if rows:
+            bind.execute(
+                sa.text("UPDATE threats_events SET raw_data = :raw_data WHERE id = :id"),
+                [{"id": row_id, "raw_data": convert(raw)} for row_id, raw in rows]
+            )
+
+
+def _compress(raw) -> bytes:
+    if isinstance(raw, str):
+        raw = raw.encode()
+    return zlib.compress(raw)
+
+
+def _decompress(raw) -> str:
+    return zlib.decompress(raw).decode()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        # Values are already JSON text; TOAST compresses large JSONB values
+        op.execute(
+            "ALTER TABLE threats_events "
+            "ALTER COLUMN raw_data TYPE JSONB USING raw_data::jsonb"
+        )
+        return
+
+    with op.batch_alter_table('threats_events', schema=None) as batch_op:
+        batch_op.alter_column('raw_data', existing_type=sa.Text(), type_=sa.LargeBinary())
+    _convert_raw_data(bind, _compress)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.execute(
+            "ALTER TABLE threats_events "
+            "ALTER COLUMN raw_data TYPE TEXT USING raw_data::text"
+        )
+        return
+
+    _convert_raw_data(bind, _decompress)
+    with op.batch_alter_table('threats_events', schema=None) as batch_op:
+        batch_op.alter_column('raw_data', existing_type=sa.LargeBinary(), type_=sa.Text())
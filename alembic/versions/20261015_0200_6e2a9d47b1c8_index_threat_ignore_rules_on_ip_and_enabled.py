@@ -0,0 +1,36 @@
+"""index threats_ignore_rules on (ip_address, enabled)
+
+Revision ID: 6e2a9d47b1c8
+Revises: d81f4b6a0c35
+Create Date: 2026-10-15 02:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2a9d47b1c8'
+down_revision: Union[str, None] = 'd81f4b6a0c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every incoming event looks up enabled rules by IP, so index exactly that
+    with op.batch_alter_table('threats_ignore_rules', schema=None) as batch_op:
+        batch_op.drop_index('ix_threats_ignore_rules_ip_address')
+        batch_op.create_index(
+            'ix_threats_ignore_rules_ip_address_enabled',
+            ['ip_address', 'enabled'],
+            unique=False,
+            postgresql_where=sa.text('enabled = true')
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('threats_ignore_rules', schema=None) as batch_op:
+        batch_op.drop_index('ix_threats_ignore_rules_ip_address_enabled')
+        batch_op.create_index('ix_threats_ignore_rules_ip_address', ['ip_address'], unique=False)
@@ -0,0 +1,43 @@
+"""make ix_threats_events_ignored a partial index on PostgreSQL
+
+Revision ID: 0f5c3b8e72a1
+Revises: 6e2a9d47b1c8
+Create Date: 2026-10-16 00:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0f5c3b8e72a1'
+down_revision: Union[str, None] = '6e2a9d47b1c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _rebuild_ignored_index(where: str) -> None:
+    """
+    Drop and recreate ix_threats_events_ignored without holding a write
+    lock on threats_events. CONCURRENTLY can't run inside a transaction,
+    hence the autocommit block.
+    """
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_threats_events_ignored")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_threats_events_ignored "
+            f"ON threats_events (ignored){where}"
+        )
+
+
+def upgrade() -> None:
+    # Partial index: most events are not ignored, so this stays small.
+    # Other databases keep the full index.
+    if op.get_bind().dialect.name == 'postgresql':
+        _rebuild_ignored_index(" WHERE ignored = false")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _rebuild_ignored_index("")
@@ -4,17 +4,27 @@ UI Toolkit - Unified FastAPI Application
 This is the main application that mounts all available tools as sub-applications.
 """
 import os
+import sys
+import asyncio
 import logging
+import orjson
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, status
-from fastapi.responses import HTMLResponse
+from functools import lru_cache
+from fastapi import APIRouter, Depends, FastAPI, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+from starlette.routing import Mount
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 from pathlib import Path
 
+from shared import cache
 from shared.database import get_database
 from shared.config import get_settings
 from shared.websocket_manager import get_ws_manager
+from shared.responses import ORJSONResponse
+from shared.unifi_pool import load_unifi_credentials, get_unifi_client, invalidate_unifi_client, close_unifi_client
+from shared.unifi_client import UniFiClient
 from tools.wifi_stalker.main import create_app as create_stalker_app
 from tools.wifi_stalker.scheduler import start_scheduler, stop_scheduler
 from tools.threat_watch.main import create_app as create_threat_watch_app
@@ -23,8 +33,18 @@ from tools.network_pulse.main import create_app as create_pulse_app
 from tools.network_pulse.scheduler import start_scheduler as start_pulse_scheduler, stop_scheduler as stop_pulse_scheduler
 
 # Import authentication router and middleware
-from app.routers.auth import router as auth_router, AuthMiddleware, is_auth_enabled, verify_session
+from app.routers.auth import (
+    router as auth_router,
+    AuthMiddleware,
+    is_auth_enabled,
+    verify_session,
+    run_auth_janitor,
+)
 from app.routers.config import router as config_router
+from app import __version__ as APP_VERSION
+from tools.wifi_stalker import __version__ as STALKER_VERSION
+from tools.threat_watch import __version__ as THREAT_WATCH_VERSION
+from tools.network_pulse import __version__ as PULSE_VERSION
 
 # Configure logging - respect LOG_LEVEL from environment
 log_level_str = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -37,25 +57,133 @@ logger = logging.getLogger(__name__)
 
 # Template directory for main dashboard
 BASE_DIR = Path(__file__).parent
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
+# Templates only change with a new release, so skip mtime checks, never evict
+# compiled templates, and keep compiled bytecode on disk across restarts
+template_env = Environment(
+    loader=FileSystemLoader(str(BASE_DIR / "templates")),
+    autoescape=True,
+    auto_reload=False,
+    cache_size=-1,
+    bytecode_cache=FileSystemBytecodeCache(pattern="unifi_toolkit_%s.cache")
+)
+templates = Jinja2Templates(env=template_env)
+
+# Migration mode: "sync" (run.py migrates before uvicorn starts), "async"
+# (migrate in a background thread after startup) or "skip" (never migrate)
+MIGRATION_MODES = ("sync", "async", "skip")
+
+# Migration progress, reported by /health
+migration_status = {"mode": "sync", "state": "pending"}
+
+TOOL_VERSIONS = {
+    "wifi_stalker": STALKER_VERSION,
+    "threat_watch": THREAT_WATCH_VERSION,
+    "network_pulse": PULSE_VERSION
+}
+
+
+@lru_cache(maxsize=1)
+def get_versions() -> dict:
+    """
+    Get the app and tool versions (dependency; built once per process)
+
+    Returns:
+        Dict with "app" version and per-tool "tools" versions
+    """
+    return {"app": APP_VERSION, "tools": TOOL_VERSIONS}
+
+
+# Version context for the dashboard template, fixed for the life of the process
+DASHBOARD_VERSIONS = {
+    "app_version": APP_VERSION,
+    "stalker_version": STALKER_VERSION,
+    "threat_watch_version": THREAT_WATCH_VERSION,
+    "pulse_version": PULSE_VERSION
+}
 
-def run_migrations():
+# WebSocket keepalive: uvicorn sends protocol-level ping frames, which
+# browsers answer without waking any JavaScript or application code
+WS_PING_INTERVAL_SECONDS = 20.0
+WS_PING_TIMEOUT_SECONDS = 20.0
+
+# /health body - migration_status is updated in place, so this stays current
+HEALTH_RESPONSE = {
+    "status": "healthy",
+    "version": APP_VERSION,
+    "tools": TOOL_VERSIONS,
+    "migrations": migration_status
+}
+
+# Serialized /health body, re-rendered only when the migration status changes
+_health_body: bytes = b""
+_health_body_key: tuple = ()
+
+
+def get_health_body() -> bytes:
+    """Get the pre-serialized /health response body"""
+    global _health_body, _health_body_key
+
+    key = tuple(migration_status.values())
+    if key != _health_body_key:
+        _health_body = orjson.dumps(HEALTH_RESPONSE)
+        _health_body_key = key
+    return _health_body
+
+
+def get_migration_mode() -> str:
+    """Get the configured migration mode, falling back to sync for unknown values"""
+    mode = os.getenv("MIGRATION_MODE", "sync").lower()
+    return mode if mode in MIGRATION_MODES else "sync"
+
+
+def run_migrations() -> bool:
     """
     Run Alembic migrations safely at startup.
 
+    Holds the cross-process migration lock, so concurrently starting
+    processes don't migrate the same database at once.
+
+    Returns:
+        True if the schema is at head afterwards, False otherwise
+    """
+    from shared.migrations import migration_lock
+
+    try:
+        with migration_lock():
+            return _upgrade_schema()
+    except Exception as e:
+        logger.error("Could not acquire migration lock: %s", e)
+        return False
+
+
+def _upgrade_schema() -> bool:
+    """
+    Upgrade the database to the latest migration.
+
     Handles common schema sync issues where the database schema is ahead of
     the migration history (e.g., after manual schema changes or version jumps).
+
+    Returns:
+        True if the schema is at head afterwards, False otherwise
     """
     try:
         from alembic.config import Config
         from alembic import command
 
+        from shared.migrations import is_at_head
+
         alembic_cfg = Config("alembic.ini")
 
+        # Nothing to do on a warm restart - skip loading the Alembic environment
+        if is_at_head(alembic_cfg):
+            logger.info("Database schema at head, skipping migrations")
+            return True
+
         # Try to run migrations normally
         command.upgrade(alembic_cfg, "head")
         logger.info("Database migrations completed successfully")
+        return True
 
     except Exception as e:
         error_msg = str(e).lower()
@@ -71,7 +199,7 @@ def run_migrations():
         is_schema_sync_issue = any(err in error_msg for err in schema_sync_errors)
 
         if is_schema_sync_issue:
-            logger.warning(f"Migration detected schema sync issue: {e}")
+            logger.warning("Migration detected schema sync issue: %s", e)
             logger.info("Database schema appears to be ahead of migration history.")
             logger.info("Attempting to synchronize migration history...")
 
@@ -82,16 +210,70 @@ def run_migrations():
                 alembic_cfg = Config("alembic.ini")
                 command.stamp(alembic_cfg, "head")
                 logger.info("Migration history synchronized with current schema")
+                return True
             except Exception as stamp_error:
-                logger.error(f"Failed to synchronize migration history: {stamp_error}")
+                logger.error("Failed to synchronize migration history: %s", stamp_error)
                 logger.error("Manual intervention may be required.")
                 logger.error("Try running: alembic stamp head")
         else:
             # Unknown error - log it clearly
-            logger.error(f"Migration failed with unexpected error: {e}")
+            logger.error("Migration failed with unexpected error: %s", e)
             logger.error("The application will continue, but some features may not work correctly.")
             logger.error("Check the database schema and migration history.")
 
+        return False
+
+
+def _schema_at_head() -> bool:
+    """
+    Check whether the database is at the latest migration, e.g. after
+    run.py migrated it before startup (or didn't, or failed to)
+    """
+    from alembic.config import Config
+    from shared.migrations import is_at_head
+
+    return is_at_head(Config("alembic.ini"))
+
+
+async def _start_schedulers():
+    """
+    Start the Wi-Fi Stalker, Threat Watch and Network Pulse schedulers.
+    Each runs an initial refresh against the controller, so start them together.
+    """
+    logger.info("Starting schedulers...")
+    await asyncio.gather(
+        start_scheduler(),
+        start_threat_scheduler(),
+        start_pulse_scheduler()
+    )
+    logger.info("Schedulers started")
+
+
+async def _run_migrations_bg(db):
+    """
+    Run migrations in a worker thread so startup doesn't wait on Alembic,
+    then create any missing tables and start the schedulers. Both wait for
+    the migration so they never race it on an un-migrated schema.
+    Progress is recorded in migration_status for /health.
+
+    Args:
+        db: Database initialized with init_db(create_tables=False)
+    """
+    from shared.migrations import repair_schema
+
+    migration_status["state"] = "running"
+    try:
+        succeeded = await asyncio.to_thread(run_migrations)
+        # Same repair run.py does after sync migrations
+        await asyncio.to_thread(repair_schema)
+        migration_status["state"] = "complete" if succeeded else "failed"
+    except Exception as e:
+        logger.error("Background migration task failed: %s", e)
+        migration_status["state"] = "failed"
+
+    await db.create_tables()
+    await _start_schedulers()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -101,7 +283,7 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting UI Toolkit...")
     settings = get_settings()
-    logger.info(f"Log level: {settings.log_level}")
+    logger.info("Log level: %s", settings.log_level)
 
     # Log deployment mode
     deployment_type = os.getenv("DEPLOYMENT_TYPE", "local")
@@ -110,29 +292,43 @@ async def lifespan(app: FastAPI):
     else:
         logger.info("Running in LOCAL mode - authentication disabled")
 
-    # Note: Migrations are now run in run.py BEFORE uvicorn starts
-    # This avoids async/sync issues that caused hangs on Synology NAS
+    # Migrations: in sync mode (default) run.py runs them BEFORE uvicorn starts,
+    # which avoids async/sync issues that caused hangs on Synology NAS.
+    # In async mode they run in a worker thread so startup isn't blocked.
+    migration_mode = get_migration_mode()
+    migration_status["mode"] = migration_mode
+    if migration_mode == "skip":
+        logger.info("Skipping database migrations (MIGRATION_MODE=skip)")
+        migration_status["state"] = "skipped"
+    elif migration_mode == "sync":
+        # run.py migrated before startup, but only warns if that failed,
+        # and the app may have been started without run.py at all
+        at_head = await asyncio.to_thread(_schema_at_head)
+        migration_status["state"] = "complete" if at_head else "failed"
+        if not at_head:
+            logger.warning("Database schema is not at the latest migration")
+
+    # Compile the dashboard template now rather than on the first page load
+    template_env.get_template("dashboard.html")
 
     # Initialize database
     logger.info("Initializing database...")
     db = get_database()
-    await db.init_db()
+    # In async mode tables are created once the background migration is done
+    await db.init_db(create_tables=migration_mode != "async")
     logger.info("Database initialized")
 
-    # Start Wi-Fi Stalker scheduler
-    logger.info("Starting Wi-Fi Stalker scheduler...")
-    await start_scheduler()
-    logger.info("Wi-Fi Stalker scheduler started")
-
-    # Start Threat Watch scheduler
-    logger.info("Starting Threat Watch scheduler...")
-    await start_threat_scheduler()
-    logger.info("Threat Watch scheduler started")
+    migration_task = None
+    if migration_mode == "async":
+        # The schedulers start after the migration, from the background task
+        logger.info("Running database migrations in the background...")
+        migration_task = asyncio.create_task(_run_migrations_bg(db))
+        app.state.migration_task = migration_task
+    else:
+        await _start_schedulers()
 
-    # Start Network Pulse scheduler
-    logger.info("Starting Network Pulse scheduler...")
-    await start_pulse_scheduler()
-    logger.info("Network Pulse scheduler started")
+    # Sweep expired sessions and login attempts (only kept in production mode)
+    janitor_task = asyncio.create_task(run_auth_janitor()) if is_auth_enabled() else None
 
     logger.info("UI Toolkit started successfully")
 
@@ -141,20 +337,29 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down UI Toolkit...")
 
-    # Stop Network Pulse scheduler
-    logger.info("Stopping Network Pulse scheduler...")
-    await stop_pulse_scheduler()
-    logger.info("Network Pulse scheduler stopped")
+    if janitor_task is not None:
+        janitor_task.cancel()
+
+    # Don't start the schedulers after shutdown has begun
+    if migration_task is not None and not migration_task.done():
+        migration_task.cancel()
 
-    # Stop Threat Watch scheduler
-    logger.info("Stopping Threat Watch scheduler...")
-    await stop_threat_scheduler()
-    logger.info("Threat Watch scheduler stopped")
+    # Stop all schedulers; one failing to stop shouldn't keep the others running
+    logger.info("Stopping schedulers...")
+    results = await asyncio.gather(
+        stop_pulse_scheduler(),
+        stop_threat_scheduler(),
+        stop_scheduler(),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error("Failed to stop scheduler: %s", result)
+    logger.info("Schedulers stopped")
 
-    # Stop Wi-Fi Stalker scheduler
-    logger.info("Stopping Wi-Fi Stalker scheduler...")
-    await stop_scheduler()
-    logger.info("Wi-Fi Stalker scheduler stopped")
+    # Log out of the controller and close pooled connections
+    await close_unifi_client()
+    await UniFiClient.shutdown()
 
     logger.info("UI Toolkit shut down complete")
 
@@ -164,29 +369,59 @@ app = FastAPI(
     title="UI Toolkit",
     description="Comprehensive toolkit for UniFi network management and monitoring",
     version="1.9.1",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Add authentication middleware (must be added before routes)
-app.add_middleware(AuthMiddleware)
+# Add authentication middleware (must be added before routes).
+# Only installed in production mode - in local mode it would pass every
+# request straight through, so skip the extra middleware layer entirely.
+if is_auth_enabled():
+    app.add_middleware(AuthMiddleware)
 
-# Include authentication router
+# Include authentication router (always, so /login redirects in local mode)
 app.include_router(auth_router)
 
 # Include configuration router
 app.include_router(config_router)
 
-# Mount Wi-Fi Stalker sub-application
-stalker_app = create_stalker_app()
-app.mount("/stalker", stalker_app)
 
-# Mount Threat Watch sub-application
-threat_watch_app = create_threat_watch_app()
-app.mount("/threats", threat_watch_app)
 
-# Mount Network Pulse sub-application
-pulse_app = create_pulse_app()
-app.mount("/pulse", pulse_app)
+def include_tool_app(prefix: str, tool_app: FastAPI):
+    """
+    Serve a tool's routes directly from the main app under a path prefix.
+
+    The tool's API and WebSocket routes are copied into the main router and
+    its static mounts are re-mounted under the prefix, rather than mounting
+    the whole tool as a sub-application. Requests then pass through a single
+    middleware stack. The tool's own /docs and /openapi.json are not carried
+    over; its endpoints show up in the main app's docs instead.
+
+    Args:
+        prefix: URL prefix for the tool (e.g., "/stalker")
+        tool_app: FastAPI app returned by the tool's create_app()
+    """
+    docs_paths = {
+        tool_app.openapi_url,
+        tool_app.docs_url,
+        tool_app.redoc_url,
+        tool_app.swagger_ui_oauth2_redirect_url
+    }
+
+    tool_routes = []
+    for route in tool_app.routes:
+        if isinstance(route, Mount):
+            app.mount(prefix + route.path, route.app, name=route.name)
+        elif getattr(route, "path", None) not in docs_paths:
+            tool_routes.append(route)
+
+    app.include_router(APIRouter(routes=tool_routes), prefix=prefix)
+
+
+# Wi-Fi Stalker, Threat Watch and Network Pulse routes
+include_tool_app("/stalker", create_stalker_app())
+include_tool_app("/threats", create_threat_watch_app())
+include_tool_app("/pulse", create_pulse_app())
 
 # Mount main app static files (for dashboard)
 app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
@@ -197,20 +432,12 @@ async def root(request: Request):
     """
     Main dashboard - shows available tools
     """
-    from app import __version__ as app_version
-    from tools.wifi_stalker import __version__ as stalker_version
-    from tools.threat_watch import __version__ as threat_watch_version
-    from tools.network_pulse import __version__ as pulse_version
-
     return templates.TemplateResponse(
         "dashboard.html",
         {
             "request": request,
             "auth_enabled": is_auth_enabled(),
-            "app_version": app_version,
-            "stalker_version": stalker_version,
-            "threat_watch_version": threat_watch_version,
-            "pulse_version": pulse_version
+            **DASHBOARD_VERSIONS
         }
     )
 
@@ -220,38 +447,17 @@ async def health_check():
     """
     Health check endpoint for monitoring
     """
-    from app import __version__ as app_version
-    from tools.wifi_stalker import __version__ as stalker_version
-    from tools.threat_watch import __version__ as threat_watch_version
-    from tools.network_pulse import __version__ as pulse_version
-
-    return {
-        "status": "healthy",
-        "version": app_version,
-        "tools": {
-            "wifi_stalker": stalker_version,
-            "threat_watch": threat_watch_version,
-            "network_pulse": pulse_version
-        }
-    }
+    return Response(get_health_body(), media_type="application/json")
 
 
 @app.get("/api/debug-info")
-async def get_debug_info():
+async def get_debug_info(versions: dict = Depends(get_versions)):
     """
     Get non-sensitive debug information for issue reporting.
 
     Returns system info that helps with troubleshooting without
     exposing sensitive data like IPs, credentials, or hostnames.
     """
-    import sys
-    from pathlib import Path
-    from app import __version__ as app_version
-    from tools.wifi_stalker import __version__ as stalker_version
-    from tools.threat_watch import __version__ as threat_watch_version
-    from tools.network_pulse import __version__ as pulse_version
-    from shared import cache
-
     settings = get_settings()
 
     # Detect if running in Docker
@@ -263,12 +469,8 @@ async def get_debug_info():
 
     # Build response with non-sensitive info only
     debug_info = {
-        "app_version": app_version,
-        "tool_versions": {
-            "wifi_stalker": stalker_version,
-            "threat_watch": threat_watch_version,
-            "network_pulse": pulse_version
-        },
+        "app_version": versions["app"],
+        "tool_versions": versions["tools"],
         "deployment": {
             "type": settings.deployment_type,
             "docker": is_docker,
@@ -286,62 +488,60 @@ async def get_debug_info():
     return debug_info
 
 
+# Serializes system status fetches so concurrent polls share one controller round-trip
+_system_status_lock = asyncio.Lock()
+
+
 @app.get("/api/system-status")
 async def get_system_status():
     """
     Get system status including gateway info, health, stats, and IPS settings.
-    Also caches gateway info and IPS settings for use by other endpoints.
+
+    Successful responses are cached briefly; concurrent requests wait for
+    a single in-flight fetch instead of each querying the controller.
     """
-    from shared.unifi_client import UniFiClient
-    from shared.crypto import decrypt_password, decrypt_api_key
-    from shared.models.unifi_config import UniFiConfig
-    from shared import cache
+    cached_status = cache.get_system_status()
+    if cached_status is not None:
+        return cached_status
+
+    async with _system_status_lock:
+        # Another request may have refreshed the cache while we waited
+        cached_status = cache.get_system_status()
+        if cached_status is not None:
+            return cached_status
+
+        system_status = await _fetch_system_status()
+        # Errors aren't cached, so a fixed config shows up on the next poll
+        if "error" not in system_status:
+            cache.set_system_status(system_status)
+        return system_status
 
-    db = get_database()
 
+async def _fetch_system_status() -> dict:
+    """
+    Fetch system status from the UniFi controller.
+    Also caches gateway info and IPS settings for use by other endpoints.
+    """
     try:
-        # Get UniFi config from database
-        async for session in db.get_session():
-            from sqlalchemy import select
-            result = await session.execute(select(UniFiConfig))
-            config = result.scalar_one_or_none()
-            break  # Only need one iteration
-
-        if not config:
+        credentials = await load_unifi_credentials()
+
+        if not credentials:
             return {
                 "configured": False,
                 "error": "UniFi controller not configured"
             }
 
-        # Decrypt credentials
-        password = None
-        api_key = None
-        if config.password_encrypted:
-            password = decrypt_password(config.password_encrypted)
-        if config.api_key_encrypted:
-            api_key = decrypt_api_key(config.api_key_encrypted)
-
-        # Create client and get system info
-        # is_unifi_os is auto-detected during connection
-        client = UniFiClient(
-            host=config.controller_url,
-            username=config.username,
-            password=password,
-            api_key=api_key,
-            site=config.site_id,
-            verify_ssl=config.verify_ssl
-        )
+        # Reuse the shared, already logged-in client
+        client = await get_unifi_client(credentials)
+        if client is None:
+            cache.invalidate_all()
+            return {
+                "configured": True,
+                "connected": False,
+                "error": "Failed to connect to UniFi controller"
+            }
 
         try:
-            connected = await client.connect()
-            if not connected:
-                cache.invalidate_all()
-                return {
-                    "configured": True,
-                    "connected": False,
-                    "error": "Failed to connect to UniFi controller"
-                }
-
             # Get system info and health
             system_info = await client.get_system_info()
             health = await client.get_health()
@@ -355,29 +555,30 @@ async def get_system_status():
             # and we're on UniFi OS (legacy controllers don't expose IPS API)
             if gateway_info.get("has_gateway") and gateway_info.get("supports_ids_ips") and client.is_unifi_os:
                 ips_settings = await client.get_ips_settings()
+        except Exception:
+            # The controller session may have gone stale - reconnect next time
+            await invalidate_unifi_client(client)
+            raise
+
+        # Cache the results
+        cache.set_gateway_info({
+            **gateway_info,
+            "is_unifi_os": client.is_unifi_os
+        })
+        if ips_settings:
+            cache.set_ips_settings(ips_settings)
 
-            # Cache the results
-            cache.set_gateway_info({
-                **gateway_info,
-                "is_unifi_os": client.is_unifi_os
-            })
-            if ips_settings:
-                cache.set_ips_settings(ips_settings)
-
-            return {
-                "configured": True,
-                "connected": True,
-                "system": system_info,
-                "health": health,
-                "gateway": gateway_info,
-                "ips_settings": ips_settings
-            }
-
-        finally:
-            await client.disconnect()
+        return {
+            "configured": True,
+            "connected": True,
+            "system": system_info,
+            "health": health,
+            "gateway": gateway_info,
+            "ips_settings": ips_settings
+        }
 
     except Exception as e:
-        logger.error(f"Failed to get system status: {e}")
+        logger.error("Failed to get system status: %s", e)
         cache.invalidate_all()
         return {
             "configured": True,
@@ -407,16 +608,13 @@ async def websocket_endpoint(websocket: WebSocket):
     await ws_manager.connect(websocket)
     try:
         while True:
-            # Wait for messages from client (e.g., ping)
-            data = await websocket.receive_text()
-
-            if data == "ping":
-                # Respond with pong
-                await websocket.send_json({"type": "pong"})
+            # Keepalive is handled by uvicorn's protocol-level pings; incoming
+            # messages are only read to notice the disconnect
+            await websocket.receive_text()
     except WebSocketDisconnect:
         pass  # Normal disconnect
     except Exception as e:
-        logger.error(f"WebSocket error: {e}")
+        logger.error("WebSocket error: %s", e)
     finally:
         ws_manager.disconnect(websocket)
 
@@ -433,5 +631,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=settings.app_port,
         reload=False,
-        log_level=log_level
+        log_level=log_level,
+        ws_ping_interval=WS_PING_INTERVAL_SECONDS,
+        ws_ping_timeout=WS_PING_TIMEOUT_SECONDS
     )
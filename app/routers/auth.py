@@ -6,57 +6,203 @@ Authentication is only enforced when DEPLOYMENT_TYPE=production.
 """
 
 import os
+import time
+import base64
+import asyncio
+import hashlib
 import secrets
 import logging
-from datetime import datetime, timedelta
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Optional
-import bcrypt
-
 from fastapi import APIRouter, Request, Form, HTTPException, Depends, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from starlette.middleware.base import BaseHTTPMiddleware
 from pathlib import Path
 
+from shared.config import get_settings
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # Template directory
 BASE_DIR = Path(__file__).parent.parent
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+
+
+# Stands in for wait_seconds in the prerendered rate-limited login page
+_WAIT_SECONDS_PLACEHOLDER = "__WAIT_SECONDS__"
+
+
+@lru_cache(maxsize=None)
+def _render_login_page(error: Optional[str], rate_limited: bool) -> str:
+    """
+    Render a variant of the login page once and cache the HTML.
+
+    There are only a few variants (plain, invalid credentials, rate limited),
+    so each is rendered on first use and reused; wait_seconds is left as a
+    placeholder for _login_response() to fill in.
+    """
+    from jinja2 import Environment, FileSystemLoader
+
+    env = Environment(loader=FileSystemLoader(str(BASE_DIR / "templates")), autoescape=True)
+    return env.get_template("login.html").render(
+        error=error,
+        rate_limited=rate_limited,
+        wait_seconds=_WAIT_SECONDS_PLACEHOLDER
+    )
+
+
+def _login_response(
+    error: Optional[str] = None,
+    rate_limited: bool = False,
+    wait_seconds: int = 0,
+    status_code: int = 200
+) -> HTMLResponse:
+    """Build a login page response from the prerendered variants"""
+    if rate_limited:
+        # The rate limit message replaces the error, so don't cache a variant per error
+        html = _render_login_page(None, True).replace(_WAIT_SECONDS_PLACEHOLDER, str(int(wait_seconds)))
+    else:
+        html = _render_login_page(error, False)
+    return HTMLResponse(html, status_code=status_code)
 
 # In-memory session store (simple, works for single-user)
 # Sessions are lost on restart, which is acceptable for single-user deployment
+# expires_at is a time.monotonic() deadline, so expiry checks are plain float
+# comparisons and aren't affected by wall-clock changes
 _sessions: dict = {}
+SESSION_LIFETIME = 7 * 24 * 60 * 60  # 7 days, in seconds
+
+# Session tokens are sliced from a buffer filled by one os.urandom() call,
+# instead of a getrandom() syscall per token
+SESSION_TOKEN_BYTES = 32
+_ENTROPY_BUFFER_SIZE = 4096
+_entropy_buf = bytearray()
+_entropy_lock = threading.Lock()
 
 # Rate limiting for login attempts
-_login_attempts: dict = {}  # {ip: [(timestamp, success), ...]}
+# {ip: deque([(time.monotonic() timestamp, success), ...])}, oldest first
+_login_attempts: dict[str, deque] = {}
 RATE_LIMIT_WINDOW = 300  # 5 minutes
 RATE_LIMIT_MAX_ATTEMPTS = 5
 
+# bcrypt hash (cost 12) of a throwaway password. Checked instead of the real
+# hash when none is configured or it is malformed, so a failed login always
+# pays the same bcrypt cost and response timing doesn't reveal the setup.
+_DUMMY_HASH = b"$2b$12$aLqgPcypMMspclPKpAhzNeLd97TG04iYECNVOQ3kXOgg8uP9rgftW"
+_DUMMY_HASH_COST = 12
+
+# Recently verified passwords: {(password_hash, sha256(password)): expiry}
+# Lets repeated logins within the window skip a full bcrypt check.
+# verify_password() runs in worker threads, so access goes through the lock.
+_verified_passwords: dict[tuple[str, str], float] = {}
+_verified_passwords_lock = threading.Lock()
+VERIFIED_PASSWORD_TTL = 30  # seconds
+
+
+# Auth settings from the environment, read once by load_auth_config()
+_AUTH_ENABLED = False
+_AUTH_USERNAME = b"admin"
+_AUTH_PASSWORD_HASH = ""
+
+
+def load_auth_config():
+    """
+    Read the auth settings from the environment.
+
+    Called once at import so request handlers don't re-read the environment;
+    call again if DEPLOYMENT_TYPE, AUTH_USERNAME or AUTH_PASSWORD_HASH change.
+    """
+    global _AUTH_ENABLED, _AUTH_USERNAME, _AUTH_PASSWORD_HASH
+    _AUTH_ENABLED = os.getenv("DEPLOYMENT_TYPE", "local").lower() == "production"
+    _AUTH_USERNAME = os.getenv("AUTH_USERNAME", "admin").encode()
+    _AUTH_PASSWORD_HASH = os.getenv("AUTH_PASSWORD_HASH", "")
+
+
+load_auth_config()
+
 
 def is_auth_enabled() -> bool:
     """Check if authentication is enabled (production mode)"""
-    return os.getenv("DEPLOYMENT_TYPE", "local").lower() == "production"
+    return _AUTH_ENABLED
+
+
+@lru_cache(maxsize=1)
+def _get_dummy_hash() -> bytes:
+    """Get a dummy hash at the configured bcrypt cost, so its timing matches real hashes"""
+    import bcrypt
+
+    cost = get_settings().auth_bcrypt_cost
+    if cost == _DUMMY_HASH_COST:
+        return _DUMMY_HASH
+    return bcrypt.hashpw(secrets.token_bytes(16), bcrypt.gensalt(rounds=cost))
+
+
+def _check_dummy_hash(plain_password: str):
+    """Run bcrypt against the dummy hash to match the timing of a real check"""
+    import bcrypt
+
+    bcrypt.checkpw(plain_password.encode(), _get_dummy_hash())
 
 
 def verify_password(plain_password: str, password_hash: str) -> bool:
-    """Verify password against bcrypt hash"""
+    """
+    Verify password against bcrypt hash.
+
+    This is CPU-bound (100ms+ at cost 12); async callers should run it
+    with asyncio.to_thread() so it doesn't block the event loop.
+    """
+    # Imported here since bcrypt is only needed once someone logs in
+    import bcrypt
+
+    if not password_hash:
+        _check_dummy_hash(plain_password)
+        return False
+
+    now = time.monotonic()
+    cache_key = (password_hash, hashlib.sha256(plain_password.encode()).hexdigest())
+    with _verified_passwords_lock:
+        expiry = _verified_passwords.get(cache_key)
+    if expiry is not None and now < expiry:
+        return True
+
     try:
-        return bcrypt.checkpw(plain_password.encode(), password_hash.encode())
+        verified = bcrypt.checkpw(plain_password.encode(), password_hash.encode())
     except Exception as e:
         logger.error(f"Password verification error: {e}")
+        _check_dummy_hash(plain_password)
         return False
 
+    if verified:
+        with _verified_passwords_lock:
+            # Drop stale entries so the cache can't grow without bound
+            for key in [k for k, exp in _verified_passwords.items() if exp <= now]:
+                del _verified_passwords[key]
+            _verified_passwords[cache_key] = now + VERIFIED_PASSWORD_TTL
+
+    return verified
+
+
+def _create_session_token() -> str:
+    """Generate a URL-safe session token (same format as secrets.token_urlsafe)"""
+    with _entropy_lock:
+        if len(_entropy_buf) < SESSION_TOKEN_BYTES:
+            _entropy_buf.extend(os.urandom(_ENTROPY_BUFFER_SIZE))
+        raw = bytes(_entropy_buf[:SESSION_TOKEN_BYTES])
+        del _entropy_buf[:SESSION_TOKEN_BYTES]
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
 
 def create_session(username: str) -> str:
     """Create a new session token"""
-    token = secrets.token_urlsafe(32)
+    token = _create_session_token()
     _sessions[token] = {
         "username": username,
-        "created_at": datetime.utcnow(),
-        "expires_at": datetime.utcnow() + timedelta(days=7)
+        "created_at": datetime.now(timezone.utc),
+        "expires_at": time.monotonic() + SESSION_LIFETIME
     }
     logger.info(f"Session created for user: {username}")
     return token
@@ -68,7 +214,7 @@ def verify_session(token: str) -> Optional[dict]:
     if not session:
         return None
 
-    if datetime.utcnow() > session["expires_at"]:
+    if time.monotonic() > session["expires_at"]:
         # Session expired, remove it
         del _sessions[token]
         logger.info("Expired session removed")
@@ -85,46 +231,119 @@ def get_session_from_request(request: Request) -> Optional[dict]:
     return verify_session(token)
 
 
-def check_rate_limit(ip: str) -> tuple[bool, int]:
+def _evict_old_attempts(attempts: deque, now: float):
+    """Drop attempts that have fallen out of the rate limit window (oldest first)"""
+    window_start = now - RATE_LIMIT_WINDOW
+    while attempts and attempts[0][0] <= window_start:
+        attempts.popleft()
+
+
+def _limit_state(attempts: deque, now: float) -> tuple[bool, int]:
     """
-    Check if IP is rate limited for login attempts.
+    Get the rate limit state for an already-evicted attempts deque.
     Returns (is_allowed, seconds_remaining)
     """
-    now = datetime.utcnow()
-    window_start = now - timedelta(seconds=RATE_LIMIT_WINDOW)
-
-    # Clean up old attempts
-    if ip in _login_attempts:
-        _login_attempts[ip] = [
-            (ts, success) for ts, success in _login_attempts[ip]
-            if ts > window_start
-        ]
-
-    attempts = _login_attempts.get(ip, [])
-    failed_attempts = [(ts, success) for ts, success in attempts if not success]
-
-    if len(failed_attempts) >= RATE_LIMIT_MAX_ATTEMPTS:
-        # Find oldest attempt in window to calculate remaining time
-        oldest = min(ts for ts, _ in failed_attempts)
-        seconds_remaining = int((oldest + timedelta(seconds=RATE_LIMIT_WINDOW) - now).total_seconds())
+    # Attempts are in time order, so the first failure seen is the oldest
+    failed_count = 0
+    oldest_failure = None
+    for ts, success in attempts:
+        if not success:
+            failed_count += 1
+            if oldest_failure is None:
+                oldest_failure = ts
+
+    if failed_count >= RATE_LIMIT_MAX_ATTEMPTS:
+        seconds_remaining = int(oldest_failure + RATE_LIMIT_WINDOW - now)
         return False, max(0, seconds_remaining)
 
     return True, 0
 
 
+def check_rate_limit(ip: str) -> tuple[bool, int]:
+    """
+    Check if IP is rate limited for login attempts.
+    Returns (is_allowed, seconds_remaining)
+    """
+    attempts = _login_attempts.get(ip)
+    if not attempts:
+        return True, 0
+
+    now = time.monotonic()
+    _evict_old_attempts(attempts, now)
+    return _limit_state(attempts, now)
+
+
+def sweep_expired() -> tuple[int, int]:
+    """
+    Remove expired sessions and stale rate-limit entries.
+
+    Expired sessions are otherwise only removed when they're looked up again,
+    and IPs that never retry would keep their login attempts forever.
+
+    Returns:
+        Tuple of (sessions removed, IPs removed)
+    """
+    now = time.monotonic()
+
+    # Snapshot first - logins may add entries while we sweep
+    expired_tokens = [token for token, session in list(_sessions.items()) if now > session["expires_at"]]
+    for token in expired_tokens:
+        _sessions.pop(token, None)
+
+    stale_ips = []
+    for ip, attempts in list(_login_attempts.items()):
+        _evict_old_attempts(attempts, now)
+        if not attempts:
+            stale_ips.append(ip)
+    for ip in stale_ips:
+        _login_attempts.pop(ip, None)
+
+    return len(expired_tokens), len(stale_ips)
+
+
+async def run_auth_janitor():
+    """
+    Background task that sweeps expired auth state every RATE_LIMIT_WINDOW.
+    Runs until cancelled.
+    """
+    while True:
+        await asyncio.sleep(RATE_LIMIT_WINDOW)
+        try:
+            sessions_removed, ips_removed = sweep_expired()
+            if sessions_removed or ips_removed:
+                logger.debug(
+                    f"Auth janitor removed {sessions_removed} expired sessions "
+                    f"and {ips_removed} stale rate-limit entries"
+                )
+        except Exception as e:
+            logger.error(f"Auth janitor sweep failed: {e}")
+
+
+def _append_attempt(ip: str, success: bool, now: float) -> deque:
+    """Append a login attempt and evict expired ones, returning the IP's attempts"""
+    attempts = _login_attempts.get(ip)
+    if attempts is None:
+        attempts = _login_attempts[ip] = deque()
+    attempts.append((now, success))
+
+    # Keep only recent attempts
+    _evict_old_attempts(attempts, now)
+    return attempts
+
+
 def record_login_attempt(ip: str, success: bool):
     """Record a login attempt for rate limiting"""
-    now = datetime.utcnow()
-    if ip not in _login_attempts:
-        _login_attempts[ip] = []
-    _login_attempts[ip].append((now, success))
+    _append_attempt(ip, success, time.monotonic())
 
-    # Keep only recent attempts
-    window_start = now - timedelta(seconds=RATE_LIMIT_WINDOW)
-    _login_attempts[ip] = [
-        (ts, s) for ts, s in _login_attempts[ip]
-        if ts > window_start
-    ]
+
+def _record_and_check(ip: str, success: bool) -> tuple[bool, int]:
+    """
+    Record a login attempt and return the resulting rate limit state in one pass.
+    Returns (is_allowed, seconds_remaining)
+    """
+    now = time.monotonic()
+    attempts = _append_attempt(ip, success, now)
+    return _limit_state(attempts, now)
 
 
 @router.get("/login", response_class=HTMLResponse)
@@ -139,15 +358,7 @@ async def login_page(request: Request):
     if session:
         return RedirectResponse(url="/", status_code=303)
 
-    return templates.TemplateResponse(
-        "login.html",
-        {
-            "request": request,
-            "error": None,
-            "rate_limited": False,
-            "wait_seconds": 0
-        }
-    )
+    return _login_response()
 
 
 @router.post("/login")
@@ -168,37 +379,21 @@ async def login(
     is_allowed, wait_seconds = check_rate_limit(client_ip)
     if not is_allowed:
         logger.warning(f"Rate limited login attempt from {client_ip}")
-        return templates.TemplateResponse(
-            "login.html",
-            {
-                "request": request,
-                "error": None,
-                "rate_limited": True,
-                "wait_seconds": wait_seconds
-            },
-            status_code=429
-        )
-
-    # Get expected credentials from environment
-    expected_username = os.getenv("AUTH_USERNAME", "admin")
-    expected_password_hash = os.getenv("AUTH_PASSWORD_HASH", "")
-
-    # Verify credentials
-    if username != expected_username or not verify_password(password, expected_password_hash):
-        record_login_attempt(client_ip, success=False)
+        return _login_response(rate_limited=True, wait_seconds=wait_seconds, status_code=429)
+
+    # Verify credentials. The password is always checked, even for an unknown
+    # username, so both failures take the same time.
+    password_ok = await asyncio.to_thread(verify_password, password, _AUTH_PASSWORD_HASH)
+    username_ok = secrets.compare_digest(username.encode(), _AUTH_USERNAME)
+    if not (username_ok and password_ok):
+        # Record the failure and check if now rate limited
+        is_allowed, wait_seconds = _record_and_check(client_ip, success=False)
         logger.warning(f"Failed login attempt for user '{username}' from {client_ip}")
 
-        # Check if now rate limited
-        is_allowed, wait_seconds = check_rate_limit(client_ip)
-
-        return templates.TemplateResponse(
-            "login.html",
-            {
-                "request": request,
-                "error": "Invalid username or password",
-                "rate_limited": not is_allowed,
-                "wait_seconds": wait_seconds
-            },
+        return _login_response(
+            error="Invalid username or password",
+            rate_limited=not is_allowed,
+            wait_seconds=wait_seconds,
             status_code=401
         )
 
@@ -217,7 +412,7 @@ async def login(
         httponly=True,
         secure=True,  # HTTPS only in production
         samesite="lax",
-        max_age=7 * 24 * 60 * 60  # 7 days
+        max_age=SESSION_LIFETIME
     )
 
     return response
@@ -228,10 +423,9 @@ async def logout(request: Request):
     """Logout and clear session"""
     token = request.cookies.get("session_token")
 
-    if token and token in _sessions:
-        username = _sessions[token].get("username", "unknown")
-        del _sessions[token]
-        logger.info(f"User '{username}' logged out")
+    session = _sessions.pop(token, None) if token else None
+    if session:
+        logger.info(f"User '{session.get('username', 'unknown')}' logged out")
 
     response = RedirectResponse(url="/login", status_code=303)
     response.delete_cookie("session_token")
@@ -256,43 +450,36 @@ class AuthMiddleware(BaseHTTPMiddleware):
     CSRF_PROTECTED_METHODS = {"POST", "PUT", "DELETE", "PATCH"}
 
     # API paths that need CSRF protection (when using protected methods)
-    API_PREFIXES = ["/api/", "/stalker/api/", "/threats/api/", "/pulse/api/"]
+    API_PREFIXES = ("/api/", "/stalker/api/", "/threats/api/", "/pulse/api/")
 
     # Paths exempt from CSRF (login form uses traditional form submission)
-    CSRF_EXEMPT_PATHS = ["/login"]
+    CSRF_EXEMPT_PATHS = ("/login",)
+
+    # Paths allowed without authentication, along with anything below them.
+    # Tuples so str.startswith() can check every prefix in one call.
+    PUBLIC_PATHS = frozenset({"/login", "/static", "/health", "/favicon.ico"})
+    PUBLIC_PREFIXES = tuple(f"{p}/" for p in PUBLIC_PATHS)
 
     async def dispatch(self, request: Request, call_next):
         # Skip all checks if not in production mode
-        if not is_auth_enabled():
+        if not _AUTH_ENABLED:
             return await call_next(request)
 
-        # Allow these paths without authentication
-        public_paths = [
-            "/login",
-            "/static",
-            "/health",
-            "/favicon.ico"
-        ]
-
         path = request.url.path
         method = request.method
 
-        # Check if path is public
-        is_public = any(
-            path == p or path.startswith(f"{p}/") or path.startswith(f"{p}?")
-            for p in public_paths
-        )
-
-        if is_public:
+        # Allow public paths without authentication
+        if path in self.PUBLIC_PATHS or path.startswith(self.PUBLIC_PREFIXES):
             return await call_next(request)
 
-        # Check for valid session
+        # Check for valid session, and keep it for get_current_user
         session = get_session_from_request(request)
+        request.state.session = session
 
         if not session:
             # Not authenticated, redirect to login
             # For API requests, return 401 instead of redirect
-            if any(path.startswith(prefix) for prefix in self.API_PREFIXES):
+            if path.startswith(self.API_PREFIXES):
                 from fastapi.responses import JSONResponse
                 return JSONResponse(
                     status_code=401,
@@ -303,8 +490,8 @@ class AuthMiddleware(BaseHTTPMiddleware):
 
         # CSRF Protection for state-changing requests
         if method in self.CSRF_PROTECTED_METHODS:
-            is_api_request = any(path.startswith(prefix) for prefix in self.API_PREFIXES)
-            is_csrf_exempt = any(path.startswith(exempt) for exempt in self.CSRF_EXEMPT_PATHS)
+            is_api_request = path.startswith(self.API_PREFIXES)
+            is_csrf_exempt = path.startswith(self.CSRF_EXEMPT_PATHS)
 
             if is_api_request and not is_csrf_exempt:
                 # Require X-Requested-With header for API state-changing requests
@@ -329,7 +516,10 @@ def get_current_user(request: Request) -> dict:
     if not is_auth_enabled():
         return {"username": "local", "local_mode": True}
 
-    session = get_session_from_request(request)
+    # Reuse the session AuthMiddleware already resolved for this request
+    session = getattr(request.state, "session", None)
+    if session is None:
+        session = get_session_from_request(request)
     if not session:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
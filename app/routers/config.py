@@ -3,15 +3,16 @@ UniFi configuration API endpoints for the main dashboard
 """
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from datetime import datetime, timezone
 from pydantic import BaseModel, Field
 from typing import Optional
 
 from shared.database import get_db_session
 from shared.models.unifi_config import UniFiConfig
-from shared.crypto import encrypt_password, decrypt_password, encrypt_api_key, decrypt_api_key
+from shared.crypto import encrypt_credentials
 from shared.unifi_client import UniFiClient
+from shared.unifi_pool import load_unifi_credentials, get_unifi_client, invalidate_unifi_client
 
 router = APIRouter(prefix="/api/config", tags=["configuration"])
 
@@ -102,16 +103,9 @@ async def save_unifi_config(
         # Invalidate cache since config is changing
         cache.invalidate_all()
 
-        # Encrypt credentials
-        encrypted_password = None
-        encrypted_api_key = None
-
-        if config.password:
-            logger.debug("Encrypting password...")
-            encrypted_password = encrypt_password(config.password)
-        if config.api_key:
-            logger.debug("Encrypting API key...")
-            encrypted_api_key = encrypt_api_key(config.api_key)
+        # Encrypt password and API key together
+        logger.debug("Encrypting credentials...")
+        encrypted_credentials = encrypt_credentials(config.password or None, config.api_key or None)
 
         # Check if config already exists
         logger.debug("Checking for existing config...")
@@ -126,8 +120,10 @@ async def save_unifi_config(
             logger.debug("Updating existing config...")
             existing_config.controller_url = config.controller_url
             existing_config.username = config.username
-            existing_config.password_encrypted = encrypted_password
-            existing_config.api_key_encrypted = encrypted_api_key
+            existing_config.credentials_encrypted = encrypted_credentials
+            existing_config.has_api_key = bool(config.api_key)
+            existing_config.password_encrypted = None
+            existing_config.api_key_encrypted = None
             existing_config.site_id = config.site_id
             existing_config.verify_ssl = config.verify_ssl
             existing_config.is_unifi_os = is_unifi_os
@@ -138,8 +134,8 @@ async def save_unifi_config(
                 id=1,
                 controller_url=config.controller_url,
                 username=config.username,
-                password_encrypted=encrypted_password,
-                api_key_encrypted=encrypted_api_key,
+                credentials_encrypted=encrypted_credentials,
+                has_api_key=bool(config.api_key),
                 site_id=config.site_id,
                 verify_ssl=config.verify_ssl,
                 is_unifi_os=is_unifi_os
@@ -148,6 +144,12 @@ async def save_unifi_config(
 
         logger.debug("Committing to database...")
         await db.commit()
+
+        # Drop anything cached from the old config while the commit was in flight,
+        # and disconnect the shared client so it logs in with the new credentials
+        cache.invalidate_credentials()
+        cache.invalidate("system_status")
+        await invalidate_unifi_client()
         logger.info("UniFi configuration saved successfully")
 
         return SuccessResponse(
@@ -186,7 +188,7 @@ async def get_unifi_config(
         id=config.id,
         controller_url=config.controller_url,
         username=config.username,
-        has_api_key=config.api_key_encrypted is not None,
+        has_api_key=config.has_api_key,
         site_id=config.site_id,
         verify_ssl=config.verify_ssl,
         is_unifi_os=config.is_unifi_os,
@@ -229,50 +231,47 @@ async def test_saved_unifi_connection(
     """
     Test connection using saved UniFi configuration
     """
-    # Get config from database
-    result = await db.execute(select(UniFiConfig).where(UniFiConfig.id == 1))
-    config = result.scalar_one_or_none()
+    # Get decrypted config (cached between requests)
+    try:
+        credentials = await load_unifi_credentials()
+    except Exception as e:
+        return UniFiConnectionTest(
+            connected=False,
+            error=f"Failed to decrypt credentials: {str(e)}"
+        )
 
-    if not config:
+    if not credentials:
         return UniFiConnectionTest(
             connected=False,
             error="UniFi configuration not found. Please configure your UniFi controller first."
         )
 
-    # Decrypt credentials
-    password = None
-    api_key = None
-
-    try:
-        if config.password_encrypted:
-            password = decrypt_password(config.password_encrypted)
-        if config.api_key_encrypted:
-            api_key = decrypt_api_key(config.api_key_encrypted)
-    except Exception as e:
+    # Test through the shared client, so a working connection is reused
+    # rather than logging in again
+    client = await get_unifi_client(credentials)
+    if client is None:
         return UniFiConnectionTest(
             connected=False,
-            error=f"Failed to decrypt credentials: {str(e)}"
+            error="Failed to connect to UniFi controller"
         )
 
-    # Create UniFi client and test connection
-    # is_unifi_os is auto-detected during connection
-    client = UniFiClient(
-        host=config.controller_url,
-        username=config.username,
-        password=password,
-        api_key=api_key,
-        site=config.site_id,
-        verify_ssl=config.verify_ssl
+    try:
+        clients = await client.get_clients(force=True)
+        await client.get_access_points()
+    except Exception as e:
+        # The controller session may have gone stale - reconnect next time
+        await invalidate_unifi_client(client)
+        return UniFiConnectionTest(connected=False, error=str(e))
+
+    # Update last successful connection time
+    await db.execute(
+        update(UniFiConfig)
+        .where(UniFiConfig.id == 1)
+        .values(last_successful_connection=datetime.now(timezone.utc))
     )
+    await db.commit()
 
-    test_result = await client.test_connection()
-
-    # Update last successful connection time if successful
-    if test_result.get("connected"):
-        config.last_successful_connection = datetime.now(timezone.utc)
-        await db.commit()
-
-    return UniFiConnectionTest(**test_result)
+    return UniFiConnectionTest(connected=True, client_count=len(clients))
 
 
 @router.get("/gateway-check", response_model=GatewayCheckResponse)
@@ -339,57 +338,36 @@ async def check_gateway_availability(
     # No cache - need to check config and possibly connect
     logger.debug("No cached gateway info, checking config")
 
-    # Get config from database
-    result = await db.execute(select(UniFiConfig).where(UniFiConfig.id == 1))
-    config = result.scalar_one_or_none()
+    # Get decrypted config (cached between requests)
+    try:
+        credentials = await load_unifi_credentials()
+    except Exception as e:
+        return GatewayCheckResponse(
+            has_gateway=False,
+            configured=True,
+            error=f"Failed to decrypt credentials: {str(e)}"
+        )
 
-    if not config:
+    if not credentials:
         return GatewayCheckResponse(
             has_gateway=False,
             configured=False,
             error="UniFi controller not configured"
         )
 
-    # Decrypt credentials
-    password = None
-    api_key = None
-
-    try:
-        if config.password_encrypted:
-            password = decrypt_password(config.password_encrypted)
-        if config.api_key_encrypted:
-            api_key = decrypt_api_key(config.api_key_encrypted)
-    except Exception as e:
+    # Reuse the shared, already logged-in client (auto-detects UniFi OS vs legacy)
+    client = await get_unifi_client(credentials)
+    if client is None:
         return GatewayCheckResponse(
             has_gateway=False,
+            supports_ids_ips=False,
             configured=True,
-            error=f"Failed to decrypt credentials: {str(e)}"
+            error="Failed to connect to UniFi controller"
         )
 
-    # Create UniFi client and check for gateway
-    # is_unifi_os is auto-detected during connection
-    client = UniFiClient(
-        host=config.controller_url,
-        username=config.username,
-        password=password,
-        api_key=api_key,
-        site=config.site_id,
-        verify_ssl=config.verify_ssl
-    )
-
     try:
-        # Connect to controller (auto-detects UniFi OS vs legacy)
-        connected = await client.connect()
-        if not connected:
-            return GatewayCheckResponse(
-                has_gateway=False,
-                supports_ids_ips=False,
-                configured=True,
-                error="Failed to connect to UniFi controller"
-            )
-
         # Get gateway info including IDS/IPS support
-        gateway_info = await client.get_gateway_info()
+        gateway_info = await client.get_gateway_info(force=True)
 
         # Cache the result for future requests
         cache.set_gateway_info({
@@ -430,11 +408,11 @@ async def check_gateway_availability(
         )
 
     except Exception as e:
+        # The controller session may have gone stale - reconnect next time
+        await invalidate_unifi_client(client)
         return GatewayCheckResponse(
             has_gateway=False,
             supports_ids_ips=False,
             configured=True,
             error=str(e)
         )
-    finally:
-        await client.disconnect()
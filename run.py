@@ -52,14 +52,38 @@ if not encryption_key:
 # This runs in a normal synchronous context, avoiding any async/uvicorn complications
 def run_migrations():
     """Run Alembic migrations before uvicorn starts."""
+    from shared.migrations import migration_lock, repair_schema
+
+    # Only one process migrates at a time; any others wait here and then
+    # find the schema already at head
+    try:
+        with migration_lock():
+            _upgrade_schema()
+    except Exception as e:
+        print(f"Migration warning: could not acquire migration lock: {e}")
+
+    # Always run schema repair after migrations to catch cases where
+    # stamping to head skipped actual column additions
+    repair_schema()
+
+
+def _upgrade_schema():
+    """Upgrade the database to the latest migration, stamping on schema sync issues."""
     try:
         from alembic.config import Config
         from alembic import command
 
-        print("Running database migrations...")
+        from shared.migrations import is_at_head
+
         alembic_cfg = Config("alembic.ini")
-        command.upgrade(alembic_cfg, "head")
-        print("Database migrations completed successfully")
+
+        # Nothing to do on a warm restart - skip loading the Alembic environment
+        if is_at_head(alembic_cfg):
+            print("Database schema at head, skipping migrations")
+        else:
+            print("Running database migrations...")
+            command.upgrade(alembic_cfg, "head")
+            print("Database migrations completed successfully")
 
     except Exception as e:
         error_msg = str(e).lower()
@@ -91,57 +115,10 @@ def run_migrations():
             print(f"Migration warning: {e}")
             print("The application will continue, but some features may not work correctly.")
 
-    # Always run schema repair after migrations to catch cases where
-    # stamping to head skipped actual column additions
-    _repair_schema()
-
-
-def _repair_schema():
-    """
-    Check for and add missing columns that migrations may have skipped.
-
-    This handles the case where init_db's create_all creates new tables,
-    causing alembic to fail with 'already exists' and stamp to head,
-    skipping ADD COLUMN operations on existing tables.
-    """
-    import sqlite3
-    from pathlib import Path
-
-    db_path = Path("./data/unifi_toolkit.db")
-    if not db_path.exists():
-        return  # No database yet, nothing to repair
-
-    try:
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
-
-        # Get existing columns for threats_events
-        cursor.execute("PRAGMA table_info(threats_events)")
-        existing_columns = {row[1] for row in cursor.fetchall()}
-
-        if not existing_columns:
-            conn.close()
-            return  # Table doesn't exist yet
-
-        # Check for missing columns and add them
-        missing_columns = {
-            'ignored': "ALTER TABLE threats_events ADD COLUMN ignored BOOLEAN NOT NULL DEFAULT 0",
-            'ignored_by_rule_id': "ALTER TABLE threats_events ADD COLUMN ignored_by_rule_id INTEGER",
-        }
-
-        for col_name, sql in missing_columns.items():
-            if col_name not in existing_columns:
-                print(f"Schema repair: adding missing column '{col_name}' to threats_events")
-                cursor.execute(sql)
-
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"Schema repair warning: {e}")
-
 
 # Start the application
 if __name__ == "__main__":
+    import logging
     import uvicorn
     from shared.config import get_settings
     from app import __version__ as app_version
@@ -150,56 +127,55 @@ if __name__ == "__main__":
     from tools.network_pulse import __version__ as pulse_version
 
     # Run migrations FIRST, before any uvicorn/async stuff
-    run_migrations()
+    # MIGRATION_MODE=async defers them to a background task inside the app,
+    # MIGRATION_MODE=skip disables them entirely
+    migration_mode = os.getenv("MIGRATION_MODE", "sync").lower()
+    if migration_mode not in ("async", "skip"):
+        run_migrations()
 
     settings = get_settings()
 
-    print("=" * 70)
-    print("Starting UI Toolkit...")
-    print("=" * 70)
-    print()
-    print(f"Version: {app_version}")
-    print(f"Log Level: {settings.log_level}")
-    print(f"Database: {settings.database_url}")
-    print()
-
-    # Display deployment mode
-    deployment_type = settings.deployment_type.upper()
-    if deployment_type == "PRODUCTION":
-        print(f"Deployment: PRODUCTION (authentication enabled)")
-        if settings.domain:
-            print(f"Domain: {settings.domain}")
-    else:
-        print(f"Deployment: LOCAL (authentication disabled)")
-    print()
-
-    print("Available tools:")
-    print(f"  - Wi-Fi Stalker v{stalker_version}")
-    print(f"  - Threat Watch v{threat_watch_version}")
-    print(f"  - Network Pulse v{pulse_version}")
-    print()
+    # Same format app.main configures, so the startup line matches the app's logs
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level.upper(), logging.INFO),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger = logging.getLogger("run")
 
-    if deployment_type == "PRODUCTION":
-        print("Access via your configured domain with HTTPS")
+    production = settings.deployment_type.lower() == "production"
+    if production:
+        access = f"https://{settings.domain}" if settings.domain else "configured domain (HTTPS)"
     else:
-        print(f"Access the dashboard at: http://localhost:{settings.app_port}")
-        print(f"Wi-Fi Stalker at: http://localhost:{settings.app_port}/stalker/")
-        print(f"Threat Watch at: http://localhost:{settings.app_port}/threats/")
-        print(f"Network Pulse at: http://localhost:{settings.app_port}/pulse/")
-    print()
-    print("Press Ctrl+C to stop the server")
-    print("=" * 70)
-    print()
+        access = f"http://localhost:{settings.app_port}"
+
+    logger.info(
+        "UI Toolkit %s starting | deployment=%s auth=%s | db=%s | log=%s | "
+        "tools: stalker=%s threat_watch=%s pulse=%s | url=%s",
+        app_version,
+        settings.deployment_type.lower(),
+        "enabled" if production else "disabled",
+        settings.database_url,
+        settings.log_level,
+        stalker_version,
+        threat_watch_version,
+        pulse_version,
+        access
+    )
 
     # Configure logging level
     log_level = settings.log_level.lower()
 
     # Start uvicorn server
+    from app.main import WS_PING_INTERVAL_SECONDS, WS_PING_TIMEOUT_SECONDS
+
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=settings.app_port,
         reload=False,  # Set to True for development
         log_level=log_level,
-        access_log=True
+        access_log=True,
+        # Protocol-level WebSocket pings keep /ws connections alive
+        ws_ping_interval=WS_PING_INTERVAL_SECONDS,
+        ws_ping_timeout=WS_PING_TIMEOUT_SECONDS
     )
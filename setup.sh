@@ -105,10 +105,12 @@ generate_encryption_key() {
 hash_password() {
     local password="$1"
     echo "$password" | $PYTHON_CMD -c "
+import os
 import sys
 import bcrypt
 password = sys.stdin.readline().rstrip('\n')
-print(bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode())
+rounds = int(os.environ.get('AUTH_BCRYPT_COST') or 12)
+print(bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode())
 " 2>/dev/null || {
         print_error "Failed to hash password"
         print_info "Make sure bcrypt is installed: pip install bcrypt"
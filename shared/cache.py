@@ -13,17 +13,25 @@ logger = logging.getLogger(__name__)
 # Cache TTL in seconds (how long before data is considered stale)
 CACHE_TTL_SECONDS = 30
 
+# System status includes live health stats, so it is only reused briefly
+# to collapse concurrent dashboard polls into one controller round-trip
+SYSTEM_STATUS_TTL_SECONDS = 5
+
+# Decrypted credentials are dropped whenever the config is saved; the TTL
+# is only a backstop in case the row changes some other way
+CREDENTIALS_TTL_SECONDS = 300
+
 # Global cache storage
 _cache: Dict[str, Dict[str, Any]] = {}
 
 
-def _is_expired(cache_entry: Dict[str, Any]) -> bool:
+def _is_expired(cache_entry: Dict[str, Any], ttl_seconds: float = CACHE_TTL_SECONDS) -> bool:
     """Check if a cache entry has expired."""
     if not cache_entry or "timestamp" not in cache_entry:
         return True
 
     age = datetime.now(timezone.utc) - cache_entry["timestamp"]
-    return age.total_seconds() > CACHE_TTL_SECONDS
+    return age.total_seconds() > ttl_seconds
 
 
 def get_gateway_info() -> Optional[Dict]:
@@ -90,7 +98,7 @@ def get_system_status() -> Optional[Dict]:
         System status dict if cached and not expired, None otherwise
     """
     entry = _cache.get("system_status")
-    if entry and not _is_expired(entry):
+    if entry and not _is_expired(entry, SYSTEM_STATUS_TTL_SECONDS):
         logger.debug("Returning cached system status")
         return entry.get("data")
     return None
@@ -110,6 +118,45 @@ def set_system_status(data: Dict):
     logger.debug("Cached system status")
 
 
+def get_cached_credentials() -> Optional[Dict]:
+    """
+    Get cached decrypted UniFi credentials.
+
+    Credentials are dropped when the config is saved or the cache is
+    invalidated, and otherwise kept for CREDENTIALS_TTL_SECONDS.
+
+    Returns:
+        Credentials dict if cached and not expired, None otherwise
+    """
+    entry = _cache.get("credentials")
+    if entry and not _is_expired(entry, CREDENTIALS_TTL_SECONDS):
+        return entry.get("data")
+    return None
+
+
+def set_cached_credentials(data: Dict):
+    """
+    Cache decrypted UniFi credentials.
+
+    Args:
+        data: Dict with controller_url, username, password, api_key,
+              site_id and verify_ssl
+    """
+    _cache["credentials"] = {
+        "data": data,
+        "timestamp": datetime.now(timezone.utc)
+    }
+    logger.debug("Cached UniFi credentials")
+
+
+def invalidate_credentials():
+    """
+    Drop cached UniFi credentials.
+    Call this whenever the saved UniFi config changes.
+    """
+    invalidate("credentials")
+
+
 def invalidate_all():
     """
     Invalidate all cached data.
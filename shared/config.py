@@ -1,6 +1,8 @@
 """
 Configuration management for UI Toolkit
 """
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -17,6 +19,9 @@ class ToolkitSettings(BaseSettings):
     domain: Optional[str] = None
     auth_username: str = "admin"
     auth_password_hash: Optional[str] = None
+    # bcrypt work factor for new password hashes. Each step doubles the CPU
+    # time of every login check; lower it on slow hardware.
+    auth_bcrypt_cost: int = 12
 
     # Database
     database_url: str = "sqlite+aiosqlite:///./data/unifi_toolkit.db"
@@ -43,14 +48,11 @@ class ToolkitSettings(BaseSettings):
         extra = "ignore"
 
 
-_settings: Optional[ToolkitSettings] = None
-
-
+@lru_cache(maxsize=1)
 def get_settings() -> ToolkitSettings:
     """
     Get the global settings instance (singleton pattern)
+
+    Use get_settings.cache_clear() to reload settings from the environment.
     """
-    global _settings
-    if _settings is None:
-        _settings = ToolkitSettings()
-    return _settings
+    return ToolkitSettings()
@@ -1,6 +1,9 @@
 """
 Encryption utilities for secure credential storage
 """
+import json
+from typing import Optional
+
 from cryptography.fernet import Fernet
 from shared.config import get_settings
 
@@ -62,6 +65,48 @@ encrypt_api_key = encrypt_password
 decrypt_api_key = decrypt_password
 
 
+def encrypt_credentials(password: Optional[str], api_key: Optional[str]) -> bytes:
+    """
+    Encrypt a password and API key together as a single Fernet token,
+    so reading them back costs one decryption instead of two
+
+    Args:
+        password: Plain text password, or None
+        api_key: Plain text API key, or None
+
+    Returns:
+        Encrypted credentials as bytes
+    """
+    cipher = get_cipher()
+    return cipher.encrypt(json.dumps({"pw": password, "ak": api_key}).encode())
+
+
+def decrypt_credentials(config) -> tuple[Optional[str], Optional[str]]:
+    """
+    Decrypt the stored credentials of a UniFiConfig row
+
+    Reads the packed credentials_encrypted column, falling back to the
+    separate password/API key columns for rows saved before it existed.
+
+    Args:
+        config: UniFiConfig row
+
+    Returns:
+        Tuple of (password, api_key), either of which may be None
+    """
+    if config.credentials_encrypted:
+        data = json.loads(get_cipher().decrypt(config.credentials_encrypted))
+        return data.get("pw"), data.get("ak")
+
+    password = None
+    api_key = None
+    if config.password_encrypted:
+        password = decrypt_password(config.password_encrypted)
+    if config.api_key_encrypted:
+        api_key = decrypt_api_key(config.api_key_encrypted)
+    return password, api_key
+
+
 def generate_key() -> str:
     """
     Generate a new Fernet encryption key
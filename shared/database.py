@@ -3,7 +3,8 @@ Database connection and session management for UI Toolkit
 """
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator
 from pathlib import Path
 from shared.config import get_settings
 from shared.models.base import Base
@@ -20,9 +21,13 @@ class Database:
         self.engine = None
         self.async_session_factory = None
 
-    async def init_db(self):
+    async def init_db(self, create_tables: bool = True):
         """
         Initialize database connection and create tables
+
+        Args:
+            create_tables: Also create missing tables; pass False when
+                migrations are still running and call create_tables() later
         """
         settings = get_settings()
 
@@ -47,19 +52,30 @@ class Database:
             expire_on_commit=False
         )
 
+        if create_tables:
+            await self.create_tables()
+
+        logger.info("Database initialized successfully")
+
+    async def create_tables(self):
+        """
+        Create any tables that don't exist yet
+        """
         # Import all models to ensure they're registered with Base
         from shared.models.unifi_config import UniFiConfig
         # Tool models will be imported by their respective tools
 
-        # Create all tables
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
 
-        logger.info("Database initialized successfully")
-
-    async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
         """
-        Get an async database session
+        Open a database session that is closed when the block exits
+
+        Usage:
+            async with db.session() as session:
+                ...
 
         Yields:
             AsyncSession: Database session
@@ -70,6 +86,16 @@ class Database:
         async with self.async_session_factory() as session:
             yield session
 
+    async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Get an async database session
+
+        Yields:
+            AsyncSession: Database session
+        """
+        async with self.session() as session:
+            yield session
+
     async def close(self):
         """
         Close database engine and cleanup resources
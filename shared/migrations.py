@@ -0,0 +1,155 @@
+"""
+Helpers for running Alembic migrations at startup
+"""
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import create_engine, pool, text
+
+from shared.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Fixed pg_advisory_lock key shared by every process migrating the database
+PG_MIGRATION_LOCK_KEY = 782938471
+
+
+def get_migration_url() -> str:
+    """
+    Get the synchronous database URL used for migrations
+    (same conversion as alembic/env.py)
+    """
+    return get_settings().database_url.replace("sqlite+aiosqlite", "sqlite")
+
+
+def is_at_head(alembic_cfg) -> bool:
+    """
+    Check whether the database is already at the latest migration revision.
+
+    Reads the script heads from disk and alembic_version from the database
+    directly, without loading env.py or starting a migration context.
+
+    Args:
+        alembic_cfg: Alembic Config for the project
+
+    Returns:
+        True if the stored revisions match the script heads, False otherwise
+        (including when the database or version table doesn't exist yet)
+    """
+    from alembic.script import ScriptDirectory
+
+    try:
+        heads = set(ScriptDirectory.from_config(alembic_cfg).get_heads())
+
+        engine = create_engine(get_migration_url(), poolclass=pool.NullPool)
+        try:
+            with engine.connect() as conn:
+                current = {
+                    row[0] for row in conn.execute(text("SELECT version_num FROM alembic_version"))
+                }
+        finally:
+            engine.dispose()
+    except Exception as e:
+        logger.debug("Could not read migration revision, assuming upgrade needed: %s", e)
+        return False
+
+    return bool(heads) and current == heads
+
+
+def repair_schema():
+    """
+    Check for and add missing columns that migrations may have skipped.
+
+    This handles the case where init_db's create_all creates new tables,
+    causing alembic to fail with 'already exists' and stamp to head,
+    skipping ADD COLUMN operations on existing tables.
+    """
+    import sqlite3
+
+    db_path = Path("./data/unifi_toolkit.db")
+    if not db_path.exists():
+        return  # No database yet, nothing to repair
+
+    try:
+        conn = sqlite3.connect(str(db_path))
+        cursor = conn.cursor()
+
+        # Columns added by migrations, per table, and the SQL to add them
+        repairs = {
+            'threats_events': {
+                'ignored': "ALTER TABLE threats_events ADD COLUMN ignored BOOLEAN NOT NULL DEFAULT 0",
+                'ignored_by_rule_id': "ALTER TABLE threats_events ADD COLUMN ignored_by_rule_id INTEGER",
+            },
+            'unifi_config': {
+                'credentials_encrypted': "ALTER TABLE unifi_config ADD COLUMN credentials_encrypted BLOB",
+                'has_api_key': "ALTER TABLE unifi_config ADD COLUMN has_api_key BOOLEAN NOT NULL DEFAULT 0",
+            },
+        }
+
+        for table_name, missing_columns in repairs.items():
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            existing_columns = {row[1] for row in cursor.fetchall()}
+
+            if not existing_columns:
+                continue  # Table doesn't exist yet
+
+            # Check for missing columns and add them
+            for col_name, sql in missing_columns.items():
+                if col_name not in existing_columns:
+                    logger.warning("Schema repair: adding missing column '%s' to %s", col_name, table_name)
+                    cursor.execute(sql)
+                    if col_name == 'has_api_key':
+                        cursor.execute(
+                            "UPDATE unifi_config SET has_api_key = 1 WHERE api_key_encrypted IS NOT NULL"
+                        )
+
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        logger.warning("Schema repair warning: %s", e)
+
+
+@contextmanager
+def migration_lock():
+    """
+    Hold a cross-process lock while migrating, so several processes starting
+    at once don't run Alembic against the same database concurrently.
+
+    Uses a PostgreSQL advisory lock, or an exclusive flock on a lockfile next
+    to the SQLite database. Other databases (and platforms without fcntl)
+    run unlocked.
+    """
+    url = get_migration_url()
+
+    if url.startswith("postgresql"):
+        engine = create_engine(url, poolclass=pool.NullPool)
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": PG_MIGRATION_LOCK_KEY})
+                try:
+                    yield
+                finally:
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": PG_MIGRATION_LOCK_KEY})
+        finally:
+            engine.dispose()
+        return
+
+    db_path = url.split("///")[-1] if url.startswith("sqlite") and "///" in url else None
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+
+    if not db_path or db_path == ":memory:" or fcntl is None:
+        yield
+        return
+
+    lock_path = Path(db_path + ".migrate.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -3,6 +3,7 @@ UniFi Controller configuration model (shared across all tools)
 """
 from datetime import datetime, timezone
 from sqlalchemy import Boolean, Column, Integer, String, DateTime, LargeBinary, CheckConstraint
+from sqlalchemy import false as sa_false
 from shared.models.base import Base
 
 
@@ -24,11 +25,18 @@ class UniFiConfig(Base):
     # UniFi OS auth (optional if using username/password)
     api_key_encrypted = Column(LargeBinary, nullable=True)
 
+    # Password and API key packed into one encrypted blob (see
+    # shared.crypto.encrypt_credentials). Replaces the two columns above,
+    # which are only read for rows saved before it was added.
+    credentials_encrypted = Column(LargeBinary, nullable=True)
+    # Whether an API key is stored, readable without decrypting
+    has_api_key = Column(Boolean, default=False, nullable=False, server_default=sa_false())
+
     site_id = Column(String, default="default", nullable=False)
     verify_ssl = Column(Boolean, default=False, nullable=False)
     is_unifi_os = Column(Boolean, default=False, nullable=False)  # True for UDM/UDR/UCG/UX devices
     last_successful_connection = Column(DateTime, nullable=True)
 
     def __repr__(self):
-        auth_type = "API Key" if self.api_key_encrypted else "Username/Password"
+        auth_type = "API Key" if self.has_api_key else "Username/Password"
         return f"<UniFiConfig(url={self.controller_url}, site={self.site_id}, auth={auth_type})>"
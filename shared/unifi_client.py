@@ -1,8 +1,16 @@
 """
 UniFi API client wrapper using aiounifi
 """
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, AsyncIterator
+import asyncio
+import copy
+import heapq
+from collections import Counter
+import math
+import ssl
+import time
 import aiohttp
+import orjson
 from aiounifi.controller import Controller
 from aiounifi.models.configuration import Configuration
 from aiounifi.interfaces.clients import ClientListRequest
@@ -12,9 +20,135 @@ from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+# SSL contexts keyed by verify_ssl. Building one (and loading the system
+# trust store) is expensive and they're safe to share once configured.
+_SSL_CONTEXT_CACHE: Dict[bool, ssl.SSLContext] = {}
+
+
+def _get_ssl_context(verify_ssl: bool) -> ssl.SSLContext:
+    """
+    Get the shared SSL context for the given verification setting
+
+    Args:
+        verify_ssl: Whether to verify certificates. When False the context
+                    skips hostname and certificate checks (self-signed certs).
+
+    Returns:
+        Cached SSLContext
+    """
+    context = _SSL_CONTEXT_CACHE.get(verify_ssl)
+    if context is None:
+        if verify_ssl:
+            context = ssl.create_default_context()
+        else:
+            # No trust store needed when nothing is verified
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        context = _SSL_CONTEXT_CACHE.setdefault(verify_ssl, context)
+    return context
+
+
+# Shared TCP connectors keyed by verify_ssl, each paired with the event loop
+# it was created on. Every UniFiClient session uses one of these, so pooled
+# keep-alive connections and resolved addresses survive client reconnects.
+_connector_cache: Dict[bool, tuple] = {}
+
+
+# Controllers found to be legacy (non-UniFi OS), by host URL. Reconnects to
+# these skip the UniFi OS login probe and go straight to the legacy login.
+_legacy_hosts: set = set()
+
+
+def _get_connector(verify_ssl: bool) -> aiohttp.TCPConnector:
+    """
+    Get the shared TCP connector for the given verification setting
+
+    A new connector is created if there is none yet, the cached one was
+    closed, or it belongs to a different event loop.
+
+    Args:
+        verify_ssl: Whether to verify certificates
+
+    Returns:
+        Open TCPConnector bound to the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    cached = _connector_cache.get(verify_ssl)
+    if cached is not None:
+        cached_loop, connector = cached
+        if cached_loop is loop and not connector.closed:
+            return connector
+
+    # Keep idle connections past the 60s scheduler interval so each poll
+    # reuses the previous one, and cache the controller's address between
+    # polls. limit_per_host stops bursts from swamping small controllers.
+    connector = aiohttp.TCPConnector(
+        ssl=_get_ssl_context(verify_ssl),
+        limit=100,
+        limit_per_host=20,
+        ttl_dns_cache=300,
+        keepalive_timeout=75
+    )
+    _connector_cache[verify_ssl] = (loop, connector)
+    return connector
+
+
+# Seconds UniFiClient._cached_result() reuses each read for. Kept under the
+# 60s Network Pulse refresh so every refresh still sees fresh counters;
+# site stats are hourly/daily buckets and can be kept longer.
+RESULT_CACHE_TTLS = {
+    'health': 5.0,
+    'clients': 15.0,
+    'system_info': 30.0,
+    'ap_details': 30.0,
+    'site_stats': 300.0,
+}
+
+# v2 traffic-flows paging: flows per request, and how many pages to
+# request at once when a fetch needs more than one
+TRAFFIC_FLOW_PAGE_SIZE = 100
+TRAFFIC_FLOW_CONCURRENCY = 3
+
+# v2 traffic-flow risk level -> legacy severity, and flow action -> legacy action
+_V2_SEVERITY_MAP = {'high': 1, 'medium': 2, 'low': 3}
+_V2_ACTION_MAP = {
+    'allowed': 'alert',  # Detection only
+    'blocked': 'block',
+    'dropped': 'block',
+    'rejected': 'block',
+}
+
+# Key layout of a normalized v2 event (legacy stat/ips/event field names),
+# copied and filled in by _normalize_v2_event()
+_V2_EVENT_TEMPLATE = dict.fromkeys([
+    '_id', 'flow_id', 'timestamp',
+    'inner_alert_signature', 'inner_alert_signature_id', 'inner_alert_severity',
+    'inner_alert_category', 'inner_alert_action', 'msg', 'catname',
+    'src_ip', 'src_port', 'src_mac',
+    'dest_ip', 'dest_port', 'dst_mac',
+    'proto', 'app_proto', 'in_iface',
+    'src_ip_country', 'dest_ip_country',
+    'site_id',
+])
+# Mark as v2 format for debugging/logging
+_V2_EVENT_TEMPLATE['_api_version'] = 'v2'
+
+# Device kind named in a health subsystem's "N ... offline" reason
+_SUBSYSTEM_DEVICE_NAMES = {
+    'wlan': 'APs',
+    'lan': 'switches',
+}
+
+# Device types that are gateways: ugw = USG, udm = Dream Machine,
+# uxg = UXG series, ux = UniFi Express. Express can also run as a plain
+# mesh AP, so it isn't counted among the dedicated gateways.
+DEDICATED_GATEWAY_DEVICE_TYPES = frozenset({'ugw', 'udm', 'uxg'})
+GATEWAY_DEVICE_TYPES = DEDICATED_GATEWAY_DEVICE_TYPES | {'ux'}
+
 # Gateway models that support IDS/IPS
 # UniFi Express (UX, UXBSDM) does NOT support IDS/IPS
-IDS_IPS_SUPPORTED_MODELS = {
+IDS_IPS_SUPPORTED_MODELS = frozenset({
     # Dream Machine series
     "UDM",          # UDM (base)
     "UDMPRO",       # UDM Pro
@@ -42,7 +176,7 @@ IDS_IPS_SUPPORTED_MODELS = {
     "USGP4",        # USG Pro 4 (another alternate)
     "UGWHD4",       # USG HD
     "UGWXG",        # USG XG 8
-}
+})
 
 # UniFi device model code to friendly name mapping
 UNIFI_MODEL_NAMES = {
@@ -151,9 +285,192 @@ def get_friendly_model_name(model_code: str) -> str:
     """
     if not model_code:
         return "Unknown"
+    # Controllers normally report uppercase codes, so try an exact match
+    # before paying for the upper() copy
+    name = UNIFI_MODEL_NAMES.get(model_code)
+    if name is not None:
+        return name
     return UNIFI_MODEL_NAMES.get(model_code.upper(), model_code)
 
 
+def _json_dumps(obj) -> str:
+    """Serialize request bodies with orjson (aiohttp expects a str)."""
+    return orjson.dumps(obj).decode()
+
+
+# Headers for bodies posted as pre-encoded orjson bytes (data= instead of json=)
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def _normalize_mac(mac: str) -> str:
+    """
+    Normalize a MAC address to lowercase, colon-separated form
+
+    Args:
+        mac: MAC address using ':', '-' or '.' separators, any case
+
+    Returns:
+        Normalized MAC address (e.g., "aa:bb:cc:dd:ee:ff")
+    """
+    # str.replace returns the same object when there's nothing to replace,
+    # so already-normalized input costs a single lower() copy
+    return mac.lower().replace("-", ":").replace(".", ":")
+
+
+def _client_to_dict(client: Dict) -> tuple:
+    """
+    Convert a raw /stat/sta client entry to the simplified client dict
+
+    Args:
+        client: Client entry from the controller (must have a 'mac')
+
+    Returns:
+        Tuple of (normalized MAC, client dict)
+    """
+    mac = client['mac'].lower()
+
+    # Convert tx/rx rates from Kbps to Mbps
+    tx_rate = client.get('tx_rate')
+    rx_rate = client.get('rx_rate')
+
+    return mac, {
+        'mac': mac,
+        'ap_mac': client.get('ap_mac'),
+        'ip': client.get('ip'),
+        'last_seen': client.get('last_seen'),
+        'rssi': client.get('rssi'),
+        'hostname': client.get('hostname'),
+        'name': client.get('name'),
+        'oui': client.get('oui'),  # Manufacturer from UniFi
+        'tx_rate': round(tx_rate / 1000, 1) if tx_rate else None,
+        'rx_rate': round(rx_rate / 1000, 1) if rx_rate else None,
+        'channel': client.get('channel'),
+        'radio': client.get('radio'),
+        'uptime': client.get('uptime'),
+        'tx_bytes': client.get('tx_bytes'),
+        'rx_bytes': client.get('rx_bytes'),
+        'blocked': client.get('blocked', False),
+        # Wired device fields
+        'is_wired': client.get('is_wired', False),
+        'sw_mac': client.get('sw_mac'),
+        'sw_port': client.get('sw_port'),
+        # Network/SSID for wireless
+        'essid': client.get('essid'),
+        'network': client.get('network'),
+        'network_id': client.get('network_id')
+    }
+
+
+def _normalize_v2_event(event: Dict, site: str) -> Dict:
+    """
+    Normalize a v2 traffic-flows event to the legacy format expected by the parser.
+
+    The v2 API (Network 10.x) returns events with nested objects (source, destination, ips)
+    while the legacy API returns flat events. This normalizes v2 to look like legacy.
+
+    Args:
+        event: Raw event from v2 traffic-flows API
+        site: Site ID to record on the event
+
+    Returns:
+        Event dictionary in legacy format
+    """
+    source = event.get('source', {})
+    destination = event.get('destination', {})
+    ips_data = event.get('ips', {})
+
+    # Extract IPS alert information
+    signature = ips_data.get('advanced_information', '')
+    category = ips_data.get('ips_category')
+    service = event.get('service')
+
+    # Map risk levels to severity (v2 uses "high", "medium", "low" strings)
+    risk = event.get('risk')
+    severity = _V2_SEVERITY_MAP.get(risk.lower(), 3) if risk else 3
+
+    # Determine action from the event (unknown actions pass through)
+    action = event.get('action', 'alert')
+    action = _V2_ACTION_MAP.get(action, action)
+
+    in_obj = event.get('in')
+
+    # Fill a copy of the pre-sized template (faster than a dict literal
+    # this wide); assignments keep the template's key order
+    normalized = _V2_EVENT_TEMPLATE.copy()
+
+    # Use flow ID or generate unique ID from timestamp
+    normalized['_id'] = event.get('id') or str(event.get('time', ''))
+    normalized['flow_id'] = event.get('id')
+    normalized['timestamp'] = event.get('time')  # Already in milliseconds
+
+    # Alert info from IPS data
+    normalized['inner_alert_signature'] = signature
+    normalized['inner_alert_signature_id'] = ips_data.get('signature_id')
+    normalized['inner_alert_severity'] = severity
+    normalized['inner_alert_category'] = category or service or ''
+    normalized['inner_alert_action'] = action
+    normalized['msg'] = signature
+    normalized['catname'] = category
+
+    # Network - Source
+    normalized['src_ip'] = source.get('ip')
+    normalized['src_port'] = source.get('port')
+    normalized['src_mac'] = source.get('mac')
+
+    # Network - Destination
+    normalized['dest_ip'] = destination.get('ip')
+    normalized['dest_port'] = destination.get('port')
+    normalized['dst_mac'] = destination.get('mac')
+
+    # Protocol info
+    normalized['proto'] = event.get('protocol')
+    normalized['app_proto'] = service
+    # v2 API returns 'in' as an object with network_id/network_name
+    normalized['in_iface'] = in_obj.get('network_name') if isinstance(in_obj, dict) else in_obj
+
+    # Geo info (if available in v2 format)
+    normalized['src_ip_country'] = source.get('country')
+    normalized['dest_ip_country'] = destination.get('country')
+
+    # Site info
+    normalized['site_id'] = site
+
+    return normalized
+
+
+def _build_mac_index(devices: List[Dict]) -> Dict[str, str]:
+    """
+    Map device MACs and radio BSSIDs to device friendly names
+
+    Args:
+        devices: Raw device list from /stat/device
+
+    Returns:
+        Dictionary of lowercase MAC -> name (or friendly model name).
+        Device MACs take precedence over vap_table BSSIDs.
+    """
+    index = {}
+    bssids = []
+    for device in devices:
+        device_mac = device.get('mac', '').lower()
+        friendly_name = (
+            device.get('name') or get_friendly_model_name(device.get('model', '')) or device_mac
+        )
+        if device_mac:
+            index[device_mac] = friendly_name
+
+        # Built-in Wi-Fi radios report their BSSIDs in the vap_table
+        # (Virtual Access Points), under both 'bssid' and 'ap_mac'
+        for vap in device.get('vap_table', []):
+            bssids.append((vap.get('bssid', '').lower(), friendly_name))
+            bssids.append((vap.get('ap_mac', '').lower(), friendly_name))
+
+    for mac, friendly_name in bssids:
+        if mac:
+            index.setdefault(mac, friendly_name)
+    return index
+
+
 class UniFiClient:
     """
     Wrapper around aiounifi for interacting with UniFi controller
@@ -186,6 +503,17 @@ class UniFiClient:
                          Otherwise, tries UniFi OS first, falls back to legacy.
         """
         self.host = host.rstrip('/')  # Remove trailing slash if present
+        # Site API prefixes; which one applies depends on the detected mode
+        self._unifi_os_api_base = f"{self.host}/proxy/network/api/s/{site}"
+        self._legacy_api_base = f"{self.host}/api/s/{site}"
+        # Host and port for the legacy (aiounifi) login, parsed once
+        parsed = urlparse(self.host)
+        self._legacy_host = parsed.hostname or self.host
+        try:
+            self._legacy_port = parsed.port or 8443
+        except ValueError:
+            # Out-of-range port; let the login attempt fail instead of __init__
+            self._legacy_port = None
         self.username = username
         self.password = password
         self.api_key = api_key
@@ -197,45 +525,88 @@ class UniFiClient:
         # API key always means UniFi OS; otherwise we'll probe during connect
         self.is_unifi_os = api_key is not None
         self._detected_type: Optional[str] = None  # Track what we detected
+        # Short-lived copy of the /stat/device list, shared by the AP and
+        # switch lookups so enriching N clients costs one request
+        self._device_cache: Optional[tuple] = None  # (monotonic time, devices)
+        self._device_cache_ttl = 10.0
+        self._mac_index: Dict[str, str] = {}  # Built from the cached device list
+        self._device_fetch: Optional[asyncio.Future] = None  # In-flight /stat/device request
+        # Cached rest/user listing, see _get_users()
+        self._user_cache: Dict[str, Dict] = {}
+        self._user_cache_ts = float('-inf')
+        # Recent read results by key, see _cached_result()
+        self._result_cache: Dict[tuple, tuple] = {}  # key -> (monotonic time, future)
+        # Last ETag and parsed body per URL, see _get_conditional()
+        self._etag_cache: Dict[str, tuple] = {}
+
+    @property
+    def _api_base(self) -> str:
+        """Site API URL prefix for the detected controller type."""
+        return self._unifi_os_api_base if self.is_unifi_os else self._legacy_api_base
 
     async def connect(self) -> bool:
         """
         Connect to the UniFi controller with auto-detection.
 
         For username/password auth, tries UniFi OS first, falls back to legacy.
+        Hosts already detected as legacy go straight to the legacy login.
         For API key auth, uses UniFi OS directly.
 
         Returns:
             True if connection successful, False otherwise
         """
         try:
-            logger.debug(f"Attempting to connect to UniFi controller at {self.host}")
-            logger.debug(f"Authentication method: {'API Key' if self.api_key else 'Username/Password'}")
-            logger.debug(f"Site: {self.site}, Verify SSL: {self.verify_ssl}")
+            logger.debug("Attempting to connect to UniFi controller at %s", self.host)
+            logger.debug("Authentication method: %s", "API Key" if self.api_key else "Username/Password")
+            logger.debug("Site: %s, Verify SSL: %s", self.site, self.verify_ssl)
 
-            # Create aiohttp session
-            # ssl=False disables all SSL verification (for self-signed certs)
-            ssl_param = False if not self.verify_ssl else None
+            # Create aiohttp session on the shared connector and SSL context
+            # (verification disabled for self-signed certs unless verify_ssl)
+            ssl_context = _get_ssl_context(self.verify_ssl)
             if not self.verify_ssl:
                 logger.debug("SSL verification disabled")
-            connector = aiohttp.TCPConnector(ssl=ssl_param)
+            connector = _get_connector(self.verify_ssl)
 
             # Add API key header if using UniFi OS with API key
             headers = {}
             if self.api_key:
                 headers['X-API-KEY'] = self.api_key
 
-            # Use cookie_jar to persist session cookies for UniFi OS login
+            # Use cookie_jar to persist session cookies for username/password
+            # login; API key requests authenticate by header and need none.
+            # Cookies and headers stay per client; only the connection pool
+            # is shared, so the session must not close the connector.
+            if self.api_key:
+                cookie_jar = aiohttp.DummyCookieJar()
+            else:
+                cookie_jar = aiohttp.CookieJar(unsafe=True)
             self._session = aiohttp.ClientSession(
                 connector=connector,
+                connector_owner=False,
                 headers=headers,
-                cookie_jar=aiohttp.CookieJar(unsafe=True)
+                cookie_jar=cookie_jar,
+                json_serialize=_json_dumps
             )
 
             # API key auth - always UniFi OS
             if self.api_key:
                 return await self._connect_unifi_os_api_key()
 
+            if self.host in _legacy_hosts:
+                logger.debug("Host previously detected as legacy controller")
+                if await self._try_legacy_login(ssl_context):
+                    self.is_unifi_os = False
+                    self._detected_type = "legacy"
+                    logger.info(f"Successfully connected to legacy controller at {self.host}")
+                    return True
+
+                # Forget the hint so the next attempt runs full detection
+                # (the controller may have been migrated to UniFi OS)
+                _legacy_hosts.discard(self.host)
+                logger.error("Legacy controller login failed")
+                await self.disconnect()
+                return False
+
             # Username/password - try UniFi OS first, fall back to legacy
             logger.debug("Trying UniFi OS authentication first...")
             unifi_os_result = await self._try_unifi_os_login()
@@ -258,6 +629,7 @@ class UniFiClient:
             if legacy_result:
                 self.is_unifi_os = False
                 self._detected_type = "legacy"
+                _legacy_hosts.add(self.host)
                 logger.info(f"Successfully connected to legacy controller at {self.host}")
                 return True
 
@@ -267,13 +639,15 @@ class UniFiClient:
 
         except Exception as e:
             logger.error(f"Failed to connect to UniFi controller: {e}")
-            logger.debug(f"Connection error details - Type: {type(e).__name__}, Args: {e.args}")
+            logger.debug("Connection error details - Type: %s, Args: %s", type(e).__name__, e.args)
             await self.disconnect()
             return False
 
     async def _connect_unifi_os_api_key(self) -> bool:
         """Connect to UniFi OS using API key authentication."""
-        test_url = f"{self.host}/proxy/network/api/s/{self.site}/stat/device"
+        # The site's /self endpoint is a tiny response that still checks
+        # both the credentials and access to the configured site
+        test_url = f"{self._unifi_os_api_base}/self"
         try:
             async with self._session.get(test_url) as resp:
                 if resp.status != 200:
@@ -312,13 +686,14 @@ class UniFiClient:
                     return "not_found"
 
                 if resp.status != 200:
-                    # Try to get error message
-                    try:
-                        error_data = await resp.json()
-                        error_msg = error_data.get('errors', [error_data.get('message', 'Unknown error')])
-                        logger.debug(f"UniFi OS login failed: {resp.status} - {error_msg}")
-                    except:
-                        logger.debug(f"UniFi OS login failed: {resp.status}")
+                    # Try to get error message (only read when it will be logged)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        try:
+                            error_data = orjson.loads(await resp.read())
+                            error_msg = error_data.get('errors', [error_data.get('message', 'Unknown error')])
+                            logger.debug("UniFi OS login failed: %s - %s", resp.status, error_msg)
+                        except:
+                            logger.debug("UniFi OS login failed: %s", resp.status)
                     return "auth_failed"
 
                 # Get CSRF token from response headers for future requests
@@ -326,28 +701,26 @@ class UniFiClient:
                 if csrf_token:
                     self._session.headers.update({'X-CSRF-Token': csrf_token})
 
-            # Test the connection by getting devices
-            test_url = f"{self.host}/proxy/network/api/s/{self.site}/stat/device"
+            # Test the connection against the site (small response, unlike stat/device)
+            test_url = f"{self._unifi_os_api_base}/self"
             async with self._session.get(test_url) as resp:
                 if resp.status != 200:
-                    logger.debug(f"UniFi OS API test failed after login: {resp.status}")
+                    logger.debug("UniFi OS API test failed after login: %s", resp.status)
                     return "auth_failed"
 
             return "success"
 
         except aiohttp.ClientError as e:
-            logger.debug(f"UniFi OS connection error: {e}")
+            logger.debug("UniFi OS connection error: %s", e)
             return "not_found"
 
-    async def _try_legacy_login(self, ssl_context) -> bool:
+    async def _try_legacy_login(self, ssl_context: ssl.SSLContext) -> bool:
         """Try to login via legacy controller (aiounifi)."""
         try:
-            # Parse host and port from URL
-            parsed = urlparse(self.host)
-            host = parsed.hostname or self.host
-            port = parsed.port or 8443
+            host = self._legacy_host
+            port = self._legacy_port
 
-            logger.debug(f"Using legacy controller mode - host: {host}, port: {port}")
+            logger.debug("Using legacy controller mode - host: %s, port: %s", host, port)
 
             # Create Configuration object (aiounifi v85+ API)
             config = Configuration(
@@ -357,7 +730,7 @@ class UniFiClient:
                 password=self.password,
                 port=port,
                 site=self.site,
-                ssl_context=ssl_context if ssl_context else False
+                ssl_context=ssl_context
             )
 
             self.controller = Controller(config)
@@ -368,7 +741,7 @@ class UniFiClient:
             return True
 
         except Exception as e:
-            logger.debug(f"Legacy controller login failed: {e}")
+            logger.debug("Legacy controller login failed: %s", e)
             return False
 
     async def disconnect(self):
@@ -379,11 +752,46 @@ class UniFiClient:
             await self._session.close()
         self._session = None
         self.controller = None
+        self._device_cache = None
+        self._device_fetch = None
+        self._mac_index = {}
+        self._invalidate_users()
+        self._result_cache.clear()
+        self._etag_cache.clear()
+
+    @classmethod
+    async def shutdown(cls):
+        """
+        Close the shared TCP connectors. Call once on application exit,
+        after all clients have disconnected.
+        """
+        cached = list(_connector_cache.values())
+        _connector_cache.clear()
+        for _, connector in cached:
+            if not connector.closed:
+                await connector.close()
 
-    async def get_clients(self) -> Dict:
+    async def get_clients(self, force: bool = False) -> Dict:
         """
         Get all active clients from the UniFi controller
 
+        The result is reused for a few seconds (see RESULT_CACHE_TTLS), so
+        callers asking at the same time share one request.
+
+        Args:
+            force: Skip the cached result and always ask the controller
+
+        Returns:
+            Dictionary of clients indexed by MAC address
+        """
+        return await self._cached_result(
+            ('clients',), RESULT_CACHE_TTLS['clients'], self._request_clients, force
+        )
+
+    async def _request_clients(self) -> Dict:
+        """
+        Request the active clients from the controller
+
         Returns:
             Dictionary of clients indexed by MAC address
         """
@@ -393,58 +801,14 @@ class UniFiClient:
         try:
             if self.is_unifi_os:
                 # UniFi OS - make direct API call
-                url = f"{self.host}/proxy/network/api/s/{self.site}/stat/sta"
+                url = f"{self._unifi_os_api_base}/stat/sta"
                 async with self._session.get(url) as resp:
                     if resp.status != 200:
                         logger.error(f"Failed to get clients: {resp.status}")
                         raise RuntimeError(f"API request failed: {resp.status}")
 
-                    data = await resp.json()
+                    data = orjson.loads(await resp.read())
                     clients_list = data.get('data', [])
-
-                    # Convert to dictionary indexed by MAC
-                    clients_dict = {}
-                    for client in clients_list:
-                        mac = client.get('mac', '').lower()
-                        if mac:
-                            # Convert tx/rx rates from Kbps to Mbps
-                            tx_rate = client.get('tx_rate')
-                            rx_rate = client.get('rx_rate')
-                            tx_rate_mbps = round(tx_rate / 1000, 1) if tx_rate else None
-                            rx_rate_mbps = round(rx_rate / 1000, 1) if rx_rate else None
-
-                            # Detect if wired device
-                            is_wired = client.get('is_wired', False)
-
-                            # Convert to simple dict with needed fields
-                            clients_dict[mac] = {
-                                'mac': mac,
-                                'ap_mac': client.get('ap_mac'),
-                                'ip': client.get('ip'),
-                                'last_seen': client.get('last_seen'),
-                                'rssi': client.get('rssi'),
-                                'hostname': client.get('hostname'),
-                                'name': client.get('name'),
-                                'oui': client.get('oui'),  # Manufacturer from UniFi
-                                'tx_rate': tx_rate_mbps,
-                                'rx_rate': rx_rate_mbps,
-                                'channel': client.get('channel'),
-                                'radio': client.get('radio'),
-                                'uptime': client.get('uptime'),
-                                'tx_bytes': client.get('tx_bytes'),
-                                'rx_bytes': client.get('rx_bytes'),
-                                'blocked': client.get('blocked', False),
-                                # Wired device fields
-                                'is_wired': is_wired,
-                                'sw_mac': client.get('sw_mac'),
-                                'sw_port': client.get('sw_port'),
-                                # Network/SSID for wireless
-                                'essid': client.get('essid'),
-                                'network': client.get('network'),
-                                'network_id': client.get('network_id')
-                            }
-
-                    return clients_dict
             else:
                 # Legacy - use aiounifi Controller
                 if not self.controller:
@@ -453,48 +817,10 @@ class UniFiClient:
                 # Fetch clients using request API
                 request = ClientListRequest.create()
                 response = await self.controller.request(request)
-
-                # Parse response into dict keyed by MAC
-                clients_dict = {}
                 clients_list = response.get('data', []) if isinstance(response, dict) else []
-                for client in clients_list:
-                    mac = client.get('mac', '').lower()
-                    if mac:
-                        # Convert tx/rx rates from Kbps to Mbps
-                        tx_rate = client.get('tx_rate')
-                        rx_rate = client.get('rx_rate')
-                        tx_rate_mbps = round(tx_rate / 1000, 1) if tx_rate else None
-                        rx_rate_mbps = round(rx_rate / 1000, 1) if rx_rate else None
-
-                        is_wired = client.get('is_wired', False)
-
-                        clients_dict[mac] = {
-                            'mac': mac,
-                            'ap_mac': client.get('ap_mac'),
-                            'ip': client.get('ip'),
-                            'last_seen': client.get('last_seen'),
-                            'rssi': client.get('rssi'),
-                            'hostname': client.get('hostname'),
-                            'name': client.get('name'),
-                            'oui': client.get('oui'),
-                            'tx_rate': tx_rate_mbps,
-                            'rx_rate': rx_rate_mbps,
-                            'channel': client.get('channel'),
-                            'radio': client.get('radio'),
-                            'uptime': client.get('uptime'),
-                            'tx_bytes': client.get('tx_bytes'),
-                            'rx_bytes': client.get('rx_bytes'),
-                            'blocked': client.get('blocked', False),
-                            'is_wired': is_wired,
-                            'sw_mac': client.get('sw_mac'),
-                            'sw_port': client.get('sw_port'),
-                            # Network/SSID for wireless
-                            'essid': client.get('essid'),
-                            'network': client.get('network'),
-                            'network_id': client.get('network_id')
-                        }
 
-                return clients_dict
+            # Convert to dictionary indexed by MAC
+            return dict(_client_to_dict(client) for client in clients_list if client.get('mac'))
 
         except Exception as e:
             logger.error(f"Failed to get clients from UniFi controller: {e}")
@@ -511,71 +837,176 @@ class UniFiClient:
             Client object/dict if found, None otherwise
         """
         clients = await self.get_clients()
-        # Normalize MAC address for lookup (lowercase, colon-separated)
-        normalized_mac = mac_address.lower().replace("-", ":").replace(".", ":")
+        normalized_mac = _normalize_mac(mac_address)
         return clients.get(normalized_mac)
 
-    async def get_access_points(self) -> Dict:
+    async def _fetch_devices(self, force: bool = False) -> List[Dict]:
         """
-        Get all access points from the UniFi controller
+        Get the raw device list (/stat/device) from the UniFi controller.
+
+        Responses are cached for _device_cache_ttl seconds. Concurrent cache
+        misses share one in-flight request, including its failure, so a
+        struggling controller isn't hit once per waiting caller.
+
+        Args:
+            force: Skip the cached list (an in-flight request is still shared)
 
         Returns:
-            Dictionary of access points indexed by MAC address
+            List of device dicts as returned by the controller
         """
         if not self._session:
             raise RuntimeError("Not connected to UniFi controller. Call connect() first.")
 
-        try:
-            if self.is_unifi_os:
-                # UniFi OS - make direct API call
-                url = f"{self.host}/proxy/network/api/s/{self.site}/stat/device"
-                async with self._session.get(url) as resp:
-                    if resp.status != 200:
-                        logger.error(f"Failed to get devices: {resp.status}")
-                        raise RuntimeError(f"API request failed: {resp.status}")
+        cached = self._device_cache
+        if not force and cached is not None and time.monotonic() - cached[0] < self._device_cache_ttl:
+            return cached[1]
+
+        inflight = self._device_fetch
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._request_devices())
+            self._device_fetch = inflight
+            inflight.add_done_callback(self._device_fetch_done)
+
+        # Shielded so one caller being cancelled doesn't cancel the fetch
+        # for everyone else waiting on it
+        return await asyncio.shield(inflight)
+
+    def _device_fetch_done(self, future: asyncio.Future):
+        """Clear the finished in-flight device fetch."""
+        if self._device_fetch is future:
+            self._device_fetch = None
+        if not future.cancelled():
+            # Mark the exception retrieved; every waiter has already seen it
+            future.exception()
+
+    async def _cached_result(self, key: tuple, ttl: float, fetch, force: bool = False):
+        """
+        Get a read result that was fetched less than ttl seconds ago.
+
+        Concurrent callers share one in-flight fetch, like _fetch_devices().
+        Failures and empty results are dropped as soon as the fetch
+        finishes, so the next call retries instead of serving them.
+        Each caller gets its own shallow copy, so adding or removing keys
+        or items doesn't change the cached result; nested dicts are shared
+        and must not be modified.
+
+        Args:
+            key: Cache key, e.g. ('clients',)
+            ttl: Seconds a result is reused for
+            fetch: Coroutine function that performs the request
+            force: Skip any cached result and fetch again
+
+        Returns:
+            Shallow copy of the cached or freshly fetched result
+        """
+        cached = self._result_cache.get(key)
+        if force or cached is None or time.monotonic() - cached[0] >= ttl:
+            future = asyncio.ensure_future(fetch())
+            self._result_cache[key] = (time.monotonic(), future)
+            future.add_done_callback(lambda f: self._cached_result_done(key, f))
+        else:
+            future = cached[1]
+
+        # Shielded so one caller being cancelled doesn't cancel the fetch
+        # for everyone else waiting on it
+        return copy.copy(await asyncio.shield(future))
+
+    def _cached_result_done(self, key: tuple, future: asyncio.Future):
+        """Forget a finished fetch that failed or came back empty."""
+        failed = future.cancelled() or future.exception() is not None
+        if failed or not future.result():
+            cached = self._result_cache.get(key)
+            if cached is not None and cached[1] is future:
+                del self._result_cache[key]
+
+    async def _request_devices(self) -> List[Dict]:
+        """
+        Request /stat/device and refresh the device cache and MAC index
 
-                    data = await resp.json()
-                    devices_list = data.get('data', [])
-
-                    # Convert to dictionary indexed by MAC, filter for APs
-                    aps_dict = {}
-                    for device in devices_list:
-                        # Only include access points (type 'uap')
-                        if device.get('type') == 'uap':
-                            mac = device.get('mac', '').lower()
-                            if mac:
-                                aps_dict[mac] = {
-                                    'mac': mac,
-                                    'name': device.get('name'),
-                                    'model': device.get('model'),
-                                    'type': device.get('type')
-                                }
-
-                    return aps_dict
+        Returns:
+            List of device dicts as returned by the controller
+        """
+        if self.is_unifi_os:
+            # UniFi OS - make direct API call
+            url = f"{self._unifi_os_api_base}/stat/device"
+            resp_status, data = await self._get_conditional(url)
+            if data is None:
+                logger.error(f"Failed to get devices: {resp_status}")
+                raise RuntimeError(f"API request failed: {resp_status}")
+
+            devices = data.get('data', [])
+        else:
+            # Legacy - use aiounifi Controller
+            if not self.controller:
+                raise RuntimeError("Controller not initialized")
+
+            # Fetch devices using request API
+            request = DeviceListRequest.create()
+            response = await self.controller.request(request)
+            devices = response.get('data', []) if isinstance(response, dict) else []
+
+        self._mac_index = _build_mac_index(devices)
+        self._device_cache = (time.monotonic(), devices)
+        return devices
+
+    async def _get_conditional(self, url: str) -> tuple:
+        """
+        GET a JSON endpoint, revalidating against the last response's ETag.
+
+        If the controller sent an ETag last time, the request carries
+        If-None-Match and a 304 reuses the body parsed back then instead of
+        downloading and decoding it again. Endpoints without ETags are
+        fetched in full every time.
+
+        Args:
+            url: Endpoint URL
+
+        Returns:
+            Tuple of (HTTP status, parsed body). A 304 is reported as 200;
+            the body is None for any other non-200 status.
+        """
+        cached = self._etag_cache.get(url)
+        headers = {'If-None-Match': cached[0]} if cached else None
+
+        async with self._session.get(url, headers=headers) as resp:
+            if resp.status == 304 and cached:
+                return 200, cached[1]
+            if resp.status != 200:
+                return resp.status, None
+
+            data = orjson.loads(await resp.read())
+            etag = resp.headers.get('ETag')
+            if etag:
+                self._etag_cache[url] = (etag, data)
             else:
-                # Legacy - use aiounifi Controller
-                if not self.controller:
-                    raise RuntimeError("Controller not initialized")
+                self._etag_cache.pop(url, None)
+            return 200, data
 
-                # Fetch devices using request API
-                request = DeviceListRequest.create()
-                response = await self.controller.request(request)
+    async def get_access_points(self) -> Dict:
+        """
+        Get all access points from the UniFi controller
+
+        Returns:
+            Dictionary of access points indexed by MAC address
+        """
+        try:
+            devices_list = await self._fetch_devices()
+
+            # Convert to dictionary indexed by MAC, filter for APs
+            aps_dict = {}
+            for device in devices_list:
+                # Only include access points (type 'uap')
+                if device.get('type') == 'uap':
+                    mac = device.get('mac', '').lower()
+                    if mac:
+                        aps_dict[mac] = {
+                            'mac': mac,
+                            'name': device.get('name'),
+                            'model': device.get('model'),
+                            'type': device.get('type')
+                        }
 
-                # Parse response into dict keyed by MAC, filter for APs
-                aps_dict = {}
-                devices_list = response.get('data', []) if isinstance(response, dict) else []
-                for device in devices_list:
-                    if device.get('type') == 'uap':
-                        mac = device.get('mac', '').lower()
-                        if mac:
-                            aps_dict[mac] = {
-                                'mac': mac,
-                                'name': device.get('name'),
-                                'model': device.get('model'),
-                                'type': device.get('type')
-                            }
-
-                return aps_dict
+            return aps_dict
 
         except Exception as e:
             logger.error(f"Failed to get access points from UniFi controller: {e}")
@@ -597,56 +1028,13 @@ class UniFiClient:
             AP name if found, MAC address as fallback
         """
         try:
-            normalized_mac = ap_mac.lower().replace("-", ":").replace(".", ":")
-
-            # First check standalone APs by their device MAC
-            aps = await self.get_access_points()
-            ap = aps.get(normalized_mac)
-            if ap:
-                # Handle both dict (UniFi OS) and object (aiounifi) formats
-                if isinstance(ap, dict):
-                    return ap.get('name') or get_friendly_model_name(ap.get('model', '')) or normalized_mac
-                else:
-                    return ap.name or get_friendly_model_name(ap.model or '') or normalized_mac
-
-            # Not found by device MAC - check all devices including their radio BSSIDs
-            # This handles gateways with built-in radios (UDR, UDM, UDM SE) where
-            # clients report the radio BSSID, not the device MAC
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/stat/device"
-            else:
-                url = f"{self.host}/api/s/{self.site}/stat/device"
+            normalized_mac = _normalize_mac(ap_mac)
 
-            async with self._session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    devices = data.get('data', [])
-
-                    for device in devices:
-                        device_mac = device.get('mac', '').lower()
-                        name = device.get('name')
-                        model = device.get('model', '')
-                        friendly_name = name or get_friendly_model_name(model) or device_mac
-
-                        # Check if the device MAC matches
-                        if device_mac == normalized_mac:
-                            return friendly_name
-
-                        # Check vap_table for radio BSSIDs (Virtual Access Points)
-                        # This is where built-in Wi-Fi radios report their BSSIDs
-                        vap_table = device.get('vap_table', [])
-                        for vap in vap_table:
-                            # Check both 'bssid' and 'ap_mac' fields
-                            vap_bssid = vap.get('bssid', '').lower()
-                            vap_ap_mac = vap.get('ap_mac', '').lower()
-                            if vap_bssid == normalized_mac or vap_ap_mac == normalized_mac:
-                                logger.debug(
-                                    f"Found BSSID {normalized_mac} on device {friendly_name} "
-                                    f"(radio: {vap.get('radio', 'unknown')})"
-                                )
-                                return friendly_name
-
-            return normalized_mac
+            # Device MACs and radio BSSIDs are indexed together, which covers
+            # gateways with built-in radios (UDR, UDM, UDM SE) where clients
+            # report the radio BSSID, not the device MAC
+            await self._fetch_devices()
+            return self._mac_index.get(normalized_mac, normalized_mac)
         except Exception as e:
             logger.error(f"Failed to get AP name for {ap_mac}: {e}")
             return ap_mac
@@ -662,36 +1050,22 @@ class UniFiClient:
             Switch name if found, MAC address as fallback
         """
         try:
-            normalized_mac = sw_mac.lower().replace("-", ":").replace(".", ":")
-
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/stat/device"
-            else:
-                url = f"{self.host}/api/s/{self.site}/stat/device"
+            normalized_mac = _normalize_mac(sw_mac)
 
-            async with self._session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    devices = data.get('data', [])
-
-                    for device in devices:
-                        device_mac = device.get('mac', '').lower()
-                        if device_mac == normalized_mac:
-                            name = device.get('name')
-                            model = device.get('model', '')
-                            return name or get_friendly_model_name(model) or normalized_mac
-
-            return normalized_mac
+            await self._fetch_devices()
+            return self._mac_index.get(normalized_mac, normalized_mac)
         except Exception as e:
             logger.error(f"Failed to get switch name for {sw_mac}: {e}")
             return sw_mac
 
-    async def block_client(self, mac_address: str) -> bool:
+    async def _stamgr_command(self, cmd: str, mac_address: str, action: str) -> bool:
         """
-        Block a client device
+        Send a station manager command (block-sta, unblock-sta) for one client
 
         Args:
-            mac_address: MAC address of client to block
+            cmd: stamgr command name
+            mac_address: MAC address of the client
+            action: Verb used in log messages (e.g., "block")
 
         Returns:
             True if successful, False otherwise
@@ -700,28 +1074,39 @@ class UniFiClient:
             raise RuntimeError("Not connected to UniFi controller. Call connect() first.")
 
         try:
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/cmd/stamgr"
-            else:
-                url = f"{self.host}/api/s/{self.site}/cmd/stamgr"
+            url = f"{self._api_base}/cmd/stamgr"
 
             payload = {
-                "cmd": "block-sta",
+                "cmd": cmd,
                 "mac": mac_address.lower()
             }
 
             async with self._session.post(url, json=payload) as resp:
                 if resp.status == 200:
-                    logger.info(f"Successfully blocked client {mac_address}")
+                    # Blocked state lives in rest/user
+                    self._invalidate_users()
+                    logger.info(f"Successfully {action}ed client {mac_address}")
                     return True
                 else:
-                    logger.error(f"Failed to block client {mac_address}: {resp.status}")
+                    logger.error(f"Failed to {action} client {mac_address}: {resp.status}")
                     return False
 
         except Exception as e:
-            logger.error(f"Error blocking client {mac_address}: {e}")
+            logger.error(f"Error {action}ing client {mac_address}: {e}")
             return False
 
+    async def block_client(self, mac_address: str) -> bool:
+        """
+        Block a client device
+
+        Args:
+            mac_address: MAC address of client to block
+
+        Returns:
+            True if successful, False otherwise
+        """
+        return await self._stamgr_command("block-sta", mac_address, "block")
+
     async def unblock_client(self, mac_address: str) -> bool:
         """
         Unblock a client device
@@ -732,31 +1117,87 @@ class UniFiClient:
         Returns:
             True if successful, False otherwise
         """
-        if not self._session:
-            raise RuntimeError("Not connected to UniFi controller. Call connect() first.")
+        return await self._stamgr_command("unblock-sta", mac_address, "unblock")
 
-        try:
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/cmd/stamgr"
-            else:
-                url = f"{self.host}/api/s/{self.site}/cmd/stamgr"
+    async def block_clients(self, mac_addresses: List[str]) -> Dict[str, bool]:
+        """
+        Block several client devices at once.
 
-            payload = {
-                "cmd": "unblock-sta",
-                "mac": mac_address.lower()
-            }
+        block-sta only takes a single MAC, so the commands are sent
+        concurrently over the pooled connections instead.
 
-            async with self._session.post(url, json=payload) as resp:
-                if resp.status == 200:
-                    logger.info(f"Successfully unblocked client {mac_address}")
-                    return True
-                else:
-                    logger.error(f"Failed to unblock client {mac_address}: {resp.status}")
-                    return False
+        Args:
+            mac_addresses: MAC addresses of clients to block
 
-        except Exception as e:
-            logger.error(f"Error unblocking client {mac_address}: {e}")
-            return False
+        Returns:
+            Dictionary of MAC address -> True if blocked
+        """
+        results = await asyncio.gather(
+            *(self._stamgr_command("block-sta", mac, "block") for mac in mac_addresses)
+        )
+        return dict(zip(mac_addresses, results))
+
+    async def unblock_clients(self, mac_addresses: List[str]) -> Dict[str, bool]:
+        """
+        Unblock several client devices at once.
+
+        unblock-sta only takes a single MAC, so the commands are sent
+        concurrently over the pooled connections instead.
+
+        Args:
+            mac_addresses: MAC addresses of clients to unblock
+
+        Returns:
+            Dictionary of MAC address -> True if unblocked
+        """
+        results = await asyncio.gather(
+            *(self._stamgr_command("unblock-sta", mac, "unblock") for mac in mac_addresses)
+        )
+        return dict(zip(mac_addresses, results))
+
+    async def _get_users(self, max_age: float = 30.0) -> Dict[str, Dict]:
+        """
+        Get the known clients (rest/user) indexed by lowercase MAC.
+
+        The listing is cached for max_age seconds, so checking or renaming
+        many clients costs one request. Writes to rest/user and block or
+        unblock commands drop the cache.
+
+        Args:
+            max_age: Maximum age in seconds of a cached listing
+
+        Returns:
+            Dictionary of MAC address -> user entry
+        """
+        if time.monotonic() - self._user_cache_ts <= max_age:
+            return self._user_cache
+
+        async with self._session.get(self._user_url()) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"API request failed: {resp.status}")
+            data = orjson.loads(await resp.read())
+
+        users = {}
+        for user in data.get('data', []):
+            mac = user.get('mac', '').lower()
+            # Keep the first entry for a MAC, matching the old linear scan
+            if mac and mac not in users:
+                users[mac] = user
+
+        self._user_cache = users
+        self._user_cache_ts = time.monotonic()
+        return users
+
+    def _user_url(self) -> str:
+        """Get the rest/user URL for the current site."""
+        return f"{self._api_base}/rest/user"
+
+    def _invalidate_users(self):
+        """Drop the cached rest/user listing and the client list built on it."""
+        self._user_cache = {}
+        self._user_cache_ts = float('-inf')
+        # stat/sta reports the same names, and blocked clients drop out of it
+        self._result_cache.pop(('clients',), None)
 
     async def is_client_blocked(self, mac_address: str) -> bool:
         """
@@ -772,19 +1213,11 @@ class UniFiClient:
             raise RuntimeError("Not connected to UniFi controller. Call connect() first.")
 
         try:
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/rest/user"
-            else:
-                url = f"{self.host}/api/s/{self.site}/rest/user"
-
-            async with self._session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    users = data.get('data', [])
-                    user = next((u for u in users if u.get('mac', '').lower() == mac_address.lower()), None)
+            users = await self._get_users()
+            user = users.get(mac_address.lower())
 
-                    if user:
-                        return user.get('blocked', False)
+            if user:
+                return user.get('blocked', False)
 
             return False
 
@@ -807,38 +1240,35 @@ class UniFiClient:
             raise RuntimeError("Not connected to UniFi controller. Call connect() first.")
 
         try:
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/rest/user"
-            else:
-                url = f"{self.host}/api/s/{self.site}/rest/user"
+            url = self._user_url()
+            mac = mac_address.lower()
 
             # First, find the user ID for this MAC
-            async with self._session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    users = data.get('data', [])
-                    user = next((u for u in users if u.get('mac', '').lower() == mac_address.lower()), None)
-
-                    if user:
-                        user_id = user.get('_id')
-                        # Update the user's name
-                        update_url = f"{url}/{user_id}"
-                        payload = {"name": name}
-
-                        async with self._session.put(update_url, json=payload) as update_resp:
-                            if update_resp.status == 200:
-                                logger.info(f"Successfully set name for {mac_address} to '{name}'")
-                                return True
-                    else:
-                        # User doesn't exist yet, create it
-                        payload = {
-                            "mac": mac_address.lower(),
-                            "name": name
-                        }
-                        async with self._session.post(url, json=payload) as create_resp:
-                            if create_resp.status == 200:
-                                logger.info(f"Successfully created user and set name for {mac_address} to '{name}'")
-                                return True
+            users = await self._get_users()
+            user = users.get(mac)
+
+            if user:
+                user_id = user.get('_id')
+                # Update the user's name
+                update_url = f"{url}/{user_id}"
+                payload = {"name": name}
+
+                async with self._session.put(update_url, json=payload) as update_resp:
+                    if update_resp.status == 200:
+                        self._invalidate_users()
+                        logger.info(f"Successfully set name for {mac_address} to '{name}'")
+                        return True
+            else:
+                # User doesn't exist yet, create it
+                payload = {
+                    "mac": mac,
+                    "name": name
+                }
+                async with self._session.post(url, json=payload) as create_resp:
+                    if create_resp.status == 200:
+                        self._invalidate_users()
+                        logger.info(f"Successfully created user and set name for {mac_address} to '{name}'")
+                        return True
 
             logger.error(f"Failed to set name for {mac_address}")
             return False
@@ -847,83 +1277,6 @@ class UniFiClient:
             logger.error(f"Error setting name for {mac_address}: {e}")
             return False
 
-    def _normalize_v2_event(self, event: Dict) -> Dict:
-        """
-        Normalize a v2 traffic-flows event to the legacy format expected by the parser.
-
-        The v2 API (Network 10.x) returns events with nested objects (source, destination, ips)
-        while the legacy API returns flat events. This normalizes v2 to look like legacy.
-
-        Args:
-            event: Raw event from v2 traffic-flows API
-
-        Returns:
-            Event dictionary in legacy format
-        """
-        source = event.get('source', {})
-        destination = event.get('destination', {})
-        ips_data = event.get('ips', {})
-
-        # Extract IPS alert information
-        signature = ips_data.get('advanced_information', '')
-
-        # Map risk levels to severity (v2 uses "high", "medium", "low" strings)
-        risk = event.get('risk', '').lower() if event.get('risk') else ''
-        severity_map = {'high': 1, 'medium': 2, 'low': 3}
-        severity = severity_map.get(risk, 3)
-
-        # Determine action from the event
-        action = event.get('action', 'alert')
-        if action == 'allowed':
-            action = 'alert'  # Detection only
-        elif action in ('blocked', 'dropped', 'rejected'):
-            action = 'block'
-
-        # Build normalized event
-        normalized = {
-            # Use flow ID or generate unique ID from timestamp
-            '_id': event.get('id') or str(event.get('time', '')),
-            'flow_id': event.get('id'),
-            'timestamp': event.get('time'),  # Already in milliseconds
-
-            # Alert info from IPS data
-            'inner_alert_signature': signature,
-            'inner_alert_signature_id': ips_data.get('signature_id'),
-            'inner_alert_severity': severity,
-            'inner_alert_category': ips_data.get('ips_category') or event.get('service', ''),
-            'inner_alert_action': action,
-            'msg': signature,
-            'catname': ips_data.get('ips_category'),
-
-            # Network - Source
-            'src_ip': source.get('ip'),
-            'src_port': source.get('port'),
-            'src_mac': source.get('mac'),
-
-            # Network - Destination
-            'dest_ip': destination.get('ip'),
-            'dest_port': destination.get('port'),
-            'dst_mac': destination.get('mac'),
-
-            # Protocol info
-            'proto': event.get('protocol'),
-            'app_proto': event.get('service'),
-            # v2 API returns 'in' as an object with network_id/network_name
-            'in_iface': event.get('in', {}).get('network_name') if isinstance(event.get('in'), dict) else event.get('in'),
-
-            # Geo info (if available in v2 format)
-            'src_ip_country': source.get('country'),
-            'dest_ip_country': destination.get('country'),
-
-            # Site info
-            'site_id': self.site,
-
-            # Mark as v2 format for debugging/logging
-            '_api_version': 'v2'
-        }
-
-        return normalized
-
     async def get_traffic_flows(
         self,
         limit: int = 100,
@@ -952,59 +1305,135 @@ class UniFiClient:
             return []
 
         try:
-            url = f"{self.host}/proxy/network/v2/api/site/{self.site}/traffic-flows"
+            normalized_events = [e async for e in self.iter_traffic_flows(limit, time_range)]
+        except Exception as e:
+            logger.error(f"Failed to get traffic flows: {e}")
+            return []
 
-            all_events = []
-            offset = 0
-            max_iterations = 50  # Safety limit
+        logger.info(f"Retrieved {len(normalized_events)} IPS events from traffic flows v2 API")
+        return normalized_events
 
-            while len(all_events) < limit and max_iterations > 0:
-                max_iterations -= 1
-                batch_limit = min(100, limit - len(all_events))
+    async def iter_traffic_flows(
+        self,
+        limit: int = 100,
+        time_range: str = "24h"
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream IPS events from the v2 traffic flows API, page by page.
 
-                payload = {
-                    "limit": batch_limit,
-                    "offset": offset,
-                    "timeRange": time_range
-                }
+        Each flow with IPS data is normalized to the legacy stat/ips/event
+        format and yielded as soon as its page arrives, so no page is held
+        after it has been filtered. Stops once limit events have been
+        yielded, or early if the consumer stops iterating.
 
-                logger.debug(f"Fetching traffic flows from: {url}")
-                logger.debug(f"Traffic flows payload: {payload}")
+        Args:
+            limit: Maximum number of events to yield
+            time_range: Time range string like "24h", "7d" (default: "24h")
 
-                async with self._session.post(url, json=payload) as resp:
-                    if resp.status == 405:
-                        logger.debug("Traffic flows v2 endpoint returned 405 - not available")
-                        return []
-                    if resp.status != 200:
-                        resp_text = await resp.text()
-                        logger.error(f"Failed to get traffic flows: HTTP {resp.status}")
-                        logger.debug(f"Traffic flows error response: {resp_text[:500] if resp_text else 'empty'}")
-                        return []
+        Yields:
+            Normalized IPS event dictionaries
 
-                    data = await resp.json()
-                    flows = data.get('data', [])
-                    has_next = data.get('has_next', False)
+        Raises:
+            RuntimeError: If a page request fails, including the endpoint
+                becoming unavailable (405) after earlier pages were read
+        """
+        url = f"{self.host}/proxy/network/v2/api/site/{self.site}/traffic-flows"
+        site = self.site
+
+        yielded = 0
+        offset = 0
+        pages_left = 50  # Safety limit
+        done = False
+
+        while not done and yielded < limit and pages_left > 0:
+            # Fetch up to TRAFFIC_FLOW_CONCURRENCY pages at once, but no
+            # more than the IPS share of the flows seen so far suggests
+            # are needed (every flow is assumed to match at first)
+            remaining = limit - yielded
+            per_page = TRAFFIC_FLOW_PAGE_SIZE
+            if offset:
+                per_page = yielded * TRAFFIC_FLOW_PAGE_SIZE / offset
+            needed = math.ceil(remaining / per_page) if per_page else TRAFFIC_FLOW_CONCURRENCY
+            count = min(TRAFFIC_FLOW_CONCURRENCY, pages_left, needed)
+            pages_left -= count
+
+            pages = await asyncio.gather(*(
+                self._fetch_traffic_flow_page(url, offset + i * TRAFFIC_FLOW_PAGE_SIZE, time_range)
+                for i in range(count)
+            ))
+
+            # Process pages in offset order
+            for page in pages:
+                if page is None:
+                    if not offset:
+                        return  # Endpoint not available at all
+                    # Don't let a truncated stream pass for a complete one
+                    logger.warning("Traffic flows endpoint returned 405 after %d flows", offset)
+                    raise RuntimeError("Traffic flows endpoint became unavailable while paging")
+                flows, has_next = page
+                offset += len(flows)
+
+                # Yield flows that have IPS data, normalized to legacy format
+                matched = 0
+                for flow in flows:
+                    if not flow.get('ips'):
+                        continue
+                    yield _normalize_v2_event(flow, site)
+                    matched += 1
+                    if yielded + matched >= limit:
+                        break
+                yielded += matched
 
-                    # Filter for flows that have IPS data
-                    ips_flows = [f for f in flows if f.get('ips')]
-                    all_events.extend(ips_flows)
+                logger.debug("Batch: %d flows, %d with IPS data", len(flows), matched)
 
-                    logger.debug(f"Batch: {len(flows)} flows, {len(ips_flows)} with IPS data")
+                if not has_next or not flows or yielded >= limit:
+                    done = True
+                    break
+                if len(flows) < TRAFFIC_FLOW_PAGE_SIZE:
+                    # Short page: the following pages' offsets no longer
+                    # line up, so refetch from where this one ended
+                    break
 
-                    if not has_next or not flows:
-                        break
+    async def _fetch_traffic_flow_page(
+        self,
+        url: str,
+        offset: int,
+        time_range: str
+    ) -> Optional[tuple]:
+        """
+        Fetch one page of v2 traffic flows
 
-                    offset += len(flows)
+        Args:
+            url: traffic-flows endpoint URL
+            offset: Offset of the first flow to return
+            time_range: Time range string like "24h"
 
-            logger.info(f"Retrieved {len(all_events)} IPS events from traffic flows v2 API")
+        Returns:
+            Tuple of (flows, has_next), or None if the endpoint isn't available
 
-            # Normalize v2 events to legacy format for parser compatibility
-            normalized_events = [self._normalize_v2_event(e) for e in all_events]
-            return normalized_events
+        Raises:
+            RuntimeError: If the controller returns an error status
+        """
+        payload = {
+            "limit": TRAFFIC_FLOW_PAGE_SIZE,
+            "offset": offset,
+            "timeRange": time_range
+        }
 
-        except Exception as e:
-            logger.error(f"Failed to get traffic flows: {e}")
-            return []
+        logger.debug("Fetching traffic flows from: %s", url)
+        logger.debug("Traffic flows payload: %s", payload)
+
+        async with self._session.post(url, data=orjson.dumps(payload), headers=_JSON_HEADERS) as resp:
+            if resp.status == 405:
+                logger.debug("Traffic flows v2 endpoint returned 405 - not available")
+                return None
+            if resp.status != 200:
+                resp_text = await resp.text()
+                logger.debug(f"Traffic flows error response: {resp_text[:500] if resp_text else 'empty'}")
+                raise RuntimeError(f"HTTP {resp.status}")
+
+            data = orjson.loads(await resp.read())
+            return data.get('data', []), data.get('has_next', False)
 
     async def get_ips_events(
         self,
@@ -1039,8 +1468,7 @@ class UniFiClient:
 
         # Fall back to legacy stat/ips/event endpoint
         try:
-            import time
-            now_ms = int(time.time() * 1000)
+            now_ms = time.time_ns() // 1_000_000
             day_ago_ms = now_ms - (24 * 60 * 60 * 1000)
 
             payload = {
@@ -1049,28 +1477,25 @@ class UniFiClient:
                 "_limit": limit
             }
 
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/stat/ips/event"
-            else:
-                url = f"{self.host}/api/s/{self.site}/stat/ips/event"
+            url = f"{self._api_base}/stat/ips/event"
 
-            logger.debug(f"Fetching IPS events from legacy endpoint: {url}")
-            logger.debug(f"IPS events payload: {payload}")
+            logger.debug("Fetching IPS events from legacy endpoint: %s", url)
+            logger.debug("IPS events payload: %s", payload)
 
-            async with self._session.post(url, json=payload) as resp:
+            async with self._session.post(url, data=orjson.dumps(payload), headers=_JSON_HEADERS) as resp:
                 if resp.status != 200:
                     resp_text = await resp.text()
                     logger.error(f"Failed to get IPS events: HTTP {resp.status}")
                     logger.debug(f"IPS events error response: {resp_text[:500] if resp_text else 'empty'}")
                     return []
 
-                data = await resp.json()
+                data = orjson.loads(await resp.read())
                 events = data.get('data', [])
 
                 # Log response metadata for debugging
                 meta = data.get('meta', {})
                 if meta:
-                    logger.debug(f"IPS events response meta: {meta}")
+                    logger.debug("IPS events response meta: %s", meta)
 
                 logger.info(f"Retrieved {len(events)} IPS events from legacy API")
 
@@ -1085,10 +1510,15 @@ class UniFiClient:
             logger.error(f"Failed to get IPS events from UniFi controller: {e}")
             return []
 
-    async def get_system_info(self) -> Dict:
+    async def get_system_info(self, force: bool = False) -> Dict:
         """
         Get system information including gateway model, health, and stats
 
+        The result is reused for a few seconds (see RESULT_CACHE_TTLS).
+
+        Args:
+            force: Skip the cached result and always ask the controller
+
         Returns:
             Dictionary with system info including:
             - gateway_model: Gateway device model
@@ -1100,6 +1530,17 @@ class UniFiClient:
             - wan_status: WAN connection status
             - wan_ip: WAN IP address
         """
+        return await self._cached_result(
+            ('system_info',), RESULT_CACHE_TTLS['system_info'], self._request_system_info, force
+        )
+
+    async def _request_system_info(self) -> Dict:
+        """
+        Request the device and client lists and summarize them for get_system_info()
+
+        Returns:
+            System info dictionary
+        """
         if not self._session:
             raise RuntimeError("Not connected to UniFi controller. Call connect() first.")
 
@@ -1123,72 +1564,77 @@ class UniFiClient:
                 "switch_count": 0,
             }
 
-            # Get all devices
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/stat/device"
-            else:
-                url = f"{self.host}/api/s/{self.site}/stat/device"
-
-            async with self._session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    devices = data.get('data', [])
-
-                    for device in devices:
-                        device_type = device.get('type', '')
-
-                        # Count device types
-                        if device_type == 'uap':
-                            result['ap_count'] += 1
-                        elif device_type == 'usw':
-                            result['switch_count'] += 1
-
-                        # Find gateway (UDM, USG, UCG, UXG, UX)
-                        if device_type in ('ugw', 'udm', 'uxg', 'ux'):
-                            model_code = device.get('model', 'Unknown')
-                            result['gateway_model'] = get_friendly_model_name(model_code)
-                            result['gateway_name'] = device.get('name', result['gateway_model'])
-                            result['gateway_version'] = device.get('version', 'Unknown')
-                            result['uptime'] = device.get('uptime')
-
-                            # System stats
-                            system_stats = device.get('system-stats', {})
-                            if system_stats:
-                                cpu = system_stats.get('cpu')
-                                mem = system_stats.get('mem')
-                                result['cpu_utilization'] = float(cpu) if cpu else None
-                                result['mem_utilization'] = float(mem) if mem else None
-
-                            # WAN info from uplink
-                            uplink = device.get('uplink', {})
-                            if uplink:
-                                result['wan_ip'] = uplink.get('ip')
-                                result['wan_status'] = 'connected' if uplink.get('up') else 'disconnected'
-
-                            # Speedtest results
-                            speedtest = device.get('speedtest-status', {})
-                            if speedtest:
-                                result['download_speed'] = speedtest.get('xput_download')
-                                result['upload_speed'] = speedtest.get('xput_upload')
-                                result['latency'] = speedtest.get('latency')
-
-                        # Store device summary
-                        result['devices'].append({
-                            'name': device.get('name', device.get('model', 'Unknown')),
-                            'model': device.get('model'),
-                            'type': device_type,
-                            'mac': device.get('mac'),
-                            'state': device.get('state', 0),
-                            'uptime': device.get('uptime')
-                        })
+            # Devices and clients are independent requests; fetch them together
+            devices, clients = await asyncio.gather(
+                self._fetch_devices(),
+                self.get_clients(),
+                return_exceptions=True
+            )
+            if isinstance(clients, BaseException):
+                raise clients
+            if isinstance(devices, RuntimeError):
+                # Device list unavailable (e.g. HTTP error); report what we can
+                devices = []
+            elif isinstance(devices, BaseException):
+                raise devices
+
+            # Count device types
+            device_types = [device.get('type', '') for device in devices]
+            type_counts = Counter(device_types)
+            result['ap_count'] = type_counts['uap']
+            result['switch_count'] = type_counts['usw']
+
+            # Find gateway (UDM, USG, UCG, UXG, UX); if there are several,
+            # later ones overwrite earlier ones as before
+            for device, device_type in zip(devices, device_types):
+                if device_type not in GATEWAY_DEVICE_TYPES:
+                    continue
+
+                model_code = device.get('model', 'Unknown')
+                result['gateway_model'] = get_friendly_model_name(model_code)
+                result['gateway_name'] = device.get('name', result['gateway_model'])
+                result['gateway_version'] = device.get('version', 'Unknown')
+                result['uptime'] = device.get('uptime')
+
+                # System stats
+                system_stats = device.get('system-stats', {})
+                if system_stats:
+                    cpu = system_stats.get('cpu')
+                    mem = system_stats.get('mem')
+                    result['cpu_utilization'] = float(cpu) if cpu else None
+                    result['mem_utilization'] = float(mem) if mem else None
+
+                # WAN info from uplink
+                uplink = device.get('uplink', {})
+                if uplink:
+                    result['wan_ip'] = uplink.get('ip')
+                    result['wan_status'] = 'connected' if uplink.get('up') else 'disconnected'
+
+                # Speedtest results
+                speedtest = device.get('speedtest-status', {})
+                if speedtest:
+                    result['download_speed'] = speedtest.get('xput_download')
+                    result['upload_speed'] = speedtest.get('xput_upload')
+                    result['latency'] = speedtest.get('latency')
+
+            # Store device summaries
+            result['devices'] = [
+                {
+                    'name': device.get('name', device.get('model', 'Unknown')),
+                    'model': device.get('model'),
+                    'type': device_type,
+                    'mac': device.get('mac'),
+                    'state': device.get('state', 0),
+                    'uptime': device.get('uptime')
+                }
+                for device, device_type in zip(devices, device_types)
+            ]
 
             # If no gateway found, might be hosted/cloud controller
             if not result['gateway_model']:
                 result['is_hosted'] = True
                 result['gateway_model'] = 'Cloud Hosted'
 
-            # Get client count
-            clients = await self.get_clients()
             result['client_count'] = len(clients)
 
             return result
@@ -1197,99 +1643,114 @@ class UniFiClient:
             logger.error(f"Failed to get system info: {e}")
             raise
 
-    async def get_health(self) -> Dict:
+    async def get_health(self, force: bool = False) -> Dict:
         """
         Get site health information
 
+        A successful result is reused for a few seconds, so callers such as
+        get_wan_stats() asking right after one another share one request.
+
+        Args:
+            force: Skip the cached result and always ask the controller
+
         Returns:
             Dictionary with health subsystems (wan, www, lan, wlan, vpn)
         """
+        return await self._cached_result(
+            ('health',), RESULT_CACHE_TTLS['health'], self._request_health, force
+        )
+
+    async def _request_health(self) -> Dict:
+        """
+        Request stat/health and convert it for get_health()
+
+        Returns:
+            Dictionary with health subsystems, or {} on failure
+        """
         if not self._session:
             raise RuntimeError("Not connected to UniFi controller. Call connect() first.")
 
         try:
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/stat/health"
-            else:
-                url = f"{self.host}/api/s/{self.site}/stat/health"
-
-            async with self._session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    health_list = data.get('data', [])
-
-                    # Convert list to dict keyed by subsystem
-                    health = {}
-                    for item in health_list:
-                        subsystem = item.get('subsystem')
-                        if subsystem:
-                            health[subsystem] = {
-                                'status': item.get('status', 'unknown'),
-                                'num_user': item.get('num_user', 0),
-                                'num_guest': item.get('num_guest', 0),
-                                'num_adopted': item.get('num_adopted', 0),
-                                'num_disconnected': item.get('num_disconnected', 0),
-                                'num_pending': item.get('num_pending', 0),
-                                'tx_bytes': item.get('tx_bytes-r', 0),
-                                'rx_bytes': item.get('rx_bytes-r', 0),
-                                'latency': item.get('latency') if subsystem == 'www' else None,
-                            }
-
-                            # WAN-specific fields
-                            if subsystem in ('wan', 'wan2'):
-                                health[subsystem]['wan_ip'] = item.get('wan_ip')
-                                health[subsystem]['isp_name'] = item.get('isp_name')
-                                health[subsystem]['gw_name'] = item.get('gw_name')
-
-                                # Extract uptime stats (availability, latency)
-                                uptime_stats = item.get('uptime_stats', {})
-                                wan_key = 'WAN' if subsystem == 'wan' else 'WAN2'
-                                wan_stats = uptime_stats.get(wan_key, {})
-                                health[subsystem]['availability'] = wan_stats.get('availability')
-                                health[subsystem]['latency_avg'] = wan_stats.get('latency_average')
-
-                                # Gateway system stats
-                                gw_stats = item.get('gw_system-stats', {})
-                                if gw_stats:
-                                    health[subsystem]['uptime'] = gw_stats.get('uptime')
-
-                            # Build a reason string for non-ok status
-                            if item.get('status') != 'ok':
-                                reasons = []
-                                num_disconnected = item.get('num_disconnected', 0)
-                                num_pending = item.get('num_pending', 0)
-                                num_disabled = item.get('num_disabled', 0)
-
-                                if num_disconnected > 0:
-                                    device_type = 'APs' if subsystem == 'wlan' else 'switches' if subsystem == 'lan' else 'devices'
-                                    reasons.append(f"{num_disconnected} {device_type} offline")
-                                if num_pending > 0:
-                                    reasons.append(f"{num_pending} pending adoption")
-                                if num_disabled > 0:
-                                    reasons.append(f"{num_disabled} disabled")
-
-                                # VPN-specific: no VPN configured often shows as error
-                                if subsystem == 'vpn' and not reasons:
-                                    reasons.append("not configured")
-
-                                # WAN-specific issues
-                                if subsystem in ('wan', 'wan2'):
-                                    if not item.get('wan_ip'):
-                                        reasons.append("no IP assigned")
-                                    # Check for high latency or low availability
-                                    uptime_stats = item.get('uptime_stats', {})
-                                    wan_key = 'WAN' if subsystem == 'wan' else 'WAN2'
-                                    wan_stats = uptime_stats.get(wan_key, {})
-                                    availability = wan_stats.get('availability', 100)
-                                    if availability < 99:
-                                        reasons.append(f"{availability:.1f}% uptime")
-
-                                health[subsystem]['status_reason'] = ', '.join(reasons) if reasons else None
-
-                    return health
-                else:
-                    logger.error(f"Failed to get health: {resp.status}")
-                    return {}
+            url = f"{self._api_base}/stat/health"
+
+            resp_status, data = await self._get_conditional(url)
+            if data is None:
+                logger.error(f"Failed to get health: {resp_status}")
+                return {}
+
+            health_list = data.get('data', [])
+
+            # Convert list to dict keyed by subsystem
+            health = {}
+            for item in health_list:
+                subsystem = item.get('subsystem')
+                if not subsystem:
+                    continue
+
+                status = item.get('status', 'unknown')
+                num_disconnected = item.get('num_disconnected', 0)
+                num_pending = item.get('num_pending', 0)
+                is_wan = subsystem in ('wan', 'wan2')
+
+                entry = {
+                    'status': status,
+                    'num_user': item.get('num_user', 0),
+                    'num_guest': item.get('num_guest', 0),
+                    'num_adopted': item.get('num_adopted', 0),
+                    'num_disconnected': num_disconnected,
+                    'num_pending': num_pending,
+                    'tx_bytes': item.get('tx_bytes-r', 0),
+                    'rx_bytes': item.get('rx_bytes-r', 0),
+                    'latency': item.get('latency') if subsystem == 'www' else None,
+                }
+                health[subsystem] = entry
+
+                # WAN-specific fields
+                if is_wan:
+                    entry['wan_ip'] = item.get('wan_ip')
+                    entry['isp_name'] = item.get('isp_name')
+                    entry['gw_name'] = item.get('gw_name')
+
+                    # Extract uptime stats (availability, latency)
+                    wan_key = 'WAN' if subsystem == 'wan' else 'WAN2'
+                    wan_stats = item.get('uptime_stats', {}).get(wan_key, {})
+                    entry['availability'] = wan_stats.get('availability')
+                    entry['latency_avg'] = wan_stats.get('latency_average')
+
+                    # Gateway system stats
+                    gw_stats = item.get('gw_system-stats', {})
+                    if gw_stats:
+                        entry['uptime'] = gw_stats.get('uptime')
+
+                # Build a reason string for non-ok status
+                if status != 'ok':
+                    reasons = []
+                    num_disabled = item.get('num_disabled', 0)
+
+                    if num_disconnected > 0:
+                        device_type = _SUBSYSTEM_DEVICE_NAMES.get(subsystem, 'devices')
+                        reasons.append(f"{num_disconnected} {device_type} offline")
+                    if num_pending > 0:
+                        reasons.append(f"{num_pending} pending adoption")
+                    if num_disabled > 0:
+                        reasons.append(f"{num_disabled} disabled")
+
+                    # VPN-specific: no VPN configured often shows as error
+                    if subsystem == 'vpn' and not reasons:
+                        reasons.append("not configured")
+
+                    # WAN-specific issues
+                    if is_wan:
+                        if not entry['wan_ip']:
+                            reasons.append("no IP assigned")
+                        # Check for high latency or low availability
+                        availability = wan_stats.get('availability', 100)
+                        if availability < 99:
+                            reasons.append(f"{availability:.1f}% uptime")
+
+                    entry['status_reason'] = ', '.join(reasons) if reasons else None
+
+            return health
 
         except Exception as e:
             logger.error(f"Failed to get health info: {e}")
@@ -1336,38 +1797,31 @@ class UniFiClient:
             raise RuntimeError("Not connected to UniFi controller. Call connect() first.")
 
         try:
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/stat/device"
-            else:
-                url = f"{self.host}/api/s/{self.site}/stat/device"
+            # Served from the device cache when another call just fetched it
+            devices = await self._fetch_devices()
+
+            # Check for gateway device types
+            # ux = UniFi Express, ugw = USG, udm = Dream Machine, uxg = UXG series
+            for device in devices:
+                device_type = device.get('type', '')
+                if device_type in GATEWAY_DEVICE_TYPES:
+                    logger.info(f"Found gateway: {device.get('model', 'Unknown')} (type: {device_type})")
+                    return True
 
-            async with self._session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    devices = data.get('data', [])
-
-                    # Check for gateway device types
-                    # ux = UniFi Express, ugw = USG, udm = Dream Machine, uxg = UXG series
-                    for device in devices:
-                        device_type = device.get('type', '')
-                        if device_type in ('ugw', 'udm', 'uxg', 'ux'):
-                            logger.info(f"Found gateway: {device.get('model', 'Unknown')} (type: {device_type})")
-                            return True
-
-                    logger.info("No gateway device found in devices list")
-                    return False
-                else:
-                    logger.error(f"Failed to get devices: {resp.status}")
-                    return False
+            logger.info("No gateway device found in devices list")
+            return False
 
         except Exception as e:
             logger.error(f"Failed to check for gateway: {e}")
             return False
 
-    async def get_gateway_info(self) -> Dict:
+    async def get_gateway_info(self, force: bool = False) -> Dict:
         """
         Get detailed gateway information including IDS/IPS capability.
 
+        Args:
+            force: Skip the cached device list and always ask the controller
+
         Returns:
             Dictionary with:
             - has_gateway: True if any gateway device is present
@@ -1386,56 +1840,39 @@ class UniFiClient:
         }
 
         try:
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/stat/device"
-            else:
-                url = f"{self.host}/api/s/{self.site}/stat/device"
-
-            async with self._session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    devices = data.get('data', [])
-
-                    # Look for gateway device types
-                    # Prioritize dedicated gateways (ugw, udm, uxg) over UniFi Express (ux)
-                    # because Express can be either a standalone gateway OR just a mesh AP
-                    express_device = None
-                    for device in devices:
-                        device_type = device.get('type', '')
-                        if device_type in ('ugw', 'udm', 'uxg'):
-                            # Dedicated gateway — always use this
-                            model_code = device.get('model', '').upper()
-                            result["has_gateway"] = True
-                            result["gateway_model"] = model_code
-                            result["gateway_name"] = device.get('name') or get_friendly_model_name(model_code)
-                            result["supports_ids_ips"] = model_code in IDS_IPS_SUPPORTED_MODELS
-
-                            logger.info(
-                                f"Found gateway: {result['gateway_name']} ({model_code}, type: {device_type}), "
-                                f"IDS/IPS: {result['supports_ids_ips']}"
-                            )
-                            return result
-                        elif device_type == 'ux' and express_device is None:
-                            # UniFi Express — save as fallback in case no dedicated gateway exists
-                            express_device = device
-
-                    # No dedicated gateway found; use Express if present (standalone mode)
-                    if express_device:
-                        model_code = express_device.get('model', '').upper()
-                        result["has_gateway"] = True
-                        result["gateway_model"] = model_code
-                        result["gateway_name"] = express_device.get('name') or get_friendly_model_name(model_code)
-                        result["supports_ids_ips"] = model_code in IDS_IPS_SUPPORTED_MODELS
-
-                        logger.info(
-                            f"Found Express as gateway: {result['gateway_name']} ({model_code}), "
-                            f"IDS/IPS: {result['supports_ids_ips']}"
-                        )
-                        return result
+            # Served from the device cache when another call just fetched it
+            devices = await self._fetch_devices(force)
 
-                    logger.info("No gateway device found in devices list")
+            # Prioritize dedicated gateways (ugw, udm, uxg) over UniFi Express (ux)
+            # because Express can be either a standalone gateway OR just a mesh AP
+            gateway = next(
+                (d for d in devices if d.get('type', '') in DEDICATED_GATEWAY_DEVICE_TYPES), None
+            )
+            is_express = gateway is None
+            if is_express:
+                gateway = next((d for d in devices if d.get('type', '') == 'ux'), None)
+
+            if gateway is not None:
+                model_code = gateway.get('model', '').upper()
+                result["has_gateway"] = True
+                result["gateway_model"] = model_code
+                result["gateway_name"] = gateway.get('name') or get_friendly_model_name(model_code)
+                result["supports_ids_ips"] = model_code in IDS_IPS_SUPPORTED_MODELS
+
+                if is_express:
+                    # No dedicated gateway, so Express is running standalone
+                    logger.info(
+                        f"Found Express as gateway: {result['gateway_name']} ({model_code}), "
+                        f"IDS/IPS: {result['supports_ids_ips']}"
+                    )
                 else:
-                    logger.error(f"Failed to get devices: {resp.status}")
+                    logger.info(
+                        f"Found gateway: {result['gateway_name']} ({model_code}, "
+                        f"type: {gateway.get('type', '')}), IDS/IPS: {result['supports_ids_ips']}"
+                    )
+                return result
+
+            logger.info("No gateway device found in devices list")
 
         except Exception as e:
             logger.error(f"Failed to get gateway info: {e}")
@@ -1468,32 +1905,30 @@ class UniFiClient:
         }
 
         try:
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/rest/setting"
-            else:
-                url = f"{self.host}/api/s/{self.site}/rest/setting"
+            url = f"{self._api_base}/rest/setting"
 
             async with self._session.get(url) as resp:
                 if resp.status == 200:
-                    data = await resp.json()
+                    data = orjson.loads(await resp.read())
                     settings_list = data.get('data', [])
 
                     # Find the IPS settings object (key = "ips")
-                    for setting in settings_list:
-                        if setting.get('key') == 'ips':
-                            ips_mode = setting.get('ips_mode', 'disabled')
-                            result["ips_mode"] = ips_mode
-                            result["ips_enabled"] = ips_mode in ('ids', 'ips', 'ipsInline')
-                            result["honeypot_enabled"] = setting.get('honeypot_enabled', False)
-                            result["dns_filtering"] = setting.get('dns_filtering', False)
-                            result["ad_blocking_enabled"] = setting.get('ad_blocking_enabled', False)
-
-                            logger.debug(f"IPS settings: mode={ips_mode}, enabled={result['ips_enabled']}")
-                            return result
-
-                    # No IPS settings found - might be disabled or not available
-                    logger.debug("No IPS settings found in site configuration")
-                    result["ips_mode"] = "disabled"
+                    ips = next((setting for setting in settings_list if setting.get('key') == 'ips'), None)
+
+                    if ips is None:
+                        # No IPS settings found - might be disabled or not available
+                        logger.debug("No IPS settings found in site configuration")
+                        result["ips_mode"] = "disabled"
+                        return result
+
+                    ips_mode = ips.get('ips_mode', 'disabled')
+                    result["ips_mode"] = ips_mode
+                    result["ips_enabled"] = ips_mode in ('ids', 'ips', 'ipsInline')
+                    result["honeypot_enabled"] = ips.get('honeypot_enabled', False)
+                    result["dns_filtering"] = ips.get('dns_filtering', False)
+                    result["ad_blocking_enabled"] = ips.get('ad_blocking_enabled', False)
+
+                    logger.debug(f"IPS settings: mode={ips_mode}, enabled={result['ips_enabled']}")
                 else:
                     logger.warning(f"Failed to get site settings: {resp.status}")
                     result["error"] = f"Failed to retrieve settings (HTTP {resp.status})"
@@ -1539,25 +1974,50 @@ class UniFiClient:
         finally:
             await self.disconnect()
 
-    async def get_site_stats(self, interval: str = "hourly", hours: int = 24) -> List[Dict]:
+    async def get_site_stats(
+        self,
+        interval: str = "hourly",
+        hours: int = 24,
+        force: bool = False
+    ) -> List[Dict]:
         """
         Get historical site bandwidth stats.
 
+        Results are reused for a few minutes per interval and range (see
+        RESULT_CACHE_TTLS).
+
         Args:
             interval: "5minutes", "hourly", or "daily"
             hours: How many hours of data to fetch (for 5minutes/hourly) or days (for daily)
+            force: Skip the cached result and always ask the controller
 
         Returns:
             List of dicts with: time, wan_tx_bytes, wan_rx_bytes, num_sta
         """
+        return await self._cached_result(
+            ('site_stats', interval, hours),
+            RESULT_CACHE_TTLS['site_stats'],
+            lambda: self._request_site_stats(interval, hours),
+            force
+        )
+
+    async def _request_site_stats(self, interval: str, hours: int) -> List[Dict]:
+        """
+        Request one site stats report for get_site_stats()
+
+        Args:
+            interval: "5minutes", "hourly", or "daily"
+            hours: Hours (or days, for daily) of data to fetch
+
+        Returns:
+            List of stat dicts, or [] on failure
+        """
         if not self._session:
             raise RuntimeError("Not connected to UniFi controller. Call connect() first.")
 
         try:
-            import time
-
             # Calculate time range
-            now_ms = int(time.time() * 1000)
+            now_ms = time.time_ns() // 1_000_000
             if interval == "daily":
                 # For daily, treat hours as days
                 start_ms = now_ms - (hours * 24 * 60 * 60 * 1000)
@@ -1579,13 +2039,10 @@ class UniFiClient:
             }
             endpoint_interval = interval_map.get(interval, "hourly")
 
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/stat/report/{endpoint_interval}.site"
-            else:
-                url = f"{self.host}/api/s/{self.site}/stat/report/{endpoint_interval}.site"
+            url = f"{self._api_base}/stat/report/{endpoint_interval}.site"
 
-            logger.debug(f"Requesting site stats from: {url}")
-            logger.debug(f"Payload: {payload}")
+            logger.debug("Requesting site stats from: %s", url)
+            logger.debug("Payload: %s", payload)
 
             async with self._session.post(url, json=payload) as resp:
                 if resp.status != 200:
@@ -1593,13 +2050,14 @@ class UniFiClient:
                     logger.error(f"Failed to get site stats: {resp.status} - {resp_text}")
                     return []
 
-                data = await resp.json()
+                data = orjson.loads(await resp.read())
                 stats_list = data.get('data', [])
-                logger.debug(f"Site stats response keys: {data.keys() if isinstance(data, dict) else 'not a dict'}")
 
-                if stats_list:
-                    logger.debug(f"First stat entry keys: {stats_list[0].keys() if stats_list else 'empty'}")
-                    logger.debug(f"First stat entry: {stats_list[0] if stats_list else 'empty'}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Site stats response keys: {data.keys() if isinstance(data, dict) else 'not a dict'}")
+                    if stats_list:
+                        logger.debug(f"First stat entry keys: {stats_list[0].keys()}")
+                        logger.debug(f"First stat entry: {stats_list[0]}")
 
                 # Normalize field names - handle both hyphen and underscore variants
                 result = []
@@ -1613,7 +2071,7 @@ class UniFiClient:
 
                 # Filter out entries without valid time
                 result = [r for r in result if r.get('time') is not None]
-                logger.debug(f"Retrieved {len(result)} {interval} site stats")
+                logger.debug("Retrieved %d %s site stats", len(result), interval)
                 return result
 
         except Exception as e:
@@ -1639,101 +2097,115 @@ class UniFiClient:
         # Fall back to hourly
         return await self.get_site_stats(interval="hourly", hours=hours)
 
-    async def get_ap_details(self) -> List[Dict]:
+    async def get_ap_details(self, force: bool = False) -> List[Dict]:
         """
         Get detailed AP statistics including client counts.
 
+        The result is reused for a few seconds (see RESULT_CACHE_TTLS).
+
+        Args:
+            force: Skip the cached result and always ask the controller
+
         Returns:
             List of dicts with: mac, name, model, num_sta, channel, tx_bytes, rx_bytes, state
         """
+        return await self._cached_result(
+            ('ap_details',), RESULT_CACHE_TTLS['ap_details'], self._request_ap_details, force
+        )
+
+    async def _request_ap_details(self) -> List[Dict]:
+        """
+        Extract the AP details for get_ap_details() from the device list
+
+        Returns:
+            List of AP detail dicts, or [] on failure
+        """
         if not self._session:
             raise RuntimeError("Not connected to UniFi controller. Call connect() first.")
 
         try:
-            if self.is_unifi_os:
-                url = f"{self.host}/proxy/network/api/s/{self.site}/stat/device"
-            else:
-                url = f"{self.host}/api/s/{self.site}/stat/device"
-
-            async with self._session.get(url) as resp:
-                if resp.status != 200:
-                    logger.error(f"Failed to get AP details: {resp.status}")
-                    return []
+            # Shares the cached device list with the gateway and AP lookups
+            devices = await self._fetch_devices()
+
+            # Filter for APs and extract relevant stats
+            aps = []
+            for device in devices:
+                if device.get('type') == 'uap':
+                    model_code = device.get('model', '')
+
+                    # Get radio info for channel
+                    radio_table = device.get('radio_table', [])
+                    channels = []
+                    for radio in radio_table:
+                        channel = radio.get('channel')
+                        if channel:
+                            channels.append(str(channel))
+
+                    # Get stats
+                    stat = device.get('stat', {})
+
+                    aps.append({
+                        'mac': device.get('mac', '').lower(),
+                        'name': device.get('name') or get_friendly_model_name(model_code),
+                        'model': get_friendly_model_name(model_code),
+                        'model_code': model_code,
+                        'num_sta': device.get('num_sta', 0),
+                        'user_num_sta': device.get('user-num_sta', 0),
+                        'guest_num_sta': device.get('guest-num_sta', 0),
+                        'channels': ', '.join(channels) if channels else None,
+                        'tx_bytes': stat.get('tx_bytes', 0) if stat else 0,
+                        'rx_bytes': stat.get('rx_bytes', 0) if stat else 0,
+                        'state': device.get('state', 0),  # 1 = online, 0 = offline
+                        'uptime': device.get('uptime', 0),
+                        'satisfaction': device.get('satisfaction', None)
+                    })
 
-                data = await resp.json()
-                devices = data.get('data', [])
-
-                # Filter for APs and extract relevant stats
-                aps = []
-                for device in devices:
-                    if device.get('type') == 'uap':
-                        model_code = device.get('model', '')
-
-                        # Get radio info for channel
-                        radio_table = device.get('radio_table', [])
-                        channels = []
-                        for radio in radio_table:
-                            channel = radio.get('channel')
-                            if channel:
-                                channels.append(str(channel))
-
-                        # Get stats
-                        stat = device.get('stat', {})
-
-                        aps.append({
-                            'mac': device.get('mac', '').lower(),
-                            'name': device.get('name') or get_friendly_model_name(model_code),
-                            'model': get_friendly_model_name(model_code),
-                            'model_code': model_code,
-                            'num_sta': device.get('num_sta', 0),
-                            'user_num_sta': device.get('user-num_sta', 0),
-                            'guest_num_sta': device.get('guest-num_sta', 0),
-                            'channels': ', '.join(channels) if channels else None,
-                            'tx_bytes': stat.get('tx_bytes', 0) if stat else 0,
-                            'rx_bytes': stat.get('rx_bytes', 0) if stat else 0,
-                            'state': device.get('state', 0),  # 1 = online, 0 = offline
-                            'uptime': device.get('uptime', 0),
-                            'satisfaction': device.get('satisfaction', None)
-                        })
-
-                logger.debug(f"Retrieved details for {len(aps)} APs")
-                return aps
+            logger.debug("Retrieved details for %d APs", len(aps))
+            return aps
 
         except Exception as e:
             logger.error(f"Failed to get AP details: {e}")
             return []
 
-    async def get_top_clients(self, limit: int = 10) -> List[Dict]:
+    async def get_top_clients(self, limit: int = 10, clients: Optional[Dict] = None) -> List[Dict]:
         """
         Get top N clients by bandwidth usage.
 
         Args:
             limit: Maximum number of clients to return (default: 10)
+            clients: Result of get_clients() if the caller already has it;
+                     fetched from the controller if omitted
 
         Returns:
             List of dicts sorted by total bytes (tx + rx) descending
         """
         try:
-            clients = await self.get_clients()
+            if clients is None:
+                clients = await self.get_clients()
+
+            def total_bytes(client: Dict) -> int:
+                return (client.get('tx_bytes', 0) or 0) + (client.get('rx_bytes', 0) or 0)
+
+            # Pick the top N before building any output rows; nlargest keeps
+            # the same order as sorted(..., reverse=True)[:limit]
+            top = heapq.nlargest(limit, clients.items(), key=lambda item: total_bytes(item[1]))
 
-            # Calculate total bytes and prepare list
-            clients_with_totals = []
-            for mac, client in clients.items():
+            sorted_clients = []
+            for mac, client in top:
                 tx_bytes = client.get('tx_bytes', 0) or 0
                 rx_bytes = client.get('rx_bytes', 0) or 0
-                total_bytes = tx_bytes + rx_bytes
 
                 # Get display name (prefer name, then hostname, then MAC)
                 display_name = client.get('name') or client.get('hostname') or mac
 
-                clients_with_totals.append({
+                sorted_clients.append({
                     'mac': mac,
                     'name': display_name,
                     'hostname': client.get('hostname'),
                     'ip': client.get('ip'),
                     'tx_bytes': tx_bytes,
                     'rx_bytes': rx_bytes,
-                    'total_bytes': total_bytes,
+                    'total_bytes': tx_bytes + rx_bytes,
                     'rssi': client.get('rssi'),
                     'signal': client.get('rssi'),  # alias for convenience
                     'is_wired': client.get('is_wired', False),
@@ -1744,31 +2216,9 @@ class UniFiClient:
                     'network': client.get('network') or client.get('essid')  # Use network name or SSID
                 })
 
-            # Sort by total bytes descending and limit
-            sorted_clients = sorted(
-                clients_with_totals,
-                key=lambda x: x['total_bytes'],
-                reverse=True
-            )[:limit]
-
-            logger.debug(f"Returning top {len(sorted_clients)} clients by bandwidth")
+            logger.debug("Returning top %d clients by bandwidth", len(sorted_clients))
             return sorted_clients
 
         except Exception as e:
             logger.error(f"Failed to get top clients: {e}")
             return []
-
-    def __del__(self):
-        """
-        Cleanup when object is destroyed
-        """
-        # Note: Can't use await in __del__, so we just close the session
-        if self._session and not self._session.closed:
-            # Schedule the close operation
-            try:
-                import asyncio
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    loop.create_task(self._session.close())
-            except:
-                pass
@@ -0,0 +1,209 @@
+"""
+Shared, long-lived UniFi controller client
+
+Logging in to the controller costs a TLS handshake plus an auth round-trip,
+so request handlers reuse one connected client instead of connecting and
+disconnecting on every call.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from shared.unifi_client import UniFiClient
+
+logger = logging.getLogger(__name__)
+
+# Reconnect after this long even without errors. Client methods mostly
+# swallow HTTP errors, so an expired controller session wouldn't surface.
+CLIENT_MAX_AGE_SECONDS = 300
+
+# A replaced client stays connected this long before it is closed, so
+# requests already running on it can finish
+RETIRED_CLIENT_GRACE_SECONDS = 60
+
+_client: Optional[UniFiClient] = None
+_client_key: Optional[tuple] = None
+_connected_at: float = 0.0
+_lock = asyncio.Lock()
+
+# Pending delayed disconnects of replaced clients
+_retiring: dict = {}
+
+
+def _decrypt_config(config) -> tuple:
+    """
+    Decrypt the stored UniFi credentials
+
+    Args:
+        config: UniFiConfig row
+
+    Returns:
+        Tuple of (password, api_key), either of which may be None
+    """
+    from shared.crypto import decrypt_credentials
+
+    return decrypt_credentials(config)
+
+
+async def load_unifi_credentials() -> Optional[dict]:
+    """
+    Get the saved UniFi connection settings with decrypted credentials.
+
+    Served from shared.cache when possible; the database is only read
+    (and the credentials decrypted) on a cache miss.
+
+    Returns:
+        Credentials dict, or None if the controller isn't configured
+    """
+    from sqlalchemy import select
+    from shared.database import get_database
+    from shared.models.unifi_config import UniFiConfig
+    from shared import cache
+
+    credentials = cache.get_cached_credentials()
+    if credentials is not None:
+        return credentials
+
+    async with get_database().session() as session:
+        result = await session.execute(select(UniFiConfig))
+        config = result.scalar_one_or_none()
+
+    if not config:
+        return None
+
+    # Decrypt credentials in a worker thread to keep the event loop free
+    password, api_key = await asyncio.to_thread(_decrypt_config, config)
+
+    credentials = {
+        "controller_url": config.controller_url,
+        "username": config.username,
+        "password": password,
+        "api_key": api_key,
+        "site_id": config.site_id,
+        "verify_ssl": config.verify_ssl
+    }
+    cache.set_cached_credentials(credentials)
+    return credentials
+
+
+async def _disconnect(client: UniFiClient):
+    """Disconnect a client, logging rather than raising errors"""
+    try:
+        await client.disconnect()
+    except Exception as e:
+        logger.debug(f"Error disconnecting UniFi client: {e}")
+
+
+async def _disconnect_later(client: UniFiClient):
+    """Disconnect a replaced client once in-flight requests have had time to finish"""
+    await asyncio.sleep(RETIRED_CLIENT_GRACE_SECONDS)
+    await _disconnect(client)
+
+
+def _retire_client():
+    """
+    Forget the shared client and schedule its disconnect after
+    RETIRED_CLIENT_GRACE_SECONDS. Caller must hold _lock.
+    """
+    global _client, _client_key
+
+    if _client is not None:
+        task = asyncio.create_task(_disconnect_later(_client))
+        _retiring[task] = _client
+        task.add_done_callback(lambda t: _retiring.pop(t, None))
+    _client = None
+    _client_key = None
+
+
+async def get_unifi_client(credentials: Optional[dict] = None) -> Optional[UniFiClient]:
+    """
+    Get the shared, connected UniFi client.
+
+    A new client is connected on first use, when the credentials change,
+    after invalidate_unifi_client(), or once the current one is older than
+    CLIENT_MAX_AGE_SECONDS. Callers must not disconnect the returned client.
+
+    Args:
+        credentials: Credentials from load_unifi_credentials(); loaded if omitted
+
+    Returns:
+        Connected UniFiClient, or None if not configured or the connection failed
+    """
+    global _client, _client_key, _connected_at
+
+    if credentials is None:
+        credentials = await load_unifi_credentials()
+        if not credentials:
+            return None
+
+    key = tuple(sorted(credentials.items()))
+
+    async with _lock:
+        if (
+            _client is not None
+            and _client_key == key
+            and time.monotonic() - _connected_at < CLIENT_MAX_AGE_SECONDS
+        ):
+            return _client
+
+        _retire_client()
+
+        # is_unifi_os is auto-detected during connection
+        client = UniFiClient(
+            host=credentials["controller_url"],
+            username=credentials["username"],
+            password=credentials["password"],
+            api_key=credentials["api_key"],
+            site=credentials["site_id"],
+            verify_ssl=credentials["verify_ssl"]
+        )
+        if not await client.connect():
+            return None
+
+        _client = client
+        _client_key = key
+        _connected_at = time.monotonic()
+        logger.debug("Connected shared UniFi client")
+        return _client
+
+
+async def invalidate_unifi_client(client: Optional[UniFiClient] = None):
+    """
+    Drop the shared client so the next get_unifi_client() reconnects.
+
+    Call this with the client after a request on it fails; nothing happens
+    if that client has already been replaced, so one stale failure doesn't
+    drop a freshly connected client. Without an argument (e.g. after the
+    config changes) the current client is always dropped. Either way the
+    old client is only disconnected after a grace period.
+
+    Args:
+        client: The client the failed request ran on
+    """
+    async with _lock:
+        if client is not None and client is not _client:
+            return
+        _retire_client()
+
+
+async def close_unifi_client():
+    """
+    Disconnect the shared client, and any replaced clients still waiting
+    to be closed, on application shutdown
+    """
+    global _client, _client_key
+
+    async with _lock:
+        clients = list(_retiring.values())
+        for task in list(_retiring):
+            task.cancel()
+        _retiring.clear()
+
+        if _client is not None:
+            clients.append(_client)
+        _client = None
+        _client_key = None
+
+    for client in clients:
+        await _disconnect(client)
@@ -1,13 +1,16 @@
 """Tests for authentication module."""
 import os
+import time
 import bcrypt
-from datetime import datetime, timedelta
+from collections import deque
+from datetime import timedelta
 from unittest.mock import patch
 
 import pytest
 
 from app.routers.auth import (
     is_auth_enabled,
+    load_auth_config,
     verify_password,
     create_session,
     verify_session,
@@ -15,22 +18,40 @@ from app.routers.auth import (
     record_login_attempt,
     _sessions,
     _login_attempts,
+    _verified_passwords,
+    _record_and_check,
+    sweep_expired,
+    RATE_LIMIT_WINDOW,
+    RATE_LIMIT_MAX_ATTEMPTS,
 )
 
 
 class TestAuthEnabled:
     """Tests for auth enabled check."""
 
+    def teardown_method(self):
+        """Restore auth config from the real environment."""
+        load_auth_config()
+
     def test_auth_disabled_in_local_mode(self):
         """Should return False when deployment type is local."""
         with patch.dict(os.environ, {"DEPLOYMENT_TYPE": "local"}):
+            load_auth_config()
             assert is_auth_enabled() is False
 
     def test_auth_enabled_in_production_mode(self):
         """Should return True when deployment type is production."""
         with patch.dict(os.environ, {"DEPLOYMENT_TYPE": "production"}):
+            load_auth_config()
             assert is_auth_enabled() is True
 
+    def test_auth_setting_read_at_load_time(self):
+        """Changing the environment should not take effect until config is reloaded."""
+        with patch.dict(os.environ, {"DEPLOYMENT_TYPE": "local"}):
+            load_auth_config()
+            os.environ["DEPLOYMENT_TYPE"] = "production"
+            assert is_auth_enabled() is False
+
     def test_auth_disabled_by_default(self):
         """Should default to False when DEPLOYMENT_TYPE not set."""
         env = os.environ.copy()
@@ -38,6 +59,7 @@ class TestAuthEnabled:
             del env["DEPLOYMENT_TYPE"]
 
         with patch.dict(os.environ, env, clear=True):
+            load_auth_config()
             assert is_auth_enabled() is False
 
 
@@ -82,6 +104,26 @@ class TestPasswordVerification:
 
         assert verify_password(password, invalid_hash) is False
 
+    def test_verify_missing_hash_still_runs_bcrypt(self):
+        """Should return False but still pay the bcrypt cost when no hash is configured."""
+        with patch("bcrypt.checkpw", wraps=bcrypt.checkpw) as checkpw:
+            assert verify_password("test", "") is False
+
+        assert checkpw.call_count == 1
+
+    def test_verified_password_is_cached(self):
+        """A recently verified password should not be checked with bcrypt again."""
+        _verified_passwords.clear()
+        password = "MySecurePass123"
+        password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+        with patch("bcrypt.checkpw", wraps=bcrypt.checkpw) as checkpw:
+            assert verify_password(password, password_hash) is True
+            assert verify_password(password, password_hash) is True
+            assert verify_password("WrongPassword456", password_hash) is False
+
+        assert checkpw.call_count == 2
+
 
 class TestSessionManagement:
     """Tests for session creation and verification."""
@@ -113,11 +155,11 @@ class TestSessionManagement:
         assert "expires_at" in session
 
         # Should expire in approximately 7 days
-        expected_expiry = datetime.utcnow() + timedelta(days=7)
+        expected_expiry = time.monotonic() + timedelta(days=7).total_seconds()
         actual_expiry = session["expires_at"]
 
         # Allow 1 minute difference for test execution time
-        time_diff = abs((actual_expiry - expected_expiry).total_seconds())
+        time_diff = abs(actual_expiry - expected_expiry)
         assert time_diff < 60
 
     def test_create_session_generates_unique_tokens(self):
@@ -148,7 +190,7 @@ class TestSessionManagement:
         token = create_session("testuser")
 
         # Manually expire the session
-        _sessions[token]["expires_at"] = datetime.utcnow() - timedelta(hours=1)
+        _sessions[token]["expires_at"] = time.monotonic() - 3600
 
         session = verify_session(token)
 
@@ -196,6 +238,19 @@ class TestRateLimiting:
         assert is_allowed is False
         assert wait_seconds > 0
 
+    def test_record_and_check_matches_separate_calls(self):
+        """Recording a failure should report the same state as a separate check."""
+        ip = "192.168.1.100"
+
+        for _ in range(RATE_LIMIT_MAX_ATTEMPTS - 1):
+            assert _record_and_check(ip, success=False)[0] is True
+
+        is_allowed, wait_seconds = _record_and_check(ip, success=False)
+
+        assert is_allowed is False
+        assert wait_seconds > 0
+        assert check_rate_limit(ip)[0] is False
+
     def test_check_rate_limit_ignores_successful_attempts(self):
         """Should only count failed attempts for rate limiting."""
         ip = "192.168.1.100"
@@ -232,16 +287,31 @@ class TestRateLimiting:
         """Should remove login attempts older than the rate limit window."""
         ip = "192.168.1.100"
 
-        # Record old attempts (simulate by manipulating the list)
-        old_timestamp = datetime.utcnow() - timedelta(seconds=400)  # Older than 5min window
-        _login_attempts[ip] = [(old_timestamp, False)] * 5
+        # Record old attempts (simulate by manipulating the deque)
+        old_timestamp = time.monotonic() - 400  # Older than 5min window
+        _login_attempts[ip] = deque([(old_timestamp, False)] * 5)
 
         # Record new attempt
         record_login_attempt(ip, success=False)
 
         # Old attempts should be cleaned up
         recent_attempts = [ts for ts, _ in _login_attempts[ip]]
-        assert all(ts > datetime.utcnow() - timedelta(seconds=300) for ts in recent_attempts)
+        assert len(recent_attempts) == 1
+        assert all(ts > time.monotonic() - RATE_LIMIT_WINDOW for ts in recent_attempts)
+
+    def test_rate_limit_wait_measured_from_oldest_failure(self):
+        """Wait time should count from the oldest failed attempt, not older successes."""
+        ip = "192.168.1.100"
+        now = time.monotonic()
+
+        _login_attempts[ip] = deque(
+            [(now - 200, True)] + [(now - 100, False)] * RATE_LIMIT_MAX_ATTEMPTS
+        )
+
+        is_allowed, wait_seconds = check_rate_limit(ip)
+
+        assert is_allowed is False
+        assert RATE_LIMIT_WINDOW - 100 - 2 <= wait_seconds <= RATE_LIMIT_WINDOW - 100
 
     def test_rate_limit_wait_seconds_decreases_over_time(self):
         """Wait seconds should decrease as time passes."""
@@ -261,3 +331,35 @@ class TestRateLimiting:
 
         # Second check should have fewer wait seconds
         assert wait_seconds_2 <= wait_seconds_1
+
+
+class TestSweepExpired:
+    """Tests for the auth janitor sweep."""
+
+    def setup_method(self):
+        """Clear sessions and login attempts before each test."""
+        _sessions.clear()
+        _login_attempts.clear()
+
+    def test_sweep_removes_expired_sessions_only(self):
+        """Should drop sessions past expiry and keep valid ones."""
+        expired = create_session("olduser")
+        valid = create_session("newuser")
+        _sessions[expired]["expires_at"] = time.monotonic() - 1
+
+        sessions_removed, _ = sweep_expired()
+
+        assert sessions_removed == 1
+        assert expired not in _sessions
+        assert valid in _sessions
+
+    def test_sweep_removes_ips_with_no_recent_attempts(self):
+        """Should drop IPs whose attempts are all outside the window."""
+        _login_attempts["10.0.0.1"] = deque([(time.monotonic() - RATE_LIMIT_WINDOW - 1, False)])
+        record_login_attempt("10.0.0.2", success=False)
+
+        _, ips_removed = sweep_expired()
+
+        assert ips_removed == 1
+        assert "10.0.0.1" not in _login_attempts
+        assert "10.0.0.2" in _login_attempts
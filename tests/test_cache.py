@@ -124,6 +124,62 @@ class TestSystemStatusCache:
 
         assert result == data
 
+    def test_system_status_uses_short_ttl(self):
+        """System status should expire after its own, shorter TTL."""
+        data = {"health": "good"}
+        cache.set_system_status(data)
+
+        # Older than the system status TTL but within the default TTL
+        cache._cache["system_status"]["timestamp"] = (
+            datetime.now(timezone.utc) - timedelta(seconds=cache.SYSTEM_STATUS_TTL_SECONDS + 1)
+        )
+
+        assert cache.SYSTEM_STATUS_TTL_SECONDS + 1 < cache.CACHE_TTL_SECONDS
+        assert cache.get_system_status() is None
+
+
+class TestCredentialsCache:
+    """Tests for UniFi credentials caching."""
+
+    def setup_method(self):
+        """Clear cache before each test."""
+        cache.invalidate_all()
+
+    def test_get_cached_credentials_returns_none_when_empty(self):
+        """Should return None when cache is empty."""
+        assert cache.get_cached_credentials() is None
+
+    def test_credentials_outlive_default_ttl(self):
+        """Credentials should stay cached past the default TTL."""
+        data = {"controller_url": "https://192.168.1.1", "password": "secret"}
+        cache.set_cached_credentials(data)
+
+        cache._cache["credentials"]["timestamp"] = (
+            datetime.now(timezone.utc) - timedelta(seconds=cache.CACHE_TTL_SECONDS + 1)
+        )
+
+        assert cache.get_cached_credentials() == data
+
+    def test_credentials_expire_after_credentials_ttl(self):
+        """Credentials should expire after their own backstop TTL."""
+        cache.set_cached_credentials({"password": "secret"})
+
+        cache._cache["credentials"]["timestamp"] = (
+            datetime.now(timezone.utc) - timedelta(seconds=cache.CREDENTIALS_TTL_SECONDS + 1)
+        )
+
+        assert cache.get_cached_credentials() is None
+
+    def test_invalidate_credentials(self):
+        """Should drop only the cached credentials."""
+        cache.set_cached_credentials({"password": "secret"})
+        cache.set_gateway_info({"has_gateway": True})
+
+        cache.invalidate_credentials()
+
+        assert cache.get_cached_credentials() is None
+        assert cache.get_gateway_info() is not None
+
 
 class TestCacheInvalidation:
     """Tests for cache invalidation."""
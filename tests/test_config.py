@@ -109,6 +109,14 @@ class TestGetSettings:
 
         assert settings1 is settings2
 
+    def test_cache_clear_reloads_settings(self):
+        """Clearing the cache should build a new instance."""
+        settings1 = get_settings()
+        get_settings.cache_clear()
+        settings2 = get_settings()
+
+        assert settings1 is not settings2
+
     def test_settings_contain_expected_values(self):
         """Settings should contain values from environment."""
         # Note: get_settings() is a singleton, so we need to check current env values
@@ -7,8 +7,11 @@ from shared.crypto import (
     decrypt_password,
     encrypt_api_key,
     decrypt_api_key,
+    encrypt_credentials,
+    decrypt_credentials,
     generate_key,
 )
+from shared.models.unifi_config import UniFiConfig
 
 
 class TestPasswordEncryption:
@@ -104,6 +107,31 @@ class TestApiKeyEncryption:
         assert decrypted == api_key
 
 
+class TestCredentialsEncryption:
+    """Tests for packed password/API key encryption."""
+
+    def test_packed_credentials_round_trip(self):
+        """Should decrypt both values from the packed column."""
+        config = UniFiConfig(credentials_encrypted=encrypt_credentials("secret", "api-key-123"))
+
+        assert decrypt_credentials(config) == ("secret", "api-key-123")
+
+    def test_packed_credentials_preserve_none(self):
+        """Should return None for a value that wasn't stored."""
+        config = UniFiConfig(credentials_encrypted=encrypt_credentials(None, "api-key-123"))
+
+        assert decrypt_credentials(config) == (None, "api-key-123")
+
+    def test_falls_back_to_legacy_columns(self):
+        """Should read the separate columns when there are no packed credentials."""
+        config = UniFiConfig(
+            password_encrypted=encrypt_password("secret"),
+            api_key_encrypted=None,
+        )
+
+        assert decrypt_credentials(config) == ("secret", None)
+
+
 class TestKeyGeneration:
     """Tests for encryption key generation."""
 
@@ -0,0 +1,116 @@
+"""Tests for UniFiClient result caching."""
+import asyncio
+import time
+
+import pytest
+
+from shared.unifi_client import UniFiClient
+
+
+KEY = ("clients",)
+TTL = 15.0
+
+
+class CountingFetch:
+    """Fetch coroutine that counts calls and returns queued results."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def client():
+    """UniFiClient that is never connected to a controller."""
+    return UniFiClient("https://192.168.1.1", api_key="test-key")
+
+
+class TestCachedResult:
+    """Tests for UniFiClient._cached_result."""
+
+    async def test_concurrent_callers_share_one_fetch(self, client):
+        """Should run a single fetch for callers arriving while it's in flight."""
+        fetch = CountingFetch({"aa:bb": {"name": "laptop"}})
+        fetch.release = asyncio.Event()
+
+        waiters = [asyncio.ensure_future(client._cached_result(KEY, TTL, fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        fetch.release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert fetch.calls == 1
+        assert all(result == {"aa:bb": {"name": "laptop"}} for result in results)
+
+    async def test_reuses_result_within_ttl(self, client):
+        """Should serve the cached result until the TTL runs out."""
+        fetch = CountingFetch({"first": 1}, {"second": 2})
+
+        await client._cached_result(KEY, TTL, fetch)
+        result = await client._cached_result(KEY, TTL, fetch)
+
+        assert result == {"first": 1}
+        assert fetch.calls == 1
+
+    async def test_refetches_after_ttl(self, client):
+        """Should fetch again once the cached result is older than the TTL."""
+        fetch = CountingFetch({"first": 1}, {"second": 2})
+
+        await client._cached_result(KEY, TTL, fetch)
+        fetched_at, future = client._result_cache[KEY]
+        client._result_cache[KEY] = (time.monotonic() - TTL - 1, future)
+        result = await client._cached_result(KEY, TTL, fetch)
+
+        assert result == {"second": 2}
+        assert fetch.calls == 2
+
+    async def test_force_skips_cached_result(self, client):
+        """Should fetch again when force is set, even within the TTL."""
+        fetch = CountingFetch({"first": 1}, {"second": 2})
+
+        await client._cached_result(KEY, TTL, fetch)
+        result = await client._cached_result(KEY, TTL, fetch, force=True)
+
+        assert result == {"second": 2}
+        assert fetch.calls == 2
+
+    async def test_failure_is_not_cached(self, client):
+        """Should retry on the next call after a failed fetch."""
+        fetch = CountingFetch(RuntimeError("controller unreachable"), {"ok": 1})
+
+        with pytest.raises(RuntimeError):
+            await client._cached_result(KEY, TTL, fetch)
+        result = await client._cached_result(KEY, TTL, fetch)
+
+        assert result == {"ok": 1}
+        assert fetch.calls == 2
+
+    async def test_empty_result_is_not_cached(self, client):
+        """Should retry on the next call after an empty result."""
+        fetch = CountingFetch({}, {"ok": 1})
+
+        assert await client._cached_result(KEY, TTL, fetch) == {}
+        result = await client._cached_result(KEY, TTL, fetch)
+
+        assert result == {"ok": 1}
+        assert fetch.calls == 2
+
+    async def test_callers_get_independent_copies(self, client):
+        """Changing one caller's result shouldn't change the cached one."""
+        fetch = CountingFetch({"aa:bb": 1})
+
+        result1 = await client._cached_result(KEY, TTL, fetch)
+        result1["cc:dd"] = 2
+        result2 = await client._cached_result(KEY, TTL, fetch)
+
+        assert result2 == {"aa:bb": 1}
+        assert fetch.calls == 1
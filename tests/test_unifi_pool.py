@@ -0,0 +1,153 @@
+"""Tests for the shared UniFi client pool."""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from shared import unifi_pool
+
+
+CREDENTIALS = {
+    "controller_url": "https://192.168.1.1",
+    "username": "admin",
+    "password": "secret",
+    "api_key": None,
+    "site_id": "default",
+    "verify_ssl": False,
+}
+
+
+class FakeClient:
+    """Stands in for UniFiClient without talking to a controller."""
+
+    connect_result = True
+    instances = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.disconnected = False
+        FakeClient.instances.append(self)
+
+    async def connect(self):
+        return FakeClient.connect_result
+
+    async def disconnect(self):
+        self.disconnected = True
+
+
+@pytest.fixture(autouse=True)
+def fake_client():
+    """Reset the pool and replace UniFiClient for each test."""
+    FakeClient.instances = []
+    FakeClient.connect_result = True
+    unifi_pool._client = None
+    unifi_pool._client_key = None
+    unifi_pool._connected_at = 0.0
+    unifi_pool._retiring.clear()
+    with patch.object(unifi_pool, "UniFiClient", FakeClient):
+        yield
+    for task in list(unifi_pool._retiring):
+        task.cancel()
+    unifi_pool._retiring.clear()
+    unifi_pool._client = None
+    unifi_pool._client_key = None
+
+
+class TestGetUnifiClient:
+    """Tests for get_unifi_client reuse and rotation."""
+
+    async def test_reuses_client_for_same_credentials(self):
+        """Should connect once and hand out the same client."""
+        client1 = await unifi_pool.get_unifi_client(CREDENTIALS)
+        client2 = await unifi_pool.get_unifi_client(dict(CREDENTIALS))
+
+        assert client1 is client2
+        assert len(FakeClient.instances) == 1
+
+    async def test_reconnects_when_credentials_change(self):
+        """Should connect a new client when the credentials change."""
+        client1 = await unifi_pool.get_unifi_client(CREDENTIALS)
+        client2 = await unifi_pool.get_unifi_client({**CREDENTIALS, "password": "new"})
+
+        assert client2 is not client1
+        assert client2.kwargs["password"] == "new"
+
+    async def test_rotates_client_after_max_age(self):
+        """Should reconnect once the client is older than CLIENT_MAX_AGE_SECONDS."""
+        client1 = await unifi_pool.get_unifi_client(CREDENTIALS)
+        unifi_pool._connected_at = time.monotonic() - unifi_pool.CLIENT_MAX_AGE_SECONDS - 1
+
+        client2 = await unifi_pool.get_unifi_client(CREDENTIALS)
+
+        assert client2 is not client1
+
+    async def test_replaced_client_stays_connected_during_grace_period(self):
+        """Should not disconnect a replaced client that may still be in use."""
+        client1 = await unifi_pool.get_unifi_client(CREDENTIALS)
+        await unifi_pool.get_unifi_client({**CREDENTIALS, "password": "new"})
+        await asyncio.sleep(0)
+
+        assert client1.disconnected is False
+        assert client1 in unifi_pool._retiring.values()
+
+    async def test_replaced_client_disconnected_after_grace_period(self):
+        """Should disconnect a replaced client once the grace period is over."""
+        with patch.object(unifi_pool, "RETIRED_CLIENT_GRACE_SECONDS", 0):
+            client1 = await unifi_pool.get_unifi_client(CREDENTIALS)
+            await unifi_pool.get_unifi_client({**CREDENTIALS, "password": "new"})
+            await asyncio.gather(*unifi_pool._retiring)
+
+        assert client1.disconnected is True
+        assert not unifi_pool._retiring
+
+    async def test_returns_none_when_connect_fails(self):
+        """Should return None and keep no client when connecting fails."""
+        FakeClient.connect_result = False
+
+        assert await unifi_pool.get_unifi_client(CREDENTIALS) is None
+        assert unifi_pool._client is None
+
+
+class TestInvalidateUnifiClient:
+    """Tests for invalidate_unifi_client and close_unifi_client."""
+
+    async def test_invalidate_current_client_reconnects(self):
+        """Should drop the client a failed request ran on."""
+        client1 = await unifi_pool.get_unifi_client(CREDENTIALS)
+
+        await unifi_pool.invalidate_unifi_client(client1)
+        client2 = await unifi_pool.get_unifi_client(CREDENTIALS)
+
+        assert client2 is not client1
+
+    async def test_invalidate_replaced_client_keeps_current(self):
+        """A failure on an already replaced client shouldn't drop the new one."""
+        client1 = await unifi_pool.get_unifi_client(CREDENTIALS)
+        await unifi_pool.invalidate_unifi_client(client1)
+        client2 = await unifi_pool.get_unifi_client(CREDENTIALS)
+
+        await unifi_pool.invalidate_unifi_client(client1)
+
+        assert await unifi_pool.get_unifi_client(CREDENTIALS) is client2
+        assert client2.disconnected is False
+
+    async def test_invalidate_without_client_always_drops(self):
+        """Should drop the current client when called without one (config change)."""
+        client1 = await unifi_pool.get_unifi_client(CREDENTIALS)
+
+        await unifi_pool.invalidate_unifi_client()
+
+        assert await unifi_pool.get_unifi_client(CREDENTIALS) is not client1
+
+    async def test_close_disconnects_current_and_retiring_clients(self):
+        """Should disconnect every client immediately on shutdown."""
+        client1 = await unifi_pool.get_unifi_client(CREDENTIALS)
+        client2 = await unifi_pool.get_unifi_client({**CREDENTIALS, "password": "new"})
+
+        await unifi_pool.close_unifi_client()
+
+        assert client1.disconnected is True
+        assert client2.disconnected is True
+        assert unifi_pool._client is None
+        assert not unifi_pool._retiring
@@ -130,8 +130,10 @@ class DashboardData(BaseModel):
     health: NetworkHealth = Field(default_factory=NetworkHealth)
 
     # Metadata
-    last_refresh: Optional[datetime] = None
+    last_refresh: Optional[datetime] = None  # Last successful refresh
     refresh_interval: int = 60
+    is_stale: bool = False  # True while refreshes fail and older data is served
+    stale_reason: Optional[str] = None
 
     @field_serializer('last_refresh')
     def serialize_last_refresh(self, value: Optional[datetime]) -> Optional[str]:
@@ -7,12 +7,8 @@ from datetime import datetime, timezone
 from typing import Optional, Dict, List
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy import select
 
-from shared.database import get_database
-from shared.models.unifi_config import UniFiConfig
-from shared.unifi_client import UniFiClient
-from shared.crypto import decrypt_password, decrypt_api_key
+from shared.unifi_pool import load_unifi_credentials, get_unifi_client, invalidate_unifi_client
 from shared.config import get_settings
 from shared.websocket_manager import get_ws_manager
 from tools.network_pulse.models import (
@@ -36,6 +32,10 @@ _last_error: Optional[str] = None
 # In-memory cache for dashboard data
 _cached_data: Optional[DashboardData] = None
 
+# After a failed refresh the last good data keeps being served, marked
+# stale, until it is this old; then it is dropped
+STALE_DATA_MAX_AGE_SECONDS = 600
+
 
 def get_scheduler() -> AsyncIOScheduler:
     """Get the global scheduler instance"""
@@ -93,256 +93,264 @@ async def refresh_network_stats():
     try:
         logger.info("Starting network stats refresh")
 
-        # Get database session for UniFi config
-        db_instance = get_database()
-        async for session in db_instance.get_session():
-            # Get UniFi config
-            config_result = await session.execute(
-                select(UniFiConfig).where(UniFiConfig.id == 1)
-            )
-            unifi_config = config_result.scalar_one_or_none()
-
-            if not unifi_config:
-                logger.warning("No UniFi configuration found, skipping refresh")
-                _last_error = "No UniFi configuration found"
-                return
-
-            # Decrypt UniFi credentials
-            password = None
-            api_key = None
-
-            try:
-                if unifi_config.password_encrypted:
-                    password = decrypt_password(unifi_config.password_encrypted)
-                if unifi_config.api_key_encrypted:
-                    api_key = decrypt_api_key(unifi_config.api_key_encrypted)
-            except Exception as e:
-                logger.error(f"Failed to decrypt UniFi credentials: {e}")
-                _last_error = "Failed to decrypt credentials"
-                return
-
-            # Create UniFi client
-            # is_unifi_os is auto-detected during connection
-            unifi_client = UniFiClient(
-                host=unifi_config.controller_url,
-                username=unifi_config.username,
-                password=password,
-                api_key=api_key,
-                site=unifi_config.site_id,
-                verify_ssl=unifi_config.verify_ssl
+        # Reuse the shared, already logged-in client instead of logging in
+        # again on every refresh
+        try:
+            credentials = await load_unifi_credentials()
+        except Exception as e:
+            logger.error(f"Failed to load UniFi credentials: {e}")
+            await _refresh_failed("Failed to load UniFi credentials")
+            return
+
+        if not credentials:
+            logger.warning("No UniFi configuration found, skipping refresh")
+            await _refresh_failed("No UniFi configuration found")
+            return
+
+        unifi_client = await get_unifi_client(credentials)
+        if unifi_client is None:
+            logger.error("Failed to connect to UniFi controller")
+            await _refresh_failed("Failed to connect to UniFi controller")
+            return
+
+        logger.info("Connected to UniFi controller, fetching data...")
+
+        try:
+            # Fetch all data in parallel where possible
+            system_info_task = unifi_client.get_system_info()
+            health_task = unifi_client.get_health()
+            ap_details_task = unifi_client.get_ap_details()
+            clients_task = unifi_client.get_clients()
+
+            # Await all tasks
+            system_info, health, ap_details, clients = await asyncio.gather(
+                system_info_task,
+                health_task,
+                ap_details_task,
+                clients_task
             )
 
-            # Connect to UniFi controller
-            connected = await unifi_client.connect()
-            if not connected:
-                logger.error("Failed to connect to UniFi controller")
-                _last_error = "Failed to connect to UniFi controller"
-                return
-
-            logger.info("Connected to UniFi controller, fetching data...")
-
-            try:
-                # Fetch all data in parallel where possible
-                system_info_task = unifi_client.get_system_info()
-                health_task = unifi_client.get_health()
-                ap_details_task = unifi_client.get_ap_details()
-                top_clients_task = unifi_client.get_top_clients(limit=10)
-
-                # Await all tasks
-                system_info, health, ap_details, top_clients = await asyncio.gather(
-                    system_info_task,
-                    health_task,
-                    ap_details_task,
-                    top_clients_task
-                )
-
-                # Build dashboard data
-                settings = get_settings()
-
-                # Gateway stats
-                gateway = GatewayStats(
-                    model=system_info.get('gateway_model'),
-                    name=system_info.get('gateway_name'),
-                    version=system_info.get('gateway_version'),
-                    uptime=system_info.get('uptime'),
-                    cpu_utilization=system_info.get('cpu_utilization'),
-                    mem_utilization=system_info.get('mem_utilization'),
-                    wan_status=system_info.get('wan_status'),
-                    wan_ip=system_info.get('wan_ip')
-                )
-
-                # WAN health
-                wan_health_data = health.get('wan', {})
-                wan = WanHealth(
-                    status=wan_health_data.get('status', 'unknown'),
-                    wan_ip=wan_health_data.get('wan_ip'),
-                    isp_name=wan_health_data.get('isp_name'),
-                    availability=wan_health_data.get('availability'),
-                    latency=health.get('www', {}).get('latency'),
-                    tx_bytes_rate=wan_health_data.get('tx_bytes', 0),
-                    rx_bytes_rate=wan_health_data.get('rx_bytes', 0)
-                )
-
-                # Device counts
-                clients = await unifi_client.get_clients()
-                wired_count = sum(1 for c in clients.values() if c.get('is_wired', False))
-                wireless_count = len(clients) - wired_count
-
-                devices = DeviceCounts(
-                    clients=len(clients),
-                    wired_clients=wired_count,
-                    wireless_clients=wireless_count,
-                    aps=system_info.get('ap_count', 0),
-                    switches=system_info.get('switch_count', 0)
-                )
-
-                # AP status list
-                access_points = [
-                    APStatus(
-                        mac=ap.get('mac', ''),
-                        name=ap.get('name', 'Unknown'),
-                        model=ap.get('model', 'Unknown'),
-                        model_code=ap.get('model_code'),
-                        num_sta=ap.get('num_sta', 0),
-                        user_num_sta=ap.get('user_num_sta', 0),
-                        guest_num_sta=ap.get('guest_num_sta', 0),
-                        channels=ap.get('channels'),
-                        state=ap.get('state', 0),
-                        uptime=ap.get('uptime', 0),
-                        satisfaction=ap.get('satisfaction'),
-                        tx_bytes=ap.get('tx_bytes', 0),
-                        rx_bytes=ap.get('rx_bytes', 0)
-                    )
-                    for ap in ap_details
-                ]
-
-                # Top clients (top 10 for display)
-                top_clients_list = [
-                    TopClient(
-                        mac=client.get('mac', ''),
-                        name=client.get('name', 'Unknown'),
-                        hostname=client.get('hostname'),
-                        ip=client.get('ip'),
-                        tx_bytes=client.get('tx_bytes', 0),
-                        rx_bytes=client.get('rx_bytes', 0),
-                        total_bytes=client.get('total_bytes', 0),
-                        rssi=client.get('rssi'),
-                        is_wired=client.get('is_wired', False),
-                        uptime=client.get('uptime'),
-                        essid=client.get('essid'),
-                        network=client.get('network'),
-                        radio=get_radio_band_name(client.get('radio', ''), client.get('is_wired', False)),
-                        ap_mac=client.get('ap_mac')
-                    )
-                    for client in top_clients
-                ]
-
-                # All clients list (for AP detail pages)
-                all_clients_list = []
-                clients_by_band: Dict[str, int] = {}
-                clients_by_ssid: Dict[str, int] = {}
-
-                for client_data in clients.values():
-                    is_wired = client_data.get('is_wired', False)
-                    radio_band = get_radio_band_name(client_data.get('radio', ''), is_wired)
-                    essid = client_data.get('essid')
-
-                    # Handle None values for bytes
-                    tx_bytes = client_data.get('tx_bytes') or 0
-                    rx_bytes = client_data.get('rx_bytes') or 0
-
-                    # Build client object
-                    client_obj = TopClient(
-                        mac=client_data.get('mac', ''),
-                        name=client_data.get('name') or client_data.get('hostname') or 'Unknown',
-                        hostname=client_data.get('hostname'),
-                        ip=client_data.get('ip'),
-                        tx_bytes=tx_bytes,
-                        rx_bytes=rx_bytes,
-                        total_bytes=tx_bytes + rx_bytes,
-                        rssi=client_data.get('rssi'),
-                        is_wired=is_wired,
-                        uptime=client_data.get('uptime'),
-                        essid=essid,
-                        network=client_data.get('network'),
-                        radio=radio_band,
-                        ap_mac=client_data.get('ap_mac')
-                    )
-                    all_clients_list.append(client_obj)
-
-                    # Aggregate by band
-                    if is_wired:
-                        band_key = "Wired"
-                    elif radio_band:
-                        band_key = radio_band
-                    else:
-                        band_key = "Unknown"
-                    clients_by_band[band_key] = clients_by_band.get(band_key, 0) + 1
-
-                    # Aggregate by SSID
-                    if essid:
-                        clients_by_ssid[essid] = clients_by_ssid.get(essid, 0) + 1
-                    elif is_wired:
-                        clients_by_ssid["Wired"] = clients_by_ssid.get("Wired", 0) + 1
-
-                # Sort all_clients by total bandwidth descending
-                all_clients_list.sort(key=lambda c: c.total_bytes, reverse=True)
-
-                # Build chart data
-                chart_data = ChartData(
-                    clients_by_band=clients_by_band,
-                    clients_by_ssid=clients_by_ssid
-                )
-
-                # Network health
-                network_health = NetworkHealth(
-                    wan=health.get('wan'),
-                    wan2=health.get('wan2'),
-                    lan=health.get('lan'),
-                    wlan=health.get('wlan'),
-                    vpn=health.get('vpn'),
-                    www=health.get('www')
-                )
-
-                # Build complete dashboard data
-                _cached_data = DashboardData(
-                    gateway=gateway,
-                    wan=wan,
-                    devices=devices,
-                    current_tx_rate=wan_health_data.get('tx_bytes', 0),
-                    current_rx_rate=wan_health_data.get('rx_bytes', 0),
-                    access_points=access_points,
-                    top_clients=top_clients_list,
-                    all_clients=all_clients_list,
-                    chart_data=chart_data,
-                    health=network_health,
-                    last_refresh=datetime.now(timezone.utc),
-                    refresh_interval=60
-                )
-
-                _last_refresh = datetime.now(timezone.utc)
-                _last_error = None
-
-                logger.info(
-                    f"Network stats refresh completed: "
-                    f"{devices.clients} clients, {devices.aps} APs"
-                )
-
-                # Broadcast update via WebSocket
-                ws_manager = get_ws_manager()
-                await ws_manager.broadcast({
-                    "type": "stats_update",
-                    "data": _cached_data.model_dump()
-                })
-
-            finally:
-                await unifi_client.disconnect()
-
-            break  # Exit the async for loop after processing
+            # Rank the client list fetched above instead of fetching it again
+            top_clients = await unifi_client.get_top_clients(limit=10, clients=clients)
+        except Exception:
+            # The controller session may have gone stale - reconnect next time
+            await invalidate_unifi_client(unifi_client)
+            raise
+
+        # Build dashboard data
+        settings = get_settings()
+
+        # Gateway stats
+        gateway = GatewayStats(
+            model=system_info.get('gateway_model'),
+            name=system_info.get('gateway_name'),
+            version=system_info.get('gateway_version'),
+            uptime=system_info.get('uptime'),
+            cpu_utilization=system_info.get('cpu_utilization'),
+            mem_utilization=system_info.get('mem_utilization'),
+            wan_status=system_info.get('wan_status'),
+            wan_ip=system_info.get('wan_ip')
+        )
+
+        # WAN health
+        wan_health_data = health.get('wan', {})
+        wan = WanHealth(
+            status=wan_health_data.get('status', 'unknown'),
+            wan_ip=wan_health_data.get('wan_ip'),
+            isp_name=wan_health_data.get('isp_name'),
+            availability=wan_health_data.get('availability'),
+            latency=health.get('www', {}).get('latency'),
+            tx_bytes_rate=wan_health_data.get('tx_bytes', 0),
+            rx_bytes_rate=wan_health_data.get('rx_bytes', 0)
+        )
+
+        # Device counts
+        wired_count = sum(1 for c in clients.values() if c.get('is_wired', False))
+        wireless_count = len(clients) - wired_count
+
+        devices = DeviceCounts(
+            clients=len(clients),
+            wired_clients=wired_count,
+            wireless_clients=wireless_count,
+            aps=system_info.get('ap_count', 0),
+            switches=system_info.get('switch_count', 0)
+        )
+
+        # AP status list
+        access_points = [
+            APStatus(
+                mac=ap.get('mac', ''),
+                name=ap.get('name', 'Unknown'),
+                model=ap.get('model', 'Unknown'),
+                model_code=ap.get('model_code'),
+                num_sta=ap.get('num_sta', 0),
+                user_num_sta=ap.get('user_num_sta', 0),
+                guest_num_sta=ap.get('guest_num_sta', 0),
+                channels=ap.get('channels'),
+                state=ap.get('state', 0),
+                uptime=ap.get('uptime', 0),
+                satisfaction=ap.get('satisfaction'),
+                tx_bytes=ap.get('tx_bytes', 0),
+                rx_bytes=ap.get('rx_bytes', 0)
+            )
+            for ap in ap_details
+        ]
+
+        # Top clients (top 10 for display)
+        top_clients_list = [
+            TopClient(
+                mac=client.get('mac', ''),
+                name=client.get('name', 'Unknown'),
+                hostname=client.get('hostname'),
+                ip=client.get('ip'),
+                tx_bytes=client.get('tx_bytes', 0),
+                rx_bytes=client.get('rx_bytes', 0),
+                total_bytes=client.get('total_bytes', 0),
+                rssi=client.get('rssi'),
+                is_wired=client.get('is_wired', False),
+                uptime=client.get('uptime'),
+                essid=client.get('essid'),
+                network=client.get('network'),
+                radio=get_radio_band_name(client.get('radio', ''), client.get('is_wired', False)),
+                ap_mac=client.get('ap_mac')
+            )
+            for client in top_clients
+        ]
+
+        # All clients list (for AP detail pages)
+        all_clients_list = []
+        clients_by_band: Dict[str, int] = {}
+        clients_by_ssid: Dict[str, int] = {}
+
+        for client_data in clients.values():
+            is_wired = client_data.get('is_wired', False)
+            radio_band = get_radio_band_name(client_data.get('radio', ''), is_wired)
+            essid = client_data.get('essid')
+
+            # Handle None values for bytes
+            tx_bytes = client_data.get('tx_bytes') or 0
+            rx_bytes = client_data.get('rx_bytes') or 0
+
+            # Build client object
+            client_obj = TopClient(
+                mac=client_data.get('mac', ''),
+                name=client_data.get('name') or client_data.get('hostname') or 'Unknown',
+                hostname=client_data.get('hostname'),
+                ip=client_data.get('ip'),
+                tx_bytes=tx_bytes,
+                rx_bytes=rx_bytes,
+                total_bytes=tx_bytes + rx_bytes,
+                rssi=client_data.get('rssi'),
+                is_wired=is_wired,
+                uptime=client_data.get('uptime'),
+                essid=essid,
+                network=client_data.get('network'),
+                radio=radio_band,
+                ap_mac=client_data.get('ap_mac')
+            )
+            all_clients_list.append(client_obj)
+
+            # Aggregate by band
+            if is_wired:
+                band_key = "Wired"
+            elif radio_band:
+                band_key = radio_band
+            else:
+                band_key = "Unknown"
+            clients_by_band[band_key] = clients_by_band.get(band_key, 0) + 1
+
+            # Aggregate by SSID
+            if essid:
+                clients_by_ssid[essid] = clients_by_ssid.get(essid, 0) + 1
+            elif is_wired:
+                clients_by_ssid["Wired"] = clients_by_ssid.get("Wired", 0) + 1
+
+        # Sort all_clients by total bandwidth descending
+        all_clients_list.sort(key=lambda c: c.total_bytes, reverse=True)
+
+        # Build chart data
+        chart_data = ChartData(
+            clients_by_band=clients_by_band,
+            clients_by_ssid=clients_by_ssid
+        )
+
+        # Network health
+        network_health = NetworkHealth(
+            wan=health.get('wan'),
+            wan2=health.get('wan2'),
+            lan=health.get('lan'),
+            wlan=health.get('wlan'),
+            vpn=health.get('vpn'),
+            www=health.get('www')
+        )
+
+        # Build complete dashboard data
+        _cached_data = DashboardData(
+            gateway=gateway,
+            wan=wan,
+            devices=devices,
+            current_tx_rate=wan_health_data.get('tx_bytes', 0),
+            current_rx_rate=wan_health_data.get('rx_bytes', 0),
+            access_points=access_points,
+            top_clients=top_clients_list,
+            all_clients=all_clients_list,
+            chart_data=chart_data,
+            health=network_health,
+            last_refresh=datetime.now(timezone.utc),
+            refresh_interval=60
+        )
+
+        _last_refresh = datetime.now(timezone.utc)
+        _last_error = None
+
+        logger.info(
+            f"Network stats refresh completed: "
+            f"{devices.clients} clients, {devices.aps} APs"
+        )
+
+        # Broadcast update via WebSocket
+        ws_manager = get_ws_manager()
+        await ws_manager.broadcast({
+            "type": "stats_update",
+            "data": _cached_data.model_dump()
+        })
 
     except Exception as e:
         logger.error(f"Error in network stats refresh: {e}", exc_info=True)
-        _last_error = str(e)
+        await _refresh_failed(str(e))
+
+
+async def _refresh_failed(reason: str):
+    """
+    Record a failed refresh and keep the dashboard showing the last good
+    data, marked stale, so a controller outage doesn't blank it.
+
+    Args:
+        reason: Error message for the status endpoint and the stale marker
+    """
+    global _last_error, _cached_data
+
+    _last_error = reason
+
+    if _cached_data is None:
+        return
+
+    age = (datetime.now(timezone.utc) - _cached_data.last_refresh).total_seconds()
+    if age > STALE_DATA_MAX_AGE_SECONDS:
+        logger.warning(f"Dropping dashboard data from {int(age)}s ago after failed refresh")
+        _cached_data = None
+        return
+
+    _cached_data = _cached_data.model_copy(update={"is_stale": True, "stale_reason": reason})
+
+    try:
+        ws_manager = get_ws_manager()
+        await ws_manager.broadcast({
+            "type": "stats_update",
+            "data": _cached_data.model_dump()
+        })
+    except Exception as e:
+        logger.debug(f"Failed to broadcast stale dashboard data: {e}")
 
 
 async def start_scheduler():
@@ -1,11 +1,41 @@
 """
 Database models for Threat Watch
 """
+import zlib
 from datetime import datetime, timezone
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Float, Text, Index
+
+import orjson
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Float, Text, Index, LargeBinary, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred
+from sqlalchemy.types import TypeDecorator
 from shared.models.base import Base
 
 
+class CompressedJSON(TypeDecorator):
+    """
+    JSON document stored compactly: JSONB on PostgreSQL (compressed by TOAST),
+    zlib-compressed JSON bytes on other databases
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == 'postgresql':
+            return value
+        return zlib.compress(orjson.dumps(value))
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == 'postgresql':
+            return value
+        return orjson.loads(zlib.decompress(value))
+
+
 class ThreatEvent(Base):
     """
     Represents an IDS/IPS threat event from UniFi
@@ -59,10 +89,11 @@ class ThreatEvent(Base):
     # Metadata
     site_id = Column(String, nullable=True)
     archived = Column(Boolean, default=False, nullable=False)
-    raw_data = Column(Text, nullable=True)  # Store full JSON for reference
+    # Full event for reference; deferred so list queries don't load it
+    raw_data = deferred(Column(CompressedJSON, nullable=True))
 
     # Ignore list tracking
-    ignored = Column(Boolean, default=False, nullable=False, index=True)
+    ignored = Column(Boolean, default=False, nullable=False)
     ignored_by_rule_id = Column(Integer, nullable=True)
 
     # When we fetched this event
@@ -72,6 +103,13 @@ class ThreatEvent(Base):
     __table_args__ = (
         Index('ix_threats_events_timestamp_severity', 'timestamp', 'severity'),
         Index('ix_threats_events_src_ip_timestamp', 'src_ip', 'timestamp'),
+        # Most events are not ignored, so on PostgreSQL only index those
+        Index('ix_threats_events_ignored', 'ignored', postgresql_where=text('ignored = false')),
+        # Default feed: WHERE ignored = false ORDER BY timestamp DESC LIMIT n
+        Index(
+            'ix_threats_events_ignored_timestamp', 'ignored', 'timestamp',
+            postgresql_where=text('ignored = false')
+        ),
     )
 
     def __repr__(self):
@@ -112,7 +150,7 @@ class ThreatIgnoreRule(Base):
     __tablename__ = "threats_ignore_rules"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    ip_address = Column(String, nullable=False, index=True)
+    ip_address = Column(String, nullable=False)
     description = Column(String, nullable=True)  # e.g., "Home Assistant"
 
     # Severity levels to ignore (1=High, 2=Medium, 3=Low)
@@ -131,5 +169,12 @@ class ThreatIgnoreRule(Base):
     events_ignored = Column(Integer, default=0, nullable=False)
     last_matched = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        Index(
+            'ix_threats_ignore_rules_ip_address_enabled', 'ip_address', 'enabled',
+            postgresql_where=text('enabled = true')
+        ),
+    )
+
     def __repr__(self):
         return f"<ThreatIgnoreRule(ip={self.ip_address}, enabled={self.enabled})>"
@@ -17,7 +17,7 @@ from tools.threat_watch.scheduler import get_last_refresh, DEFAULT_REFRESH_INTER
 from shared.database import get_db_session
 from shared.models.unifi_config import UniFiConfig
 from shared.unifi_client import UniFiClient
-from shared.crypto import decrypt_password, decrypt_api_key
+from shared.crypto import decrypt_credentials
 from sqlalchemy import select
 import logging
 
@@ -112,12 +112,7 @@ def create_app() -> FastAPI:
                     gateway_error = "UniFi controller not configured"
                 else:
                     # Fetch gateway info directly
-                    password = None
-                    api_key = None
-                    if unifi_config.password_encrypted:
-                        password = decrypt_password(unifi_config.password_encrypted)
-                    if unifi_config.api_key_encrypted:
-                        api_key = decrypt_api_key(unifi_config.api_key_encrypted)
+                    password, api_key = decrypt_credentials(unifi_config)
 
                     client = UniFiClient(
                         host=unifi_config.controller_url,
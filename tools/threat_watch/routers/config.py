@@ -7,10 +7,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime, timezone
 
+from shared import cache
 from shared.database import get_db_session
 from shared.models.unifi_config import UniFiConfig
-from shared.crypto import encrypt_password, decrypt_password, encrypt_api_key, decrypt_api_key
+from shared.crypto import encrypt_credentials, decrypt_credentials
 from shared.unifi_client import UniFiClient
+from shared.unifi_pool import invalidate_unifi_client
 from tools.threat_watch.models import SuccessResponse
 
 router = APIRouter(prefix="/api/config", tags=["configuration"])
@@ -80,13 +82,7 @@ async def save_unifi_config(
             detail="Either password or api_key must be provided"
         )
 
-    encrypted_password = None
-    encrypted_api_key = None
-
-    if config.password:
-        encrypted_password = encrypt_password(config.password)
-    if config.api_key:
-        encrypted_api_key = encrypt_api_key(config.api_key)
+    encrypted_credentials = encrypt_credentials(config.password or None, config.api_key or None)
 
     result = await db.execute(select(UniFiConfig).where(UniFiConfig.id == 1))
     existing_config = result.scalar_one_or_none()
@@ -94,8 +90,10 @@ async def save_unifi_config(
     if existing_config:
         existing_config.controller_url = config.controller_url
         existing_config.username = config.username
-        existing_config.password_encrypted = encrypted_password
-        existing_config.api_key_encrypted = encrypted_api_key
+        existing_config.credentials_encrypted = encrypted_credentials
+        existing_config.has_api_key = bool(config.api_key)
+        existing_config.password_encrypted = None
+        existing_config.api_key_encrypted = None
         existing_config.site_id = config.site_id
         existing_config.verify_ssl = config.verify_ssl
     else:
@@ -103,8 +101,8 @@ async def save_unifi_config(
             id=1,
             controller_url=config.controller_url,
             username=config.username,
-            password_encrypted=encrypted_password,
-            api_key_encrypted=encrypted_api_key,
+            credentials_encrypted=encrypted_credentials,
+            has_api_key=bool(config.api_key),
             site_id=config.site_id,
             verify_ssl=config.verify_ssl
         )
@@ -112,6 +110,11 @@ async def save_unifi_config(
 
     await db.commit()
 
+    # Drop cached credentials and the shared client so the next request uses the new config
+    cache.invalidate_credentials()
+    cache.invalidate("system_status")
+    await invalidate_unifi_client()
+
     return SuccessResponse(
         success=True,
         message="UniFi configuration saved successfully"
@@ -138,7 +141,7 @@ async def get_unifi_config(
         id=config.id,
         controller_url=config.controller_url,
         username=config.username,
-        has_api_key=config.api_key_encrypted is not None,
+        has_api_key=config.has_api_key,
         site_id=config.site_id,
         verify_ssl=config.verify_ssl,
         last_successful_connection=config.last_successful_connection
@@ -161,14 +164,8 @@ async def test_unifi_connection(
             error="UniFi configuration not found. Please configure your UniFi controller first."
         )
 
-    password = None
-    api_key = None
-
     try:
-        if config.password_encrypted:
-            password = decrypt_password(config.password_encrypted)
-        if config.api_key_encrypted:
-            api_key = decrypt_api_key(config.api_key_encrypted)
+        password, api_key = decrypt_credentials(config)
     except Exception as e:
         return UniFiConnectionTest(
             connected=False,
@@ -223,14 +220,8 @@ async def get_unifi_client(db: AsyncSession = Depends(get_db_session)) -> UniFiC
             detail="UniFi configuration not found. Please configure your UniFi controller first."
         )
 
-    password = None
-    api_key = None
-
     try:
-        if config.password_encrypted:
-            password = decrypt_password(config.password_encrypted)
-        if config.api_key_encrypted:
-            api_key = decrypt_api_key(config.api_key_encrypted)
+        password, api_key = decrypt_credentials(config)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -2,6 +2,7 @@
 API routes for threat events
 """
 import logging
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc, and_, or_
@@ -454,7 +455,7 @@ async def debug_test_fetch(
     """
     from shared.models.unifi_config import UniFiConfig
     from shared.unifi_client import UniFiClient
-    from shared.crypto import decrypt_password, decrypt_api_key
+    from shared.crypto import decrypt_credentials
     import time
 
     # Get UniFi config
@@ -469,13 +470,8 @@ async def debug_test_fetch(
         }
 
     # Decrypt credentials
-    password = None
-    api_key = None
     try:
-        if unifi_config.password_encrypted:
-            password = decrypt_password(unifi_config.password_encrypted)
-        if unifi_config.api_key_encrypted:
-            api_key = decrypt_api_key(unifi_config.api_key_encrypted)
+        password, api_key = decrypt_credentials(unifi_config)
     except Exception as e:
         return {
             "success": False,
@@ -526,10 +522,7 @@ async def debug_test_fetch(
 
         # Test legacy stat/ips/event API
         try:
-            if client.is_unifi_os:
-                url = f"{client.host}/proxy/network/api/s/{client.site}/stat/ips/event"
-            else:
-                url = f"{client.host}/api/s/{client.site}/stat/ips/event"
+            url = f"{client._api_base}/stat/ips/event"
 
             payload = {
                 "start": day_ago_ms,
@@ -539,7 +532,7 @@ async def debug_test_fetch(
 
             async with client._session.post(url, json=payload) as resp:
                 if resp.status == 200:
-                    data = await resp.json()
+                    data = orjson.loads(await resp.read())
                     legacy_events = data.get('data', [])
                 else:
                     legacy_error = f"HTTP {resp.status}"
@@ -1,18 +1,17 @@
 """
 Background task scheduler for polling IDS/IPS events
 """
-import json
 import logging
 from datetime import datetime, timezone, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy import select, func
+from sqlalchemy import select, func, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from shared.database import get_database
 from shared.models.unifi_config import UniFiConfig
 from shared.unifi_client import UniFiClient
-from shared.crypto import decrypt_password, decrypt_api_key
+from shared.crypto import decrypt_credentials
 from shared.config import get_settings
 from shared.websocket_manager import get_ws_manager
 from shared.webhooks import deliver_webhook
@@ -27,6 +26,9 @@ _last_refresh: datetime = None
 # Default refresh interval (seconds)
 DEFAULT_REFRESH_INTERVAL = 60
 
+# Event IDs per IN (...) query when looking for already-stored events
+EXISTING_EVENT_QUERY_CHUNK = 500
+
 
 def get_scheduler() -> AsyncIOScheduler:
     """Get the global scheduler instance"""
@@ -143,7 +145,7 @@ def _parse_v2_traffic_flow(event: dict) -> dict:
         # Meta
         'site_id': None,  # Not directly available in v2
         'archived': False,
-        'raw_data': json.dumps(event)
+        'raw_data': event
     }
 
 
@@ -215,7 +217,7 @@ def _parse_legacy_ips_event(event: dict) -> dict:
         # Meta
         'site_id': event.get('site_id'),
         'archived': event.get('archived', False),
-        'raw_data': json.dumps(event)
+        'raw_data': event
     }
 
 
@@ -298,9 +300,16 @@ async def check_ignore_rules(session: AsyncSession, event_data: dict) -> tuple[b
     dest_ip = event_data.get('dest_ip')
     severity = event_data.get('severity') or 3  # Default to low
 
-    # Get all enabled ignore rules
+    event_ips = [ip for ip in (src_ip, dest_ip) if ip]
+    if not event_ips:
+        return False, None
+
+    # Only fetch enabled rules for the IPs on this event
     result = await session.execute(
-        select(ThreatIgnoreRule).where(ThreatIgnoreRule.enabled == True)
+        select(ThreatIgnoreRule).where(
+            ThreatIgnoreRule.ip_address.in_(event_ips),
+            ThreatIgnoreRule.enabled == True
+        )
     )
     rules = result.scalars().all()
 
@@ -336,6 +345,28 @@ async def check_ignore_rules(session: AsyncSession, event_data: dict) -> tuple[b
     return False, None
 
 
+async def get_existing_event_ids(session: AsyncSession, event_ids: list[str]) -> set[str]:
+    """
+    Find which UniFi event IDs are already stored.
+
+    Args:
+        session: Database session
+        event_ids: UniFi event IDs to look up
+
+    Returns:
+        Set of the given IDs that already have a ThreatEvent row
+    """
+    existing = set()
+    for i in range(0, len(event_ids), EXISTING_EVENT_QUERY_CHUNK):
+        result = await session.execute(
+            select(ThreatEvent.unifi_event_id).where(
+                ThreatEvent.unifi_event_id.in_(event_ids[i:i + EXISTING_EVENT_QUERY_CHUNK])
+            )
+        )
+        existing.update(result.scalars())
+    return existing
+
+
 async def refresh_threat_events():
     """
     Background task that polls for new IDS/IPS events
@@ -360,14 +391,8 @@ async def refresh_threat_events():
                 return
 
             # Decrypt credentials
-            password = None
-            api_key = None
-
             try:
-                if unifi_config.password_encrypted:
-                    password = decrypt_password(unifi_config.password_encrypted)
-                if unifi_config.api_key_encrypted:
-                    api_key = decrypt_api_key(unifi_config.api_key_encrypted)
+                password, api_key = decrypt_credentials(unifi_config)
             except Exception as e:
                 logger.error(f"Failed to decrypt UniFi credentials: {e}")
                 return
@@ -413,31 +438,30 @@ async def refresh_threat_events():
                 if not raw_events:
                     logger.debug("No IPS events returned from UniFi API - this may be normal if no threats detected")
 
-                # Process and store new events
+                # Process and store new events. Duplicates are found with a
+                # few IN queries up front instead of one query per event.
+                parsed_events = [parse_unifi_event(raw_event) for raw_event in raw_events]
+                seen_ids = await get_existing_event_ids(
+                    session, [event_data['unifi_event_id'] for event_data in parsed_events]
+                )
+
+                new_rows = []
                 new_count = 0
                 ignored_count = 0
-                for raw_event in raw_events:
-                    event_data = parse_unifi_event(raw_event)
-
-                    # Check if event already exists
-                    existing = await session.execute(
-                        select(ThreatEvent).where(
-                            ThreatEvent.unifi_event_id == event_data['unifi_event_id']
-                        )
-                    )
-                    if existing.scalar_one_or_none():
+                for event_data in parsed_events:
+                    if event_data['unifi_event_id'] in seen_ids:
                         continue  # Skip duplicate
+                    seen_ids.add(event_data['unifi_event_id'])
 
                     # Check ignore rules
                     should_ignore, ignore_rule_id = await check_ignore_rules(session, event_data)
 
-                    # Create new event with ignored flag
-                    new_event = ThreatEvent(
+                    # Queue the new event row with its ignored flag
+                    new_rows.append({
                         **event_data,
-                        ignored=should_ignore,
-                        ignored_by_rule_id=ignore_rule_id
-                    )
-                    session.add(new_event)
+                        'ignored': should_ignore,
+                        'ignored_by_rule_id': ignore_rule_id
+                    })
                     new_count += 1
 
                     if should_ignore:
@@ -448,6 +472,10 @@ async def refresh_threat_events():
                     action = event_data.get('action') or 'alert'
                     await trigger_threat_webhooks(session, event_data, action)
 
+                # One bulk INSERT for the whole batch; ORM objects would be
+                # inserted row by row (and autoflushed by the queries above)
+                if new_rows:
+                    await session.execute(insert(ThreatEvent), new_rows)
                 await session.commit()
                 _last_refresh = datetime.now(timezone.utc)
 
@@ -13,7 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from shared.database import get_database
 from shared.models.unifi_config import UniFiConfig
 from shared.unifi_client import UniFiClient
-from shared.crypto import decrypt_password, decrypt_api_key
+from shared.crypto import decrypt_credentials
 from shared.config import get_settings
 from shared.websocket_manager import get_ws_manager
 from shared.webhooks import deliver_webhook
@@ -91,14 +91,8 @@ async def refresh_tracked_devices():
             logger.info(f"Refreshing {len(tracked_devices)} tracked devices")
 
             # Decrypt UniFi credentials and create client
-            password = None
-            api_key = None
-
             try:
-                if unifi_config.password_encrypted:
-                    password = decrypt_password(unifi_config.password_encrypted)
-                if unifi_config.api_key_encrypted:
-                    api_key = decrypt_api_key(unifi_config.api_key_encrypted)
+                password, api_key = decrypt_credentials(unifi_config)
             except Exception as e:
                 logger.error(f"Failed to decrypt UniFi credentials: {e}")
                 return
@@ -540,14 +534,8 @@ async def refresh_single_device(device_id: int):
                 return
 
             # Decrypt UniFi credentials and create client
-            password = None
-            api_key = None
-
             try:
-                if unifi_config.password_encrypted:
-                    password = decrypt_password(unifi_config.password_encrypted)
-                if unifi_config.api_key_encrypted:
-                    api_key = decrypt_api_key(unifi_config.api_key_encrypted)
+                password, api_key = decrypt_credentials(unifi_config)
             except Exception as e:
                 logger.error(f"Failed to decrypt UniFi credentials: {e}")
                 return